@@ -1,4 +1,18 @@
+"""
+ASGI entry point. The async read endpoints (investors.async_views, under
+/api/async/) only free the worker while they await when served from here:
+
+    uvicorn core.asgi:application --workers 4
+
+Sync views still run, each in asgiref's thread. Django 4.2 opens a
+connection per thread and cannot reuse it across requests under ASGI, so run
+with DB_CONN_MAX_AGE=0 (or behind pgbouncer, DB_PGBOUNCER=1) rather than
+persistent connections. Compare against WSGI with `manage.py load_test_views`.
+"""
+
 import os
+
 from django.core.asgi import get_asgi_application
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
-application = get_asgi_application()
\ No newline at end of file
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+application = get_asgi_application()
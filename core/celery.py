@@ -6,3 +6,12 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 app = Celery("core")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+# queue wait / run time / phase metrics via Celery signals
+import core.task_metrics  # noqa: E402,F401
+
+# connections opened / pool checkout metrics
+import core.db_pool  # noqa: E402,F401
+
+# opt-in stack sampling of the tasks listed in PROFILE_TASKS
+import core.profiling  # noqa: E402,F401
@@ -0,0 +1,142 @@
+# core/db_pool.py
+"""
+Database connection reuse.
+
+Django keeps one connection per thread. Web and Celery workers reuse it
+across requests/tasks through CONN_MAX_AGE + CONN_HEALTH_CHECKS (settings).
+Short-lived threads (order_queue, simulate_concurrent_buys) would open one
+connection each and never close it, so they check connections out of a
+bounded `ConnectionPool` instead: at most `size` connections exist, idle ones
+are handed to the next thread, and a thread that cannot get one within
+`timeout` raises PoolTimeout.
+
+Metrics: connections opened per alias (every process), and for each pool
+the checked-out/idle connections, checkout waits and timeouts.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from typing import Callable, List, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from prometheus_client import Counter, Gauge, Histogram
+
+CONNECTIONS_OPENED = Counter(
+    "db_connections_opened_total", "New database connections", ["alias"]
+)
+CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections in use by pool threads",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+IDLE = Gauge(
+    "db_pool_idle", "Open idle pool connections", ["pool"], multiprocess_mode="livesum"
+)
+WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time a thread waited to check out a connection",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+TIMEOUTS = Counter("db_pool_timeouts_total", "Checkouts that timed out", ["pool"])
+
+
+@connection_created.connect
+def _count_connection(connection=None, **_kwargs):
+    CONNECTIONS_OPENED.labels(connection.alias).inc()
+
+
+class PoolTimeout(TimeoutError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Bounded set of DatabaseWrappers shared by worker threads. A checked-out
+    wrapper becomes the thread's `connections[alias]`, so ORM code inside
+    `with pool.connection():` runs on it unchanged. Meant for worker threads
+    that have no connection of their own.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        alias: str = DEFAULT_DB_ALIAS,
+    ):
+        self.name = name
+        self.alias = alias
+        self.size = size or settings.DB_POOL_SIZE
+        self.timeout = settings.DB_POOL_TIMEOUT if timeout is None else timeout
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._idle: List = []
+        self._all: List = []
+
+    @contextlib.contextmanager
+    def connection(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            TIMEOUTS.labels(self.name).inc()
+            raise PoolTimeout(f"no {self.name} connection within {self.timeout}s")
+        WAIT.labels(self.name).observe(time.perf_counter() - start)
+        conn = self._checkout()
+        connections[self.alias] = conn
+        CHECKED_OUT.labels(self.name).inc()
+        try:
+            # reconnects if the server dropped it or CONN_MAX_AGE passed
+            conn.close_if_unusable_or_obsolete()
+            yield conn
+        finally:
+            CHECKED_OUT.labels(self.name).dec()
+            del connections[self.alias]
+            with self._lock:
+                if conn.in_atomic_block:
+                    # leaked transaction: drop the connection, never hand it over
+                    conn.close()
+                    self._all.remove(conn)
+                else:
+                    self._idle.append(conn)
+                    IDLE.labels(self.name).inc()
+            self._slots.release()
+
+    def _checkout(self):
+        with self._lock:
+            if self._idle:
+                IDLE.labels(self.name).dec()
+                return self._idle.pop()
+        conn = connections.create_connection(self.alias)
+        conn.inc_thread_sharing()  # the pool, not a thread, owns it
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    def wrap(self, fn: Callable) -> Callable:
+        """`fn` running on a pooled connection, e.g. as a Thread target."""
+
+        def run(*args, **kwargs):
+            with self.connection():
+                return fn(*args, **kwargs)
+
+        return run
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            IDLE.labels(self.name).dec(len(self._idle))
+            self._idle.clear()
+            self._all.clear()
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,209 @@
+# core/db_router.py
+"""
+Primary/replica routing.
+
+Writes always go to "default". Reads go to a replica only inside a
+replica scope:
+  - requests to views that declare `read_replica` (True for every handler,
+    or a collection of viewset actions), entered by ReplicaRoutingMiddleware;
+  - batch analytics code wrapped in `use_replica()`.
+
+Read-your-writes: a successful unsafe request sets a short-lived cookie that
+keeps that client on the primary for REPLICA_STICKY_SECONDS. Reads inside a
+transaction on the primary stay there too.
+
+Lag: each replica's lag is probed at most every REPLICA_LAG_CHECK_INTERVAL
+seconds per process; replicas behind by more than REPLICA_MAX_LAG (or whose
+probe fails) are skipped, falling back to the primary.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Last probed replica lag",
+    ["alias"],
+    multiprocess_mode="max",
+)
+REPLICA_READS = Counter(
+    "db_replica_routed_total", "Replica-scoped reads by chosen database", ["db"]
+)
+
+STICKY_COOKIE = "db_primary_pin"
+
+_replica_scope: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "replica_scope", default=False
+)
+_lag_lock = threading.Lock()
+_lag_cache: Dict[str, Tuple[float, Optional[float]]] = {}  # alias -> (at, lag)
+
+_PG_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def replica_aliases() -> List[str]:
+    return list(getattr(settings, "DATABASE_REPLICAS", ()))
+
+
+@contextlib.contextmanager
+def use_replica(enabled: bool = True):
+    """Route reads in this block (and this context only) to a replica."""
+    token = _replica_scope.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_scope.reset(token)
+
+
+def _probe_lag(alias: str) -> float:
+    conn = connections[alias]
+    if conn.vendor == "postgresql":
+        with conn.cursor() as cur:
+            cur.execute(_PG_LAG_SQL)
+            return float(cur.fetchone()[0])
+    if conn.vendor == "sqlite":
+        # file snapshot (sync_replica): behind by the primary's newer writes
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict["NAME"]
+        replica = conn.settings_dict["NAME"]
+        return max(0.0, os.path.getmtime(primary) - os.path.getmtime(replica))
+    return 0.0
+
+
+def replica_lag(alias: str) -> Optional[float]:
+    """Cached lag in seconds, or None if the replica could not be probed."""
+    now = time.monotonic()
+    interval = getattr(settings, "REPLICA_LAG_CHECK_INTERVAL", 5.0)
+    cached = _lag_cache.get(alias)
+    if cached and now - cached[0] < interval:
+        return cached[1]
+    with _lag_lock:
+        cached = _lag_cache.get(alias)
+        if cached and now - cached[0] < interval:
+            return cached[1]
+        try:
+            lag = _probe_lag(alias)
+            REPLICA_LAG.labels(alias).set(lag)
+        except Exception as e:
+            logger.warning(f"replica {alias} lag probe failed: {e}")
+            lag = None
+        _lag_cache[alias] = (now, lag)
+    return lag
+
+
+def healthy_replicas() -> List[str]:
+    max_lag = getattr(settings, "REPLICA_MAX_LAG", 10.0)
+    out = []
+    for alias in replica_aliases():
+        lag = replica_lag(alias)
+        if lag is not None and lag <= max_lag:
+            out.append(alias)
+    return out
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_scope.get():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS  # see this transaction's own writes
+        candidates = healthy_replicas()
+        db = random.choice(candidates) if candidates else DEFAULT_DB_ALIAS
+        REPLICA_READS.labels(db).inc()
+        return db
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # replicas hold the same rows
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema through replication (or sync_replica)
+        return db == DEFAULT_DB_ALIAS
+
+
+def view_reads_replica(view_func: Callable, method: str) -> bool:
+    owner = getattr(view_func, "cls", None) or view_func
+    declared = getattr(owner, "read_replica", False)
+    if declared is True or declared is False:
+        return declared
+    action = (getattr(view_func, "actions", None) or {}).get(method.lower())
+    return action in declared
+
+
+class ReplicaRoutingMiddleware:
+    """Enters the replica scope for declared read-only views; pins writers."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # process_view may turn the scope on (possibly from asgiref's sync
+        # thread, whose context changes are copied back); reset undoes it
+        token = _replica_scope.set(False)
+        request._replica_read_only = False
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_scope.reset(token)
+        return self._pin_writer(request, response)
+
+    async def __acall__(self, request):
+        token = _replica_scope.set(False)
+        request._replica_read_only = False
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica_scope.reset(token)
+        return self._pin_writer(request, response)
+
+    @staticmethod
+    def _pin_writer(request, response):
+        wrote = request.method not in ("GET", "HEAD", "OPTIONS") and not (
+            request._replica_read_only  # e.g. a POST that only computes
+        )
+        if wrote and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=int(getattr(settings, "REPLICA_STICKY_SECONDS", 15)),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._replica_read_only = view_reads_replica(view_func, request.method)
+        if request.COOKIES.get(STICKY_COOKIE) or not replica_aliases():
+            return None
+        if request._replica_read_only:
+            _replica_scope.set(True)
+        return None
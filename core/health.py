@@ -2,7 +2,8 @@
 from __future__ import annotations
 from django.http import JsonResponse
 from django.db import connection
-from django.conf import settings
+
+from core.redis_client import get_redis
 
 def health_view(_request):
     return JsonResponse({"status": "ok"})
@@ -20,11 +21,9 @@ def ready_view(_request):
         checks["db"] = f"err:{e}"
         ok = False
 
-    # Redis check (broker)
+    # Redis check (broker), on the shared pool: no new client per probe
     try:
-        import redis
-        r = redis.from_url(getattr(settings, "REDIS_URL", "redis://localhost:6379/0"))
-        r.ping()
+        get_redis().ping()
         checks["redis"] = "ok"
     except Exception as e:
         checks["redis"] = f"err:{e}"
@@ -0,0 +1,165 @@
+# core/hot_cache.py
+"""
+Two-tier cache for small, hot, rarely changing rows (reference data).
+
+Tier 1 is a bounded in-process LRU with a TTL (no round trip at all);
+tier 2 is the shared cache (Redis in production). Keys missing from both
+are handed to the loader in one batch and written back to both tiers.
+
+Invalidation is by namespace version, not per key: writers call `bump()`,
+which publishes a new version token. Shared-cache keys embed the version,
+so every entry of the old one becomes unreachable at once (and expires).
+Local entries are stamped with the version they were loaded under; the
+bumping process sees the new version immediately, other processes on their
+next check, at most HOT_CACHE_VERSION_CHECK seconds later.
+
+The version is read before the loader runs, so a load racing a bump is
+stored under the old version and never served after the bump is seen.
+"""
+
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from django.conf import settings
+from django.core.cache import cache
+from prometheus_client import Counter
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+LOOKUPS = Counter(
+    "hot_cache_lookups_total",
+    "Two-tier cache lookups by the tier that answered (local, shared, miss)",
+    ["cache", "tier"],
+)
+
+
+class LRU:
+    """Thread-safe bounded mapping with per-entry expiry."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "collections.OrderedDict[Any, Tuple[float, Any]]" = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            if item[0] <= now:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TwoTierCache(Generic[K, V]):
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[list], Dict[K, V]],
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.name = name
+        self.loader = loader
+        self.local = LRU(
+            settings.HOT_CACHE_SIZE if maxsize is None else maxsize,
+            settings.HOT_CACHE_TTL if ttl is None else ttl,
+        )
+        self.version_key = f"hot:{name}:ver"
+        self._version: Any = None
+        self._checked_at = float("-inf")
+
+    def _current_version(self):
+        now = time.monotonic()
+        if now - self._checked_at >= settings.HOT_CACHE_VERSION_CHECK:
+            self._version = cache.get(self.version_key, 0)
+            self._checked_at = now
+        return self._version
+
+    def _shared_key(self, version, key: K) -> str:
+        return f"hot:{self.name}:{version}:{key}"
+
+    def get_many(self, keys: Iterable[K]) -> Dict[K, V]:
+        """Values for the keys that exist; absent keys are not cached."""
+        version = self._current_version()
+        out: Dict[K, V] = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            hit = self.local.get(key)
+            if hit is not None and hit[0] == version:
+                out[key] = hit[1]
+            else:
+                missing.append(key)
+        if out:
+            LOOKUPS.labels(self.name, "local").inc(len(out))
+        if not missing:
+            return out
+
+        shared_keys = {self._shared_key(version, k): k for k in missing}
+        shared = cache.get_many(list(shared_keys))
+        for skey, value in shared.items():
+            key = shared_keys[skey]
+            out[key] = value
+            self.local.set(key, (version, value))
+        if shared:
+            LOOKUPS.labels(self.name, "shared").inc(len(shared))
+
+        missing = [k for k in missing if k not in out]
+        if missing:
+            LOOKUPS.labels(self.name, "miss").inc(len(missing))
+            loaded = self.loader(missing)
+            cache.set_many(
+                {self._shared_key(version, k): v for k, v in loaded.items()},
+                timeout=settings.HOT_CACHE_SHARED_TTL,
+            )
+            for key, value in loaded.items():
+                self.local.set(key, (version, value))
+            out.update(loaded)
+        return out
+
+    def get(self, key: K, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def bump(self) -> None:
+        """Publish a new version: drops every entry, here and in other processes."""
+        token = time.time_ns()
+        cache.set(self.version_key, token, timeout=None)
+        self._version, self._checked_at = token, time.monotonic()
+        self.local.clear()
@@ -0,0 +1,229 @@
+# core/metrics.py
+"""
+Request instrumentation: per-view DB query count, DB time, render
+(serialization) time and total latency, exposed as Prometheus histograms at
+/metrics.
+
+Views declare a query budget with a `query_budget` attribute: an int, or a
+dict keyed by viewset action ({"list": 3, "retrieve": 4}). A request over
+budget is logged and counted; with QUERY_BUDGET_MODE = "raise" (tests) it
+raises QueryBudgetExceeded instead.
+
+Queries are attributed to the request through a context variable read by a
+wrapper installed on every connection, so async views (whose ORM calls run
+in asgiref's sync thread, on that thread's connection) are counted too.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import time
+from typing import Callable, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250)
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests by view, method and status",
+    ["view", "method", "status"],
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Total request latency",
+    ["view", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "DB queries per request",
+    ["view", "method"],
+    buckets=QUERY_BUCKETS,
+)
+DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Time spent in DB calls per request",
+    ["view", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+RENDER_TIME = Histogram(
+    "http_response_render_seconds",
+    "Response rendering (serialization) time",
+    ["view", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+BUDGET_EXCEEDED = Counter(
+    "http_query_budget_exceeded_total",
+    "Requests that ran more queries than their view's budget",
+    ["view", "method"],
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryStats:
+    """execute_wrapper hook: counts queries and their wall time on every alias."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+_request_stats: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar(
+    "request_query_stats", default=None
+)
+
+
+def _count_for_request(execute, sql, params, many, context):
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def _install_counter(connection) -> None:
+    # first, not last: execute_wrapper() scopes open on this connection pop()
+    # their own wrapper on exit
+    if _count_for_request not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _count_for_request)
+
+
+@connection_created.connect
+def _on_connection_created(connection=None, **_kwargs):
+    _install_counter(connection)
+
+
+def view_query_budget(view_func: Callable, method: str) -> Optional[int]:
+    """The budget a view declares for this request, or None."""
+    owner = getattr(view_func, "cls", None) or view_func
+    budget = getattr(owner, "query_budget", None)
+    if isinstance(budget, dict):
+        action = (getattr(view_func, "actions", None) or {}).get(method.lower())
+        return budget.get(action)
+    return budget
+
+
+def _view_label(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    # url names, not paths: bounded label cardinality
+    return match.view_name or match.route or "unnamed"
+
+
+class RequestMetricsMiddleware:
+    """
+    Times the request and counts its DB work. Counting covers the whole
+    request, so queries run while rendering (lazy querysets) are included.
+    Streaming responses are measured up to their first byte.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for conn in connections.all():
+            _install_counter(conn)  # connections opened before the signal hook
+        stats, start = self._begin(request)
+        token = _request_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        return self._finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats, start = self._begin(request)
+        token = _request_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        return self._finish(request, response, stats, start)
+
+    @staticmethod
+    def _begin(request):
+        request._metrics_render_seconds = 0.0
+        request._metrics_budget = None
+        return QueryStats(), time.perf_counter()
+
+    def _finish(self, request, response, stats: QueryStats, start: float):
+        elapsed = time.perf_counter() - start
+        view, method = _view_label(request), request.method
+        REQUESTS.labels(view, method, str(response.status_code)).inc()
+        LATENCY.labels(view, method).observe(elapsed)
+        DB_QUERIES.labels(view, method).observe(stats.count)
+        DB_TIME.labels(view, method).observe(stats.seconds)
+        RENDER_TIME.labels(view, method).observe(request._metrics_render_seconds)
+        self._check_budget(request._metrics_budget, stats.count, view, method)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_budget = view_query_budget(view_func, request.method)
+        return None
+
+    def process_template_response(self, request, response):
+        # DRF Responses render after the view returns; time the renderer
+        start = time.perf_counter()
+
+        def _rendered(_response):
+            request._metrics_render_seconds = time.perf_counter() - start
+
+        response.add_post_render_callback(_rendered)
+        return response
+
+    @staticmethod
+    def _check_budget(budget: Optional[int], count: int, view: str, method: str):
+        if budget is None or count <= budget:
+            return
+        BUDGET_EXCEEDED.labels(view, method).inc()
+        msg = f"{method} {view} ran {count} queries (budget {budget})"
+        if getattr(settings, "QUERY_BUDGET_MODE", "log") == "raise":
+            raise QueryBudgetExceeded(msg)
+        logger.warning(msg)
+
+
+def metrics_view(_request):
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # several web workers: aggregate their per-process files
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
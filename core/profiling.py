@@ -0,0 +1,228 @@
+# core/profiling.py
+"""
+Opt-in sampling profiler for requests and Celery tasks.
+
+A background thread samples the target thread's stack every
+PROFILE_SAMPLE_INTERVAL seconds (sys._current_frames, no tracing hooks, so
+the profiled code runs at full speed between samples). Samples are stored as
+folded stacks ("outer;inner count" per line), which flamegraph.pl, inferno
+and speedscope read directly, under PROFILE_DIR; only the newest
+PROFILE_RETENTION files are kept.
+
+Requests: send `X-Profile: 1` (or `?profile=1`); only staff users are
+sampled, and nobody else pays for a sampler thread. Session users are checked
+by the middleware before the view runs; users authenticated by DRF (basic,
+token) are only known inside the view, so DRF views start sampling from
+ProfiledViewMixin.initial(). The response carries `X-Profile-Id`.
+
+Tasks: PROFILE_TASKS lists task names (full or short, e.g.
+"recompute_portfolio_stats_batch") or "*" for all.
+"""
+
+from __future__ import annotations
+
+import collections
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Counter, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class Sampler:
+    """Samples one thread's stack from a daemon thread until stopped."""
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter[str] = collections.Counter()
+        self.samples = 0
+        self.started = self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="profile-sampler", daemon=True
+        )
+
+    def start(self) -> "Sampler":
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self) -> "Sampler":
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return  # target thread is gone
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+def profile_dir() -> Path:
+    return Path(getattr(settings, "PROFILE_DIR", "profiles"))
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", text).strip("_")[:80] or "profile"
+
+
+def save_profile(kind: str, label: str, sampler: Sampler) -> Path:
+    """Write the folded stacks and drop the oldest files beyond the cap."""
+    root = profile_dir()
+    root.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    path = root / (
+        f"{kind}-{_slug(label)}-{stamp}-{int(sampler.elapsed * 1000)}ms"
+        f"-{threading.get_ident() % 10_000:04d}.folded"
+    )
+    path.write_text(sampler.folded())
+    _enforce_retention(root, int(getattr(settings, "PROFILE_RETENTION", 200)))
+    return path
+
+
+def _enforce_retention(root: Path, keep: int) -> None:
+    files = sorted(root.glob("*.folded"), key=lambda p: p.stat().st_mtime)
+    for old in files[: max(0, len(files) - keep)]:
+        old.unlink(missing_ok=True)
+
+
+def _interval() -> float:
+    return float(getattr(settings, "PROFILE_SAMPLE_INTERVAL", 0.005))
+
+
+# ---- requests ---------------------------------------------------------------
+
+
+def _wants_profile(request) -> bool:
+    flag = request.META.get(PROFILE_HEADER) or request.GET.get("profile")
+    return flag in ("1", "true", "yes")
+
+
+def _is_staff(request) -> bool:
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+def _start_request_sampler(request) -> None:
+    request._profile_sampler = Sampler(interval=_interval()).start()
+
+
+class ProfiledViewMixin:
+    """Starts sampling flagged requests of staff users authenticated by DRF."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        raw = request._request
+        if (
+            _wants_profile(raw)
+            and getattr(raw, "_profile_sampler", None) is None
+            and _is_staff(request)
+        ):
+            _start_request_sampler(raw)
+
+
+class ProfilingMiddleware:
+    """Samples flagged requests of staff users (see ProfiledViewMixin)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _wants_profile(request):
+            return self.get_response(request)
+        if _is_staff(request):  # session auth; DRF auth starts it in the view
+            _start_request_sampler(request)
+        try:
+            response = self.get_response(request)
+            if (
+                getattr(request, "_profile_sampler", None) is not None
+                and getattr(response, "render", None)
+                and not response.is_rendered
+            ):
+                response.render()  # include serialization in the profile
+        finally:
+            sampler = self._stop(request)
+        return self._keep(request, response, sampler)
+
+    async def __acall__(self, request):
+        if not _wants_profile(request):
+            return await self.get_response(request)
+        # request.user is lazy and may hit the session store
+        if await sync_to_async(_is_staff)(request):
+            # async views: samples the event loop thread (ORM calls made
+            # through asgiref's sync thread show up as waits in the loop)
+            _start_request_sampler(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            sampler = self._stop(request)
+        return self._keep(request, response, sampler)
+
+    @staticmethod
+    def _stop(request) -> Optional[Sampler]:
+        sampler = getattr(request, "_profile_sampler", None)
+        return sampler.stop() if sampler is not None else None
+
+    @staticmethod
+    def _keep(request, response, sampler: Optional[Sampler]):
+        if sampler is not None:
+            match = getattr(request, "resolver_match", None)
+            label = f"{request.method}-{match.view_name if match else request.path}"
+            response[PROFILE_ID_HEADER] = save_profile("request", label, sampler).name
+        return response
+
+
+# ---- Celery tasks -----------------------------------------------------------
+
+
+def _profiled_task(name: str) -> bool:
+    wanted = getattr(settings, "PROFILE_TASKS", ()) or ()
+    return "*" in wanted or name in wanted or name.rsplit(".", 1)[-1] in wanted
+
+
+@task_prerun.connect
+def _start_task_profile(task=None, **_kwargs):
+    if _profiled_task(task.name):
+        task.request._profile_sampler = Sampler(interval=_interval()).start()
+
+
+@task_postrun.connect
+def _save_task_profile(task=None, **_kwargs):
+    sampler = getattr(task.request, "_profile_sampler", None)
+    if sampler is None:
+        return
+    task.request._profile_sampler = None
+    save_profile("task", task.name, sampler.stop())
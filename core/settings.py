@@ -39,6 +39,10 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    # outermost: times the whole request and counts its DB queries
+    "core.metrics.RequestMetricsMiddleware",
+    # read_replica views read from replicas; writers are pinned to the primary
+    "core.db_router.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -46,6 +50,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # opt-in stack sampling of flagged requests (X-Profile: 1, staff only)
+    "core.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "core.urls"
@@ -69,18 +75,25 @@ TEMPLATES = [
 WSGI_APPLICATION = "core.wsgi.application"
 
 
+def _db_from_url(url):
+    u = urlparse(url)
+    if u.scheme == "sqlite":
+        # sqlite:///relative.sqlite3 or sqlite:////abs/path.sqlite3
+        return {"ENGINE": "django.db.backends.sqlite3", "NAME": u.path[1:]}
+    return {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": u.path.lstrip("/"),
+        "USER": u.username,
+        "PASSWORD": u.password,
+        "HOST": u.hostname,
+        "PORT": u.port or "5432",
+    }
+
+
 def _pg_from_env():
     url = os.environ.get("DATABASE_URL")
     if url:
-        u = urlparse(url)
-        return {
-            "ENGINE": "django.db.backends.postgresql",
-            "NAME": u.path.lstrip("/"),
-            "USER": u.username,
-            "PASSWORD": u.password,
-            "HOST": u.hostname,
-            "PORT": u.port or "5432",
-        }
+        return _db_from_url(url)
     host = os.environ.get("POSTGRES_HOST")
     if host:
         return {
@@ -96,6 +109,23 @@ def _pg_from_env():
 
 _pg = _pg_from_env()
 
+# ---- Database connections (core.db_pool) ----
+# Per-thread connections are kept for DB_CONN_MAX_AGE seconds and checked
+# before reuse, so web and Celery workers stop reconnecting per request/task.
+# Threaded commands share a pool of at most DB_POOL_SIZE connections.
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# HOST is a pgbouncer in transaction mode: named (server-side) cursors do not
+# survive its switching server connections between transactions
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "").lower() in ("1", "true", "yes")
+if _pg:
+    _pg.update(
+        CONN_MAX_AGE=DB_CONN_MAX_AGE,
+        CONN_HEALTH_CHECKS=True,
+        DISABLE_SERVER_SIDE_CURSORS=DB_PGBOUNCER,
+    )
+
 DATABASES = {
     "default": _pg
     or {
@@ -104,6 +134,26 @@ DATABASES = {
     }
 }
 
+# ---- Read replicas (core.db_router) ----
+# Comma-separated URLs (postgres://... or sqlite:///replica.sqlite3, see the
+# sync_replica command). Only read_replica views and use_replica() blocks read
+# from them; tests mirror them onto the default test database.
+DATABASE_REPLICAS = []
+for _i, _url in enumerate(
+    u for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u
+):
+    _replica = _db_from_url(_url)
+    if _replica["ENGINE"].endswith("postgresql"):
+        _replica.update(CONN_MAX_AGE=DB_CONN_MAX_AGE, CONN_HEALTH_CHECKS=True)
+    DATABASES[f"replica_{_i}"] = {**_replica, "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(f"replica_{_i}")
+DATABASE_ROUTERS = ["core.db_router.PrimaryReplicaRouter"]
+# replicas further behind than this are skipped (probed every CHECK_INTERVAL)
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "10"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5"))
+# a client stays on the primary this long after a successful write
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "15"))
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = "en-us"
@@ -114,6 +164,58 @@ USE_TZ = True
 STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# ---- Cache ----
+# Shared cache for valuation entries and their per-asset version keys; the
+# per-process LocMem fallback is only coherent for a single process (dev/tests).
+CACHE_URL = os.environ.get("CACHE_URL")
+# per-process Redis pool sizing, for core.redis_client and the cache backend
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "20"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+            "OPTIONS": {
+                "max_connections": REDIS_MAX_CONNECTIONS,
+                "socket_timeout": REDIS_SOCKET_TIMEOUT,
+                "socket_connect_timeout": REDIS_SOCKET_TIMEOUT,
+                "health_check_interval": 30,
+            },
+        }
+        if CACHE_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+VALUATION_CACHE_TTL = int(os.getenv("VALUATION_CACHE_TTL", "300"))
+
+# ---- Hot reference data (core.hot_cache) ----
+# in-process LRU in front of the shared cache; other processes see a version
+# bump within HOT_CACHE_VERSION_CHECK seconds
+HOT_CACHE_SIZE = int(os.getenv("HOT_CACHE_SIZE", "50000"))
+HOT_CACHE_TTL = float(os.getenv("HOT_CACHE_TTL", "300"))
+HOT_CACHE_SHARED_TTL = int(os.getenv("HOT_CACHE_SHARED_TTL", "3600"))
+HOT_CACHE_VERSION_CHECK = float(os.getenv("HOT_CACHE_VERSION_CHECK", "1"))
+
+# ---- Request coalescing (core.singleflight) ----
+# identical concurrent expensive reads share one computation; waiters give up
+# after SINGLEFLIGHT_TIMEOUT and compute themselves
+SINGLEFLIGHT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_TIMEOUT", "10"))
+SINGLEFLIGHT_LOCK_TTL = float(os.getenv("SINGLEFLIGHT_LOCK_TTL", "30"))
+SINGLEFLIGHT_POLL_INTERVAL = float(os.getenv("SINGLEFLIGHT_POLL_INTERVAL", "0.02"))
+
+# ---- Request metrics (/metrics) ----
+# views over their declared query_budget are logged ("log") or fail ("raise", tests)
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "log")
+
+# ---- Sampling profiler (core.profiling) ----
+# folded-stack files for flagged requests and PROFILE_TASKS; newest N are kept
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", BASE_DIR / "profiles"))
+PROFILE_RETENTION = int(os.getenv("PROFILE_RETENTION", "200"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+# task names (full or short) to profile on every run, or "*"
+PROFILE_TASKS = [t for t in os.getenv("PROFILE_TASKS", "").split(",") if t]
+
 # ---- Celery / Redis ----
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
 CELERY_IMPORTS = ("investors.tasks",)
@@ -124,6 +226,8 @@ CELERY_TASK_TIME_LIMIT = 60
 CELERY_TASK_SOFT_TIME_LIMIT = 50
 CELERY_TASK_ACKS_LATE = True
 CELERY_TASK_REJECT_ON_WORKER_LOST = True
+# workers serve task metrics (core.task_metrics) on this port when set
+CELERY_METRICS_PORT = os.getenv("CELERY_METRICS_PORT")
 
 # ---- OpenAPI / DRF schema ----
 INSTALLED_APPS += ["drf_spectacular"]
@@ -184,3 +288,37 @@ else:
             ),
         },
     }
+
+# Sharded quote refresh across workers (off unless an interval is configured)
+QUOTE_REFRESH_INTERVAL_SEC = os.getenv("QUOTE_REFRESH_INTERVAL_SEC")
+if QUOTE_REFRESH_INTERVAL_SEC:
+    CELERY_BEAT_SCHEDULE["refresh-quotes-interval"] = {
+        "task": "investors.tasks.refresh_all_quotes",
+        "schedule": float(QUOTE_REFRESH_INTERVAL_SEC),
+        "kwargs": {
+            "source": os.getenv("QUOTE_SOURCE", "demo"),
+            "shard_size": int(os.getenv("QUOTE_SHARD_SIZE", "500")),
+        },
+    }
+
+# ---- EODPrice storage (partitioning is Postgres only) ----
+EODPRICE_PARTITION_INTERVAL = os.getenv("EODPRICE_PARTITION_INTERVAL", "month")
+# daily bars older than this are rolled up into EODPriceMonthly and dropped
+EODPRICE_RETENTION_DAYS = int(os.getenv("EODPRICE_RETENTION_DAYS", "0")) or None
+CELERY_BEAT_SCHEDULE["maintain-eod-storage"] = {
+    "task": "investors.tasks.maintain_eod_storage",
+    "schedule": crontab(hour=3, minute=30),
+}
+
+# ---- Columnar price-history cache (mmap'd closes for risk/vol jobs) ----
+PRICE_CACHE_DIR = Path(os.getenv("PRICE_CACHE_DIR", BASE_DIR / "price_cache"))
+CELERY_BEAT_SCHEDULE["build-price-cache"] = {
+    "task": "investors.tasks.build_price_cache_task",
+    "schedule": crontab(hour=4, minute=0),
+}
+
+# ---- Reverse-exposure index: nightly full rebuild behind the incremental writes ----
+CELERY_BEAT_SCHEDULE["refresh-exposure-index"] = {
+    "task": "investors.tasks.refresh_exposure_index",
+    "schedule": crontab(hour=4, minute=15),
+}
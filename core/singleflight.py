@@ -0,0 +1,220 @@
+# core/singleflight.py
+"""
+Request coalescing (single-flight) for identical concurrent expensive reads.
+
+Concurrent calls with the same key share one computation:
+  - in-process, the first caller (the leader) runs it while the others wait
+    on its result;
+  - across processes, the leader first takes a lock in the shared cache
+    (Redis in production: `cache.add` is SET NX). If another process holds
+    it, the leader waits for that process's result instead, and hands it to
+    its own waiters.
+
+Results are only handed to callers that were waiting while it was computed
+(each flight publishes under its own token), so nothing is served later
+than a fresh computation would have been. A waiter that times out
+(SINGLEFLIGHT_TIMEOUT), or whose leader failed, computes independently;
+cache errors fall back to in-process coalescing only.
+
+`coalesced_view` applies this to DRF handlers, keyed by the normalized URL.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from prometheus_client import Counter
+from rest_framework.response import Response
+
+from core.db_router import STICKY_COOKIE
+
+logger = logging.getLogger(__name__)
+
+FLIGHTS = Counter(
+    "singleflight_calls_total",
+    "Coalesced calls by how they were served",
+    # leader | shared (in-process) | remote (another process) | timeout | fallback
+    ["name", "outcome"],
+)
+
+_MISSING = object()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = _MISSING
+
+
+class SingleFlight:
+    """
+    Coalesces calls per key. Timeouts default to the SINGLEFLIGHT_* settings,
+    read on use.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: Optional[float] = None,
+        lock_ttl: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+    ):
+        self.name = name
+        self._timeout = timeout
+        self._lock_ttl = lock_ttl
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+
+    @property
+    def timeout(self) -> float:
+        return settings.SINGLEFLIGHT_TIMEOUT if self._timeout is None else self._timeout
+
+    @property
+    def lock_ttl(self) -> float:
+        return (
+            settings.SINGLEFLIGHT_LOCK_TTL if self._lock_ttl is None else self._lock_ttl
+        )
+
+    @property
+    def poll_interval(self) -> float:
+        if self._poll_interval is None:
+            return settings.SINGLEFLIGHT_POLL_INTERVAL
+        return self._poll_interval
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """fn(), or the result of an identical call already in flight."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            if flight.done.wait(self.timeout) and flight.value is not _MISSING:
+                FLIGHTS.labels(self.name, "shared").inc()
+                return flight.value
+            FLIGHTS.labels(
+                self.name, "fallback" if flight.done.is_set() else "timeout"
+            ).inc()
+            return fn()
+        try:
+            flight.value = self._across_processes(key, fn)
+            return flight.value
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    # ---- distributed part (shared cache) ----
+
+    def _cache_key(self, key: str, suffix: str) -> str:
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return f"sf:{self.name}:{digest}:{suffix}"
+
+    def _across_processes(self, key: str, fn: Callable[[], Any]) -> Any:
+        lock_key = self._cache_key(key, "lock")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            token = uuid.uuid4().hex
+            try:
+                acquired = cache.add(lock_key, token, timeout=math.ceil(self.lock_ttl))
+                holder = None if acquired else cache.get(lock_key)
+            except Exception as e:  # cache down: coalesce in-process only
+                logger.warning(f"singleflight {self.name}: cache unavailable: {e}")
+                FLIGHTS.labels(self.name, "leader").inc()
+                return fn()
+            if acquired:
+                return self._lead(key, token, fn)
+            if holder is None:
+                continue  # released between add and get: try again
+            value = self._await(key, holder, deadline)
+            if value is not _MISSING:
+                FLIGHTS.labels(self.name, "remote").inc()
+                return value
+            if time.monotonic() >= deadline:
+                FLIGHTS.labels(self.name, "timeout").inc()
+                return fn()
+            # the other leader failed without publishing: take over
+
+    def _lead(self, key: str, token: str, fn: Callable[[], Any]) -> Any:
+        FLIGHTS.labels(self.name, "leader").inc()
+        lock_key = self._cache_key(key, "lock")
+        try:
+            value = fn()
+        except BaseException:
+            self._release(lock_key, token)
+            raise
+        try:
+            # kept only as long as waiters may still be polling for it
+            cache.set(
+                self._cache_key(key, token), value, timeout=math.ceil(self.timeout) + 1
+            )
+        except Exception as e:
+            logger.warning(f"singleflight {self.name}: publish failed: {e}")
+        self._release(lock_key, token)
+        return value
+
+    @staticmethod
+    def _release(lock_key: str, token: str) -> None:
+        try:
+            if cache.get(lock_key) == token:  # not expired and re-taken
+                cache.delete(lock_key)
+        except Exception:
+            pass  # expires after lock_ttl
+
+    def _await(self, key: str, token: str, deadline: float) -> Any:
+        """The holder's result, or _MISSING if it gave up or the wait timed out."""
+        result_key = self._cache_key(key, token)
+        lock_key = self._cache_key(key, "lock")
+        try:
+            while time.monotonic() < deadline:
+                value = cache.get(result_key, _MISSING)
+                if value is not _MISSING:
+                    return value
+                if cache.get(lock_key) != token:
+                    # released: published just now, or failed
+                    return cache.get(result_key, _MISSING)
+                time.sleep(self.poll_interval)
+        except Exception as e:
+            logger.warning(f"singleflight {self.name}: cache unavailable: {e}")
+        return _MISSING
+
+
+def request_key(request) -> str:
+    """Path plus sorted query params; pinned (read-your-writes) clients apart."""
+    params = sorted((k, v) for k in request.GET for v in request.GET.getlist(k))
+    pinned = ":primary" if request.COOKIES.get(STICKY_COOKIE) else ""
+    return f"{request.path}?{urlencode(params)}{pinned}"
+
+
+def coalesced_view(name: str):
+    """
+    Coalesce a DRF handler (self, request, ...) -> Response across identical
+    concurrent requests. Only status and data are shared, so the handler
+    must not depend on the user or set headers.
+    """
+    flight = SingleFlight(name)
+
+    def decorate(handler):
+        @functools.wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            def compute():
+                resp = handler(self, request, *args, **kwargs)
+                return resp.status_code, resp.data
+
+            status, data = flight.do(request_key(request), compute)
+            return Response(data, status=status)
+
+        return wrapper
+
+    return decorate
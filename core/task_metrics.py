@@ -0,0 +1,233 @@
+# core/task_metrics.py
+"""
+Celery task instrumentation through signals: queue wait (publish -> start),
+run time, time per named phase, retries, idempotency skips and per-worker
+throughput, as Prometheus metrics.
+
+Publishers stamp a `published_at` header; workers compare it with the start
+time. Tasks time their phases with `task_phase(self, "compute")` and can
+attach `run_summary(self)` to their result so fan-out callbacks can
+aggregate a whole run (see `summarize_runs`).
+
+Worker export: set CELERY_METRICS_PORT to serve /metrics from the worker.
+Prefork children need PROMETHEUS_MULTIPROC_DIR (a shared, emptied-on-start
+directory) so their samples are aggregated by the parent's server.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from celery.signals import (
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_retry,
+    worker_process_shutdown,
+    worker_ready,
+)
+from django.conf import settings
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram
+
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 15, 30, 60, 300, 900, 3600)
+RUN_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+QUEUE_WAIT = Histogram(
+    "celery_task_queue_wait_seconds",
+    "Time between publish and start",
+    ["task"],
+    buckets=WAIT_BUCKETS,
+)
+RUN_TIME = Histogram(
+    "celery_task_run_seconds",
+    "Task run time",
+    ["task", "state"],
+    buckets=RUN_BUCKETS,
+)
+PHASE_TIME = Histogram(
+    "celery_task_phase_seconds",
+    "Time spent in a named phase of a task",
+    ["task", "phase"],
+    buckets=RUN_BUCKETS,
+)
+TASKS = Counter(
+    "celery_tasks_total",
+    "Finished tasks by worker and state",
+    ["task", "worker", "state"],
+)
+ITEMS = Counter(
+    "celery_task_items_total",
+    "Work items (portfolios, assets, ...) processed by worker",
+    ["task", "worker"],
+)
+RETRIES = Counter("celery_task_retries_total", "Task retries", ["task"])
+FAILURES = Counter("celery_task_failures_total", "Task failures", ["task"])
+SKIPS = Counter("celery_task_skips_total", "Tasks that did no work", ["task", "reason"])
+
+PUBLISHED_AT_HEADER = "published_at"
+
+
+def _worker(task) -> str:
+    return getattr(task.request, "hostname", None) or "local"
+
+
+@before_task_publish.connect
+def _stamp_published_at(headers=None, **_kwargs):
+    if headers is not None:
+        headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+
+@task_prerun.connect
+def _on_prerun(task=None, **_kwargs):
+    req = task.request
+    req._metrics_started = time.perf_counter()
+    req._metrics_phases = {}
+    req._metrics_items = 0
+    req._metrics_queue_wait = None
+    # custom message headers are collected into request.headers
+    published = (req.headers or {}).get(PUBLISHED_AT_HEADER)
+    if published is not None:
+        # countdown/eta time is scheduled delay, not queueing
+        ready_at = float(published)
+        if req.eta:
+            ready_at = max(ready_at, datetime.fromisoformat(str(req.eta)).timestamp())
+        wait = max(0.0, time.time() - ready_at)
+        req._metrics_queue_wait = wait
+        QUEUE_WAIT.labels(task.name).observe(wait)
+
+
+@task_postrun.connect
+def _on_postrun(task=None, state=None, **_kwargs):
+    req = task.request
+    started = getattr(req, "_metrics_started", None)
+    if started is None:
+        return
+    state = state or "UNKNOWN"
+    RUN_TIME.labels(task.name, state).observe(time.perf_counter() - started)
+    TASKS.labels(task.name, _worker(task), state).inc()
+
+
+@task_retry.connect
+def _on_retry(sender=None, **_kwargs):
+    RETRIES.labels(getattr(sender, "name", "unknown")).inc()
+
+
+@task_failure.connect
+def _on_failure(sender=None, **_kwargs):
+    FAILURES.labels(getattr(sender, "name", "unknown")).inc()
+
+
+@contextlib.contextmanager
+def task_phase(task, name: str):
+    """Time one phase of the running task (metric + its run summary)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        PHASE_TIME.labels(task.name, name).observe(elapsed)
+        phases = getattr(task.request, "_metrics_phases", None)
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + elapsed
+
+
+def record_items(task, n: int) -> None:
+    ITEMS.labels(task.name, _worker(task)).inc(n)
+    task.request._metrics_items = getattr(task.request, "_metrics_items", 0) + n
+
+
+def record_skip(task, reason: str = "idempotent") -> None:
+    SKIPS.labels(task.name, reason).inc()
+
+
+def run_summary(task) -> dict:
+    """Measurements of the running task, for its result payload."""
+    req = task.request
+    started = getattr(req, "_metrics_started", None)
+    wait = getattr(req, "_metrics_queue_wait", None)
+    return {
+        "worker": _worker(task),
+        "queue_wait": None if wait is None else round(wait, 4),
+        "run_seconds": (
+            None if started is None else round(time.perf_counter() - started, 4)
+        ),
+        "phases": {
+            k: round(v, 4) for k, v in getattr(req, "_metrics_phases", {}).items()
+        },
+        "items": getattr(req, "_metrics_items", 0),
+        "retries": req.retries or 0,
+    }
+
+
+def _percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize_runs(metrics: Iterable[Optional[dict]]) -> dict:
+    """
+    Aggregate `run_summary` payloads of a fan-out: queue wait percentiles,
+    phase totals, and items/s per worker (items over that worker's busy time).
+    """
+    metrics = [m for m in metrics if m]
+    waits = sorted(m["queue_wait"] for m in metrics if m["queue_wait"] is not None)
+    phases: Dict[str, float] = {}
+    workers: Dict[str, Dict[str, float]] = {}
+    for m in metrics:
+        for name, secs in m["phases"].items():
+            phases[name] = phases.get(name, 0.0) + secs
+        w = workers.setdefault(m["worker"], {"tasks": 0, "items": 0, "busy": 0.0})
+        w["tasks"] += 1
+        w["items"] += m["items"]
+        w["busy"] += m["run_seconds"] or 0.0
+    return {
+        "tasks": len(metrics),
+        "retries": sum(m["retries"] for m in metrics),
+        "queue_wait": {
+            "p50": _percentile(waits, 0.5),
+            "p95": _percentile(waits, 0.95),
+            "max": waits[-1] if waits else None,
+        },
+        "phases": {k: round(v, 3) for k, v in phases.items()},
+        "workers": {
+            name: {
+                "tasks": w["tasks"],
+                "items": w["items"],
+                "busy_seconds": round(w["busy"], 3),
+                "items_per_sec": (
+                    round(w["items"] / w["busy"], 1) if w["busy"] else None
+                ),
+            }
+            for name, w in workers.items()
+        },
+    }
+
+
+@worker_ready.connect
+def _serve_worker_metrics(**_kwargs):
+    port = getattr(settings, "CELERY_METRICS_PORT", None)
+    if not port:
+        return
+    from prometheus_client import start_http_server
+
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    start_http_server(int(port), registry=registry)
+
+
+@worker_process_shutdown.connect
+def _mark_child_dead(pid=None, **_kwargs):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid or os.getpid())
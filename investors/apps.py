@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class InvestorsConfig(AppConfig):
+    name = "investors"
+
+    def ready(self):
+        # signal receivers that invalidate the hot reference-data caches
+        from investors import refdata_services  # noqa: F401
@@ -0,0 +1,131 @@
+"""
+Async (ASGI) variants of the read-heavy endpoints, under /api/async/.
+
+Same payloads as the DRF views, built with the async ORM (acount/aaggregate/
+async iteration) and the async cache API, so a slow aggregate awaits instead
+of holding a worker thread. Plain Django views: DRF has no async views.
+Under WSGI they still work (Django runs them in an event loop per request);
+the gain needs an ASGI server, see core/asgi.py.
+"""
+
+from __future__ import annotations
+
+import functools
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from django.core.cache import cache
+from django.http import HttpResponseNotAllowed, HttpResponseNotModified, JsonResponse
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from investors.metrics_services import annotate_metrics
+from investors.models import Asset, Portfolio
+from investors.views import analytics_payload, analytics_queries
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 500
+CACHED_LIST_TTL = 60
+
+
+def read_only(query_budget: int):
+    """GET/HEAD only, replica-routed, with a query budget (core.metrics)."""
+
+    def decorate(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return HttpResponseNotAllowed(["GET", "HEAD"])
+            return await view(request, *args, **kwargs)
+
+        wrapper.query_budget = query_budget
+        wrapper.read_replica = True
+        return wrapper
+
+    return decorate
+
+
+def _int_param(request, name: str, default: int) -> int:
+    try:
+        return max(0, int(request.GET.get(name, default)))
+    except ValueError:
+        return default
+
+
+@read_only(query_budget=2)
+async def asset_list(request):
+    """?limit=&offset= pages in the shape of DRF's LimitOffsetPagination."""
+    limit = min(_int_param(request, "limit", PAGE_SIZE), MAX_PAGE_SIZE) or PAGE_SIZE
+    offset = _int_param(request, "offset", 0)
+    qs = Asset.objects.order_by("id").values(
+        "id", "name", "category", "price", "volatility"
+    )
+    count = await qs.acount()
+    results = [row async for row in qs[offset : offset + limit]]
+
+    url = request.build_absolute_uri()
+    nxt = prev = None
+    if offset + limit < count:
+        nxt = replace_query_param(
+            replace_query_param(url, "limit", limit), "offset", offset + limit
+        )
+    if offset > 0:
+        prev = replace_query_param(url, "limit", limit)
+        prev = (
+            remove_query_param(prev, "offset")
+            if offset - limit <= 0
+            else replace_query_param(prev, "offset", offset - limit)
+        )
+    return JsonResponse(
+        {"count": count, "next": nxt, "previous": prev, "results": results}
+    )
+
+
+@read_only(query_budget=3)
+async def cached_asset_list(request):
+    """CachedAssetListView with the body cached per ETag (async cache API)."""
+    qs = Asset.objects.only("id", "name").order_by("id")
+    count = await qs.acount()
+    last = await qs.alast()
+    max_id = last.id if last else 0
+
+    etag = f'W/"assets:{count}:{max_id}"'
+    last_mod = format_datetime(datetime.fromtimestamp(max(1, max_id), tz=timezone.utc))
+    if request.headers.get("If-None-Match") == etag or (
+        request.headers.get("If-Modified-Since") == last_mod
+    ):
+        resp = HttpResponseNotModified()
+    else:
+        key = f"assets:cached-list:{count}:{max_id}"
+        data = await cache.aget(key)
+        if data is None:
+            data = [row async for row in qs.values("id", "name")]
+            await cache.aset(key, data, CACHED_LIST_TTL)
+        resp = JsonResponse(data, safe=False)
+    resp["ETag"] = etag
+    resp["Last-Modified"] = last_mod
+    return resp
+
+
+@read_only(query_budget=4)
+async def asset_analytics(request):
+    q = analytics_queries()
+    return JsonResponse(
+        analytics_payload(
+            summary=await q.interesting.aaggregate(**q.summary),
+            per_band=[row async for row in q.per_band],
+            daily_move=await q.daily_move.aaggregate(**q.daily_move_stats),
+            valuation=await q.interesting.aaggregate(**q.valuation),
+        )
+    )
+
+
+@read_only(query_budget=1)
+async def portfolio_stats(request, pk: int):
+    row = await (
+        annotate_metrics(Portfolio.objects.filter(pk=pk))
+        .values("port_vol", "sharpe_proxy")
+        .afirst()
+    )
+    if row is None:
+        return JsonResponse({"detail": "Not found."}, status=404)
+    return JsonResponse({"volatility": row["port_vol"], "sharpe": row["sharpe_proxy"]})
@@ -0,0 +1,440 @@
+"""
+Benchmark suite for the hot paths, over a deterministically seeded book.
+
+Each benchmark's setup (not timed) returns a thunk; the thunk is timed over
+`repeat` runs after `warmup` runs, with the queries of the last run counted.
+Benchmarks that write run inside a transaction that is rolled back, so every
+run sees the same data. Results are plain JSON; `compare` checks them
+against a stored baseline.
+"""
+
+import contextlib
+import json
+import platform
+import random
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory
+
+from core.metrics import QueryStats
+
+from investors.bulk_loader import SeedPlan, SeedScale, load_synthetic
+from investors.management import cpu_risk
+from investors.management.commands.order_queue import OrderMsg, process_order
+from investors.management.utils.parser_and_financial_computations import (
+    annualized_volatility_batch,
+    demo_quote,
+    parse_yahoo_chart_payload,
+)
+from investors.metrics_services import annotate_metrics, recompute_portfolio_stats
+from investors.models import Asset, Investor, Portfolio, Position
+from investors.quote_services import apply_quotes
+from investors.refdata_services import bump_asset_refs, bump_investor_refs
+from investors.scenario_services import load_book
+from investors.serializers import PortfolioUpsertSerializer
+from investors.views import AssetAnalyticsView, PortfolioViewSet
+
+RESULTS_VERSION = 1
+
+
+@dataclass
+class BenchContext:
+    scale_name: str
+    scale: SeedScale
+    seed: int
+    portfolio_ids: List[int] = field(default_factory=list)
+    asset_ids: List[int] = field(default_factory=list)
+
+    def rng(self, name: str) -> random.Random:
+        return random.Random(f"{self.seed}:{name}")
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[[BenchContext], Callable[[], object]]
+    writes: bool = False
+
+
+@dataclass
+class BenchResult:
+    name: str
+    runs: List[float]
+    queries: int
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.runs)
+
+    def as_dict(self) -> dict:
+        ordered = sorted(self.runs)
+        return {
+            "median_s": self.median,
+            "min_s": ordered[0],
+            "p95_s": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+            "mean_s": statistics.fmean(ordered),
+            "runs": len(ordered),
+            "queries": self.queries,
+        }
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, writes: bool = False):
+    def register(setup):
+        BENCHMARKS[name] = Benchmark(name, setup, writes)
+        return setup
+
+    return register
+
+
+# ---- the hot paths --------------------------------------------------------
+
+
+@benchmark("annotate_metrics_list")
+def _annotate_metrics_list(ctx: BenchContext):
+    # one page of the default list ordering, evaluated without serialization
+    def run():
+        qs = annotate_metrics(Portfolio.objects.all()).select_related("investor")
+        return list(qs.order_by("-sharpe_proxy")[:100])
+
+    return run
+
+
+@benchmark("portfolio_list_api")
+def _portfolio_list_api(ctx: BenchContext):
+    view = PortfolioViewSet.as_view({"get": "list"})
+    factory = APIRequestFactory(SERVER_NAME="localhost")
+
+    def run():
+        return view(factory.get("/api/portfolios/", {"limit": 100})).render()
+
+    return run
+
+
+@benchmark("asset_analytics_view")
+def _asset_analytics(ctx: BenchContext):
+    view = AssetAnalyticsView.as_view()
+    factory = APIRequestFactory(SERVER_NAME="localhost")
+
+    def run():
+        return view(factory.get("/api/assets/analytics/")).render()
+
+    return run
+
+
+@benchmark("portfolio_bulk_upsert", writes=True)
+def _bulk_upsert(ctx: BenchContext):
+    rng = ctx.rng("upsert")
+    emails = list(Investor.objects.order_by("id").values_list("email", flat=True))
+    # half existing (update path), half new names
+    payload = [
+        {
+            "name": f"Portfolio-{i}" if i % 2 else f"Bench-{i}",
+            "investor_email": rng.choice(emails),
+        }
+        for i in range(min(200, len(ctx.portfolio_ids)))
+    ]
+
+    def run():
+        ser = PortfolioUpsertSerializer(data=payload, many=True)
+        ser.is_valid(raise_exception=True)
+        return ser.save()
+
+    return run
+
+
+@benchmark("order_processing", writes=True)
+def _order_processing(ctx: BenchContext):
+    rng = ctx.rng("orders")
+    held = list(Position.objects.order_by("id").values_list("portfolio_id", "asset_id"))
+    orders = [
+        OrderMsg(
+            portfolio_id=pid,
+            asset_id=aid,
+            qty=Decimal(rng.randint(1, 20)),
+            price=Decimal(f"{rng.uniform(5, 500):.2f}"),
+            order_id=str(i),
+        )
+        for i, (pid, aid) in enumerate(rng.sample(held, min(100, len(held))))
+    ]
+
+    def run():
+        for msg in orders:
+            process_order(msg)
+
+    return run
+
+
+@benchmark("portfolio_bulk_upsert_cold", writes=True)
+def _bulk_upsert_cold(ctx: BenchContext):
+    # as above with the email -> id refs dropped first (two-tier cache miss)
+    run = _bulk_upsert(ctx)
+
+    def cold():
+        bump_investor_refs()
+        return run()
+
+    return cold
+
+
+@benchmark("order_processing_cold", writes=True)
+def _order_processing_cold(ctx: BenchContext):
+    run = _order_processing(ctx)
+
+    def cold():
+        bump_asset_refs()
+        return run()
+
+    return cold
+
+
+@benchmark("quote_apply", writes=True)
+def _quote_apply(ctx: BenchContext):
+    quotes = {aid: demo_quote(f"SYN{aid}x") for aid in ctx.asset_ids}
+
+    def run():
+        return apply_quotes(quotes)
+
+    return run
+
+
+@benchmark("var_monte_carlo")
+def _var_monte_carlo(ctx: BenchContext):
+    # the per-portfolio Monte Carlo task the process pool runs
+    rng = ctx.rng("var")
+    rows = Position.objects.filter(
+        portfolio_id__in=rng.sample(ctx.portfolio_ids, min(4, len(ctx.portfolio_ids)))
+    ).values_list("portfolio_id", "quantity", "asset__price", "asset__volatility")
+    books: Dict[int, List[cpu_risk.Position]] = {}
+    for pid, qty, price, vol in rows:
+        books.setdefault(pid, []).append(
+            cpu_risk.Position(float(qty), price or 0.0, vol or 0.0)
+        )
+
+    def run():
+        random.seed(ctx.seed)
+        return [cpu_risk.task(positions, 20_000) for positions in books.values()]
+
+    return run
+
+
+@benchmark("var_parametric_book")
+def _var_parametric_book(ctx: BenchContext):
+    # whole-book load + revaluation + parametric VaR (scenario engine base)
+    def run():
+        return load_book().base_var
+
+    return run
+
+
+@benchmark("volatility_parser")
+def _volatility_parser(ctx: BenchContext):
+    rng = ctx.rng("vol")
+    payloads = []
+    for _ in range(500):
+        closes, price = [], rng.uniform(10, 500)
+        for _ in range(63):
+            price *= 1.0 + rng.gauss(0.0, 0.02)
+            closes.append(None if rng.random() < 0.02 else round(price, 4))
+        payloads.append(
+            {"chart": {"result": [{"indicators": {"quote": [{"close": closes}]}}]}}
+        )
+
+    def run():
+        return [parse_yahoo_chart_payload(p) for p in payloads]
+
+    return run
+
+
+@benchmark("volatility_batch")
+def _volatility_batch(ctx: BenchContext):
+    steps = np.random.default_rng(ctx.seed).normal(0.0, 0.02, (2000, 253))
+    closes = 100.0 * np.exp(np.cumsum(steps, axis=1))
+
+    def run():
+        return annualized_volatility_batch(closes)
+
+    return run
+
+
+# ---- running ----------------------------------------------------------------
+
+
+def seed_book(
+    scale_name: str, scale: SeedScale, seed: int, defer_indexes: bool = True
+) -> BenchContext:
+    """Seed the synthetic book into the current (empty) database and index it."""
+    load_synthetic(
+        SeedPlan.after_existing(scale, seed=seed),
+        workers=0,
+        defer_indexes=defer_indexes,
+    )
+    recompute_portfolio_stats()
+    if connection.vendor == "postgresql":
+        # planner statistics for the fresh tables, as autovacuum would
+        with connection.cursor() as cur:
+            cur.execute("ANALYZE")
+    return context_for(scale_name, scale, seed)
+
+
+@contextlib.contextmanager
+def throwaway_database():
+    """A fresh test database (SQLite in memory, test_<name> on Postgres) for seeding."""
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def context_for(scale_name: str, scale: SeedScale, seed: int) -> BenchContext:
+    return BenchContext(
+        scale_name,
+        scale,
+        seed,
+        portfolio_ids=list(
+            Portfolio.objects.order_by("id").values_list("id", flat=True)
+        ),
+        asset_ids=list(Asset.objects.order_by("id").values_list("id", flat=True)),
+    )
+
+
+def measure(
+    bench: Benchmark, ctx: BenchContext, repeat: int = 5, warmup: int = 1
+) -> BenchResult:
+    run = bench.setup(ctx)
+    timings, queries = [], 0
+    for i in range(warmup + repeat):
+        # writers are rolled back so every run starts from the same rows
+        scope = transaction.atomic() if bench.writes else contextlib.nullcontext()
+        stats = QueryStats()
+        with connection.execute_wrapper(stats), scope:
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            if bench.writes:
+                transaction.set_rollback(True)
+        if i >= warmup:
+            timings.append(elapsed)
+            queries = stats.count
+    return BenchResult(bench.name, timings, queries)
+
+
+def run_suite(
+    ctx: BenchContext,
+    only: Optional[Sequence[str]] = None,
+    repeat: int = 5,
+    warmup: int = 1,
+    on_result: Optional[Callable[[BenchResult], None]] = None,
+) -> dict:
+    names = list(only) if only else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"unknown benchmarks: {sorted(unknown)}")
+    results = {}
+    for name in names:
+        res = measure(BENCHMARKS[name], ctx, repeat=repeat, warmup=warmup)
+        results[name] = res.as_dict()
+        if on_result:
+            on_result(res)
+    return {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "scale": ctx.scale_name,
+            "dataset": asdict(ctx.scale),
+            "seed": ctx.seed,
+            "vendor": connection.vendor,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "repeat": repeat,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+        "benchmarks": results,
+    }
+
+
+# ---- baselines --------------------------------------------------------------
+
+
+@dataclass
+class Comparison:
+    name: str
+    status: str  # "ok" | "regression" | "improved" | "new" | "missing"
+    baseline_s: Optional[float] = None
+    current_s: Optional[float] = None
+    baseline_queries: Optional[int] = None
+    current_queries: Optional[int] = None
+
+    @property
+    def ratio(self) -> Optional[float]:
+        if not self.baseline_s or self.current_s is None:
+            return None
+        return self.current_s / self.baseline_s
+
+
+def compare(
+    current: dict,
+    baseline: dict,
+    threshold: float = 0.2,
+    min_delta_s: float = 0.001,
+) -> List[Comparison]:
+    """
+    Median vs baseline median per benchmark. Slower by more than `threshold`
+    (and by at least `min_delta_s`, so sub-millisecond noise never trips it),
+    or any increase in the query count, is a regression.
+    """
+    for key in ("scale", "vendor", "dataset"):
+        if current["meta"].get(key) != baseline["meta"].get(key):
+            raise ValueError(
+                f"baseline {key}={baseline['meta'].get(key)!r} does not match "
+                f"{current['meta'].get(key)!r}"
+            )
+    cur, base = current["benchmarks"], baseline["benchmarks"]
+    out = []
+    for name in list(cur) + [n for n in base if n not in cur]:
+        c, b = cur.get(name), base.get(name)
+        if b is None:
+            out.append(Comparison(name, "new", current_s=c["median_s"]))
+            continue
+        if c is None:
+            out.append(Comparison(name, "missing", baseline_s=b["median_s"]))
+            continue
+        cmp = Comparison(
+            name,
+            "ok",
+            b["median_s"],
+            c["median_s"],
+            b.get("queries"),
+            c.get("queries"),
+        )
+        delta = c["median_s"] - b["median_s"]
+        if (cmp.current_queries or 0) > (cmp.baseline_queries or 0):
+            cmp.status = "regression"
+        elif delta > min_delta_s and cmp.ratio > 1.0 + threshold:
+            cmp.status = "regression"
+        elif -delta > min_delta_s and cmp.ratio < 1.0 - threshold:
+            cmp.status = "improved"
+        out.append(cmp)
+    return out
+
+
+def write_results(path, results: dict) -> None:
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def read_results(path) -> dict:
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,436 @@
+import contextlib
+import io
+import math
+import random
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+
+from investors.eod_partitions import ensure_partitions_for, is_partitioned
+from investors.exposure_services import refresh_exposure
+from investors.latest_services import rebuild_latest
+from investors.models import (
+    Asset,
+    EODPrice,
+    Investor,
+    InvestorProfile,
+    Portfolio,
+    Position,
+)
+
+Row = Tuple
+CHUNK_ROWS = 20_000
+
+
+# ---- writing -------------------------------------------------------------
+
+
+def _copy_value(v) -> str:
+    if v is None:
+        return r"\N"
+    if isinstance(v, float):
+        return repr(v)
+    if isinstance(v, datetime):
+        return v.isoformat()
+    return str(v)
+
+
+def copy_into(cur, table: str, columns: Sequence[str], rows: Iterable[Row]) -> None:
+    """COPY rows into `table` through one text buffer (no tabs/newlines in values)."""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_value(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    cols = ", ".join(connection.ops.quote_name(c) for c in columns)
+    cur.copy_expert(f"COPY {connection.ops.quote_name(table)} ({cols}) FROM STDIN", buf)
+
+
+def write_rows(
+    model: type, fields: Sequence[str], rows: List[Row], batch_size: int = 2000
+) -> None:
+    """COPY on Postgres, batched bulk_create elsewhere. `fields` are attnames."""
+    if not rows:
+        return
+    if connection.vendor == "postgresql":
+        columns = [model._meta.get_field(f).column for f in fields]
+        with connection.cursor() as cur:
+            copy_into(cur, model._meta.db_table, columns, rows)
+        return
+    objs = [model(**dict(zip(fields, row))) for row in rows]
+    model.objects.bulk_create(objs, batch_size=batch_size)
+
+
+def reset_sequences(*models_: type) -> None:
+    # explicit ids bypass Postgres sequences; move them past the loaded ids
+    sql = connection.ops.sequence_reset_sql(no_style(), list(models_))
+    if sql:
+        with connection.cursor() as cur:
+            for stmt in sql:
+                cur.execute(stmt)
+
+
+class deferred_indexes:
+    """
+    Drop the declared secondary indexes of `models_` for the duration of a
+    load and rebuild them once at the end, instead of maintaining every
+    btree row by row. Unique constraints stay in place.
+    """
+
+    def __init__(self, *models_: type):
+        self.models = models_
+        self.rebuild_sec = 0.0
+
+    def __enter__(self):
+        with connection.schema_editor() as editor:
+            for model in self.models:
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+        return self
+
+    def __exit__(self, *exc):
+        start = time.perf_counter()
+        with connection.schema_editor() as editor:
+            for model in self.models:
+                for index in model._meta.indexes:
+                    editor.add_index(model, index)
+        self.rebuild_sec = time.perf_counter() - start
+
+
+# ---- generation ----------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class SeedScale:
+    investors: int
+    assets: int
+    portfolios: int
+    assets_per_portfolio: int
+    eod_days: int
+
+
+SCALE_PRESETS: Dict[str, SeedScale] = {
+    "tiny": SeedScale(100, 50, 300, 8, 0),
+    "small": SeedScale(1_000, 500, 3_000, 10, 60),
+    "medium": SeedScale(10_000, 2_000, 50_000, 10, 252),
+    "large": SeedScale(100_000, 5_000, 250_000, 12, 252),
+    "xl": SeedScale(300_000, 10_000, 1_000_000, 12, 504),
+}
+
+
+@dataclass(frozen=True)
+class SeedPlan:
+    scale: SeedScale
+    seed: int
+    investor_base: int
+    asset_base: int
+    portfolio_base: int
+    chunk_rows: int = CHUNK_ROWS
+
+    @classmethod
+    def after_existing(cls, scale: SeedScale, seed: int = 0, **kw) -> "SeedPlan":
+        # append after the current max ids so reruns don't collide
+        def next_id(model):
+            return (model.objects.aggregate(m=models.Max("id"))["m"] or 0) + 1
+
+        return cls(
+            scale,
+            seed,
+            next_id(Investor),
+            next_id(Asset),
+            next_id(Portfolio),
+            **kw,
+        )
+
+
+def _rng(plan: SeedPlan, kind: str, chunk: int) -> random.Random:
+    # deterministic per (seed, table, chunk), whichever process generates it
+    return random.Random(f"{plan.seed}:{kind}:{chunk}")
+
+
+def _gen_investors(plan: SeedPlan, lo: int, hi: int, _rng_) -> List[Row]:
+    return [
+        (
+            plan.investor_base + i,
+            f"investor{plan.investor_base + i}",
+            f"seed{plan.investor_base + i}@example.com",
+        )
+        for i in range(lo, hi)
+    ]
+
+
+def _gen_profiles(plan: SeedPlan, lo: int, hi: int, rng) -> List[Row]:
+    tolerances = ("low", "medium", "high")
+    levels = ("Beginner", "Intermediate", "Expert")
+    return [
+        (plan.investor_base + i, rng.choice(tolerances), rng.choice(levels))
+        for i in range(lo, hi)
+    ]
+
+
+def _gen_assets(plan: SeedPlan, lo: int, hi: int, rng) -> List[Row]:
+    categories = ("Equity", "Equity", "Equity", "Bond", "ETF", "Crypto")
+    return [
+        (
+            plan.asset_base + i,
+            f"SYN{plan.asset_base + i}",
+            rng.choice(categories),
+            round(rng.uniform(5, 500), 2),
+            round(rng.uniform(0.08, 0.6), 4),
+        )
+        for i in range(lo, hi)
+    ]
+
+
+def _gen_portfolios(plan: SeedPlan, lo: int, hi: int, _rng_) -> List[Row]:
+    n_inv = plan.scale.investors
+    return [
+        (plan.portfolio_base + i, plan.investor_base + i % n_inv, f"Portfolio-{i}")
+        for i in range(lo, hi)
+    ]
+
+
+def _portfolio_picks(
+    plan: SeedPlan, lo: int, hi: int, rng
+) -> Iterator[Tuple[int, int]]:
+    s = plan.scale
+    k = min(s.assets_per_portfolio, s.assets)
+    for i in range(lo, hi):
+        for a in rng.sample(range(s.assets), k):
+            yield plan.portfolio_base + i, plan.asset_base + a
+
+
+def _gen_links(plan: SeedPlan, lo: int, hi: int, rng) -> List[Row]:
+    return list(_portfolio_picks(plan, lo, hi, rng))
+
+
+def _gen_positions(plan: SeedPlan, lo: int, hi: int, rng) -> List[Row]:
+    now = datetime.now(dt_timezone.utc)
+    # re-seeded with the links' rng so positions match the m2m picks exactly
+    picks = _portfolio_picks(plan, lo, hi, _rng(plan, "links", lo))
+    return [
+        (
+            pid,
+            aid,
+            Decimal(rng.randint(1, 500)),
+            Decimal(f"{rng.uniform(5, 500):.6f}"),
+            now,
+            now,
+        )
+        for pid, aid in picks
+    ]
+
+
+def eod_dates(days: int, end: Optional[date] = None) -> List[date]:
+    """The last `days` weekdays up to `end`, oldest first."""
+    dates = []
+    d = end or date.today()
+    while len(dates) < days:
+        if d.weekday() < 5:
+            dates.append(d)
+        d -= timedelta(days=1)
+    dates.reverse()
+    return dates
+
+
+def _gen_eod(plan: SeedPlan, lo: int, hi: int, rng) -> List[Row]:
+    dates = eod_dates(plan.scale.eod_days)
+    rows = []
+    for a in range(lo, hi):
+        px = rng.uniform(5, 500)
+        sigma = rng.uniform(0.08, 0.6) / math.sqrt(252.0)
+        for day in dates:
+            px *= math.exp(rng.gauss(0.0, sigma))
+            rows.append(
+                (
+                    plan.asset_base + a,
+                    day,
+                    Decimal(f"{px:.6f}"),
+                    rng.randint(10_000, 10_000_000),
+                )
+            )
+    return rows
+
+
+# kind -> (chunk generator, entity count for a scale, target model, attnames)
+_TABLES: Dict[
+    str, Tuple[Callable, Callable[[SeedScale], int], type, Tuple[str, ...]]
+] = {
+    "investors": (
+        _gen_investors,
+        lambda s: s.investors,
+        Investor,
+        ("id", "name", "email"),
+    ),
+    "profiles": (
+        _gen_profiles,
+        lambda s: s.investors,
+        InvestorProfile,
+        ("investor_id", "risk_tolerance", "experience_level"),
+    ),
+    "assets": (
+        _gen_assets,
+        lambda s: s.assets,
+        Asset,
+        ("id", "name", "category", "price", "volatility"),
+    ),
+    "portfolios": (
+        _gen_portfolios,
+        lambda s: s.portfolios,
+        Portfolio,
+        ("id", "investor_id", "name"),
+    ),
+    "links": (
+        _gen_links,
+        lambda s: s.portfolios,
+        Portfolio.assets.through,
+        ("portfolio_id", "asset_id"),
+    ),
+    "positions": (
+        _gen_positions,
+        lambda s: s.portfolios,
+        Position,
+        (
+            "portfolio_id",
+            "asset_id",
+            "quantity",
+            "avg_price",
+            "created_at",
+            "updated_at",
+        ),
+    ),
+    "eod": (
+        _gen_eod,
+        lambda s: s.assets,
+        EODPrice,
+        ("asset_id", "date", "close", "volume"),
+    ),
+}
+
+LOAD_ORDER = (
+    "investors",
+    "profiles",
+    "assets",
+    "portfolios",
+    "links",
+    "positions",
+    "eod",
+)
+
+
+def _entities_per_chunk(plan: SeedPlan, kind: str) -> int:
+    # keep every chunk at ~chunk_rows output rows, whatever the fan-out per entity
+    s = plan.scale
+    rows_per_entity = {
+        "links": s.assets_per_portfolio,
+        "positions": s.assets_per_portfolio,
+        "eod": max(1, s.eod_days),
+    }.get(kind, 1)
+    return max(1, plan.chunk_rows // rows_per_entity)
+
+
+def generate_chunk(plan: SeedPlan, kind: str, lo: int, hi: int) -> List[Row]:
+    """Top-level so it can run in a worker process."""
+    gen = _TABLES[kind][0]
+    return gen(plan, lo, hi, _rng(plan, kind, lo))
+
+
+def _bounded_map(
+    pool: Optional[Executor], fn: Callable, jobs: Iterable[tuple], window: int
+) -> Iterator:
+    """Ordered map with at most `window` chunks in flight, so memory stays bounded."""
+    if pool is None:
+        for args in jobs:
+            yield fn(*args)
+        return
+    pending: List[Future] = []
+    for args in jobs:
+        pending.append(pool.submit(fn, *args))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for fut in pending:
+        yield fut.result()
+
+
+@dataclass
+class TableLoadStats:
+    table: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def load_synthetic(
+    plan: SeedPlan,
+    workers: int = 0,
+    defer_indexes: bool = True,
+    on_table: Optional[Callable[[TableLoadStats], None]] = None,
+) -> List[TableLoadStats]:
+    """
+    Generate and load a synthetic book table by table. Chunks are generated
+    in `workers` processes (0 = inline) and written in order from this one.
+    """
+    stats: List[TableLoadStats] = []
+    window = 2 * max(1, workers)
+    with contextlib.ExitStack() as stack:
+        pool = (
+            stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            if workers
+            else None
+        )
+        deferred = None
+        if defer_indexes:
+            # partitioned EODPrice keeps its per-partition (BRIN) indexes
+            deferrable = (Position,) if is_partitioned() else (Position, EODPrice)
+            deferred = stack.enter_context(deferred_indexes(*deferrable))
+        for kind in LOAD_ORDER:
+            _gen, count_of, model, fields = _TABLES[kind]
+            total = count_of(plan.scale)
+            if kind == "eod" and not plan.scale.eod_days:
+                total = 0
+            if kind == "eod" and total:
+                dates = eod_dates(plan.scale.eod_days)
+                ensure_partitions_for([dates[0], dates[-1]])
+            step = _entities_per_chunk(plan, kind)
+            jobs = (
+                (plan, kind, lo, min(lo + step, total)) for lo in range(0, total, step)
+            )
+            start, n = time.perf_counter(), 0
+            with transaction.atomic():
+                for rows in _bounded_map(pool, generate_chunk, jobs, window):
+                    write_rows(model, fields, rows)
+                    n += len(rows)
+            st = TableLoadStats(model._meta.db_table, n, time.perf_counter() - start)
+            stats.append(st)
+            if on_table:
+                on_table(st)
+    if deferred is not None:
+        # the ExitStack has rebuilt the indexes by now
+        stats.append(TableLoadStats("(index rebuild)", 0, deferred.rebuild_sec))
+    # seeded rows bypass the ingestion paths, so derived per-asset tables are
+    # filled in one pass each once the indexes are back
+    derived = [("investors_assetexposure", refresh_exposure)]
+    if plan.scale.eod_days:
+        derived.append(("investors_assetlatest", rebuild_latest))
+    ids = range(plan.asset_base, plan.asset_base + plan.scale.assets)
+    for table, rebuild in derived:
+        start = time.perf_counter()
+        with transaction.atomic():
+            n = rebuild(ids)
+        st = TableLoadStats(table, n, time.perf_counter() - start)
+        stats.append(st)
+        if on_table:
+            on_table(st)
+    if connection.vendor == "postgresql":
+        reset_sequences(Investor, Asset, Portfolio)
+    return stats
@@ -0,0 +1,225 @@
+"""
+Range partitioning of EODPrice by date (Postgres only).
+
+Migration 0006 turns `investors_eodprice` into a table partitioned by
+RANGE (date) with one child per month (or year, EODPRICE_PARTITION_INTERVAL)
+and a BRIN index on date. Inserts into the parent are routed by Postgres,
+but a partition must exist first, so every bulk writer calls
+`ensure_partitions_for` with the dates it is about to write. On other
+backends the helpers are no-ops and retention falls back to DELETE.
+"""
+
+from datetime import date, timedelta
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from investors.models import EODPrice, EODPriceMonthly
+
+PARENT = "investors_eodprice"
+
+
+def partition_interval() -> str:
+    return getattr(settings, "EODPRICE_PARTITION_INTERVAL", "month")
+
+
+def is_partitioned(conn=connection) -> bool:
+    if conn.vendor != "postgresql":
+        return False
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT 1 FROM pg_partitioned_table pt"
+            " JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s",
+            [PARENT],
+        )
+        return cur.fetchone() is not None
+
+
+def partition_bounds(day: date, interval: str) -> Tuple[str, date, date]:
+    """(name, start, end) of the partition holding `day`; end is exclusive."""
+    if interval == "year":
+        start = date(day.year, 1, 1)
+        return f"{PARENT}_y{day.year}", start, date(day.year + 1, 1, 1)
+    start = date(day.year, day.month, 1)
+    end = date(day.year + (day.month == 12), day.month % 12 + 1, 1)
+    return f"{PARENT}_p{day.year}_{day.month:02d}", start, end
+
+
+def _bounds_between(
+    first: date, last: date, interval: str
+) -> Iterable[Tuple[str, date, date]]:
+    day = first
+    while day <= last:
+        bounds = partition_bounds(day, interval)
+        yield bounds
+        day = bounds[2]
+
+
+def create_partitions(
+    cur, first: date, last: date, interval: Optional[str] = None
+) -> List[str]:
+    """Create every missing partition covering [first, last] through `cur`."""
+    created = []
+    for name, start, end in _bounds_between(
+        first, last, interval or partition_interval()
+    ):
+        cur.execute("SELECT to_regclass(%s)", [name])
+        if cur.fetchone()[0] is not None:
+            continue
+        cur.execute(
+            f"CREATE TABLE {name} PARTITION OF {PARENT}"
+            f" FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        created.append(name)
+    return created
+
+
+def ensure_partitions_for(dates: Iterable[date]) -> List[str]:
+    """Partition-aware loading: make sure rows dated `dates` have a home."""
+    if not is_partitioned():
+        return []
+    dates = list(dates)
+    if not dates:
+        return []
+    with transaction.atomic(), connection.cursor() as cur:
+        return create_partitions(cur, min(dates), max(dates))
+
+
+def ensure_partitions_ahead(months_ahead: int = 3) -> List[str]:
+    today = date.today()
+    return ensure_partitions_for([today, today + timedelta(days=31 * months_ahead)])
+
+
+def list_partitions() -> List[Tuple[str, date, date]]:
+    if not is_partitioned():
+        return []
+    with connection.cursor() as cur:
+        cur.execute(
+            "SELECT c.relname FROM pg_inherits i"
+            " JOIN pg_class c ON c.oid = i.inhrelid"
+            " JOIN pg_class p ON p.oid = i.inhparent"
+            " WHERE p.relname = %s ORDER BY c.relname",
+            [PARENT],
+        )
+        names = [r[0] for r in cur.fetchall()]
+    out = []
+    for name in names:
+        suffix = name[len(PARENT) + 1 :]
+        if suffix.startswith("y"):
+            day = date(int(suffix[1:]), 1, 1)
+            out.append(partition_bounds(day, "year"))
+        else:
+            year, month = suffix[1:].split("_")
+            out.append(partition_bounds(date(int(year), int(month), 1), "month"))
+    return out
+
+
+def _month_rollups(rows: Iterable[tuple]) -> Iterator[EODPriceMonthly]:
+    # rows ordered by (asset, date); one month is held in memory at a time
+    key, closes, volumes = None, [], []
+    for aid, day, close, volume in rows:
+        month = day.replace(day=1)
+        if (aid, month) != key:
+            if key is not None:
+                yield _monthly(key, closes, volumes)
+            key, closes, volumes = (aid, month), [], []
+        closes.append(close)
+        volumes.append(volume)
+    if key is not None:
+        yield _monthly(key, closes, volumes)
+
+
+def _monthly(key, closes, volumes) -> EODPriceMonthly:
+    known = [v for v in volumes if v is not None]
+    return EODPriceMonthly(
+        asset_id=key[0],
+        month=key[1],
+        close_last=closes[-1],
+        close_min=min(closes),
+        close_max=max(closes),
+        close_avg=round(sum(closes) / len(closes), 6),
+        volume_sum=sum(known) if known else None,
+        bars=len(closes),
+    )
+
+
+def rollup_months(before: date, batch_size: int = 1000) -> int:
+    """Upsert monthly aggregates of every bar dated before the month start `before`."""
+    rows = (
+        EODPrice.objects.filter(date__lt=before)
+        .order_by("asset_id", "date")
+        .values_list("asset_id", "date", "close", "volume")
+        .iterator(chunk_size=10_000)
+    )
+    written = 0
+    it = _month_rollups(rows)
+    while chunk := list(islice(it, batch_size)):
+        EODPriceMonthly.objects.bulk_create(
+            chunk,
+            update_conflicts=True,
+            unique_fields=["asset", "month"],
+            update_fields=[
+                "close_last",
+                "close_min",
+                "close_max",
+                "close_avg",
+                "volume_sum",
+                "bars",
+            ],
+        )
+        written += len(chunk)
+    return written
+
+
+def apply_retention(keep_days: int, rollup: bool = True) -> dict:
+    """
+    Age out daily bars older than `keep_days`, rolling them up into
+    EODPriceMonthly first. Partitions wholly past the cutoff are detached
+    and dropped (no row-by-row DELETE, no bloat); unpartitioned storage
+    deletes whole months instead.
+    """
+    cutoff = date.today() - timedelta(days=keep_days)
+    out = {"rolled_up": 0, "dropped_partitions": [], "deleted_rows": 0}
+    if is_partitioned():
+        expired = [b for b in list_partitions() if b[2] <= cutoff]
+        if not expired:
+            return out
+        with transaction.atomic():
+            if rollup:
+                out["rolled_up"] = rollup_months(max(b[2] for b in expired))
+            with connection.cursor() as cur:
+                for name, _start, _end in expired:
+                    cur.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {name}")
+                    cur.execute(f"DROP TABLE {name}")
+        out["dropped_partitions"] = [b[0] for b in expired]
+        return out
+
+    # whole months only, so a month is never rolled up from a partial set of bars
+    cutoff = cutoff.replace(day=1)
+    with transaction.atomic():
+        if rollup:
+            out["rolled_up"] = rollup_months(cutoff)
+        out["deleted_rows"], _ = EODPrice.objects.filter(date__lt=cutoff).delete()
+    return out
+
+
+# "last N closes per asset": the query risk/vol jobs run against this table
+LAST_N_LATERAL = f"""
+SELECT a.id, p.date, p.close
+FROM investors_asset a
+CROSS JOIN LATERAL (
+    SELECT e.date, e.close FROM {PARENT} e
+    WHERE e.asset_id = a.id ORDER BY e.date DESC LIMIT %s
+) p
+"""
+
+LAST_N_WINDOW = f"""
+SELECT asset_id, date, close FROM (
+    SELECT asset_id, date, close,
+           ROW_NUMBER() OVER (PARTITION BY asset_id ORDER BY date DESC) AS rn
+    FROM {PARENT}
+) ranked
+WHERE rn <= %s
+"""
@@ -0,0 +1,243 @@
+"""
+Reverse-exposure index (AssetExposure) and single-asset price shocks.
+
+`refresh_exposure` rebuilds the index rows of the given assets from Position
+in two grouped queries (totals, then the top holders via a filtered window).
+Single-position writers (order fills) call `apply_position_delta` instead,
+which patches one row without scanning the asset's holders. Quote updates only
+change prices, so `reprice_exposure` rescales market_value in one UPDATE.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum, Window
+from django.db.models.functions import Cast, RowNumber
+from django.utils import timezone
+
+from investors.models import Asset, AssetExposure, Position
+from investors.valuation_services import portfolio_valuations
+
+EXPOSURE_TOP_N = 10
+EXPOSURE_BATCH_SIZE = 2000
+
+
+def _refresh_batch(asset_ids: List[int], top_n: int) -> int:
+    held = Position.objects.filter(asset_id__in=asset_ids, quantity__gt=0)
+    totals = {
+        aid: (holders, qty)
+        for aid, holders, qty in held.order_by()
+        .values("asset_id")
+        .annotate(holders=Count("portfolio_id"), qty=Sum("quantity"))
+        .values_list("asset_id", "holders", "qty")
+    }
+    top: Dict[int, List[list]] = {}
+    ranked = (
+        held.annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=[F("asset_id")],
+                order_by=[F("quantity").desc(), F("portfolio_id").asc()],
+            )
+        )
+        .filter(rank__lte=top_n)
+        .order_by("asset_id", "rank")
+        .values_list("asset_id", "portfolio_id", "quantity")
+    )
+    for aid, pid, qty in ranked:
+        top.setdefault(aid, []).append([pid, str(qty)])
+    prices = dict(Asset.objects.filter(id__in=asset_ids).values_list("id", "price"))
+
+    now = timezone.now()
+    rows = []
+    for aid in asset_ids:
+        if aid not in prices:
+            continue  # asset deleted since; its exposure row cascaded away
+        holders, qty = totals.get(aid, (0, Decimal("0")))
+        rows.append(
+            AssetExposure(
+                asset_id=aid,
+                holders=holders,
+                total_quantity=qty,
+                market_value=float(qty) * (prices[aid] or 0.0),
+                top_holders=top.get(aid, []),
+                updated_at=now,
+            )
+        )
+    AssetExposure.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["asset"],
+        update_fields=[
+            "holders",
+            "total_quantity",
+            "market_value",
+            "top_holders",
+            "updated_at",
+        ],
+    )
+    return len(rows)
+
+
+def refresh_exposure(
+    asset_ids: Optional[Iterable[int]] = None,
+    top_n: int = EXPOSURE_TOP_N,
+    batch_size: int = EXPOSURE_BATCH_SIZE,
+) -> int:
+    """Rebuild the index rows of `asset_ids` (every asset when None)."""
+    ids = iter(
+        asset_ids
+        if asset_ids is not None
+        else Asset.objects.order_by("id").values_list("id", flat=True).iterator()
+    )
+    written = 0
+    while batch := list(islice(ids, batch_size)):
+        written += _refresh_batch(sorted(set(batch)), top_n)
+    return written
+
+
+def reprice_exposure(asset_ids: Iterable[int]) -> int:
+    """Follow a price change: market_value = total_quantity x current price."""
+    price = Asset.objects.filter(pk=OuterRef("asset_id")).values("price")[:1]
+    return AssetExposure.objects.filter(asset_id__in=list(asset_ids)).update(
+        market_value=Cast("total_quantity", FloatField())
+        * Subquery(price, output_field=FloatField()),
+        updated_at=timezone.now(),
+    )
+
+
+_EXPOSURE_FIELDS = (
+    "holders",
+    "total_quantity",
+    "market_value",
+    "top_holders",
+    "updated_at",
+)
+
+
+def apply_position_delta(
+    asset_id: int,
+    portfolio_id: int,
+    old_qty: Decimal,
+    new_qty: Decimal,
+    top_n: int = EXPOSURE_TOP_N,
+) -> None:
+    """
+    Follow one position's quantity change on its asset's index row in
+    O(top_n): totals move by the delta, holders by one when the quantity
+    crosses zero, and the top list is patched in place. Call it inside the
+    writer's transaction. It falls back to `refresh_exposure` when the row
+    does not exist yet, or when a listed holder shrank while others are
+    left off the list (one of them may now belong on it).
+    """
+    row = (
+        AssetExposure.objects.select_for_update(of=("self",))
+        .select_related("asset")
+        .only("asset__price", *_EXPOSURE_FIELDS)
+        .filter(asset_id=asset_id)
+        .first()
+    )
+    if row is None:
+        refresh_exposure([asset_id], top_n=top_n)
+        return
+    holders = row.holders + (new_qty > 0) - (old_qty > 0)
+    top = {pid: Decimal(q) for pid, q in row.top_holders}
+    if (
+        portfolio_id in top
+        and new_qty < old_qty
+        and holders > len(top) - (new_qty <= 0)
+    ):
+        refresh_exposure([asset_id], top_n=top_n)
+        return
+    if new_qty > 0:
+        top[portfolio_id] = new_qty
+    else:
+        top.pop(portfolio_id, None)
+    ranked = sorted(top.items(), key=lambda kv: (-kv[1], kv[0]))[:top_n]
+
+    row.holders = holders
+    row.total_quantity += new_qty - old_qty
+    row.market_value = float(row.total_quantity) * (row.asset.price or 0.0)
+    row.top_holders = [[pid, str(q)] for pid, q in ranked]
+    row.updated_at = timezone.now()
+    row.save(update_fields=_EXPOSURE_FIELDS)
+
+
+def exposure_of(asset_id: int) -> Optional[dict]:
+    """
+    Index row for one asset (a primary-key lookup), holder values at today's
+    price. An asset not indexed yet (no row until its first position write or
+    the nightly rebuild) reads as zero holders with updated_at None; None
+    only when the asset does not exist.
+    """
+    row = (
+        AssetExposure.objects.select_related("asset")
+        .only("asset__name", "asset__price", *_EXPOSURE_FIELDS)
+        .filter(asset_id=asset_id)
+        .first()
+    )
+    if row is None:
+        asset = Asset.objects.only("name", "price").filter(id=asset_id).first()
+        if asset is None:
+            return None
+        row = AssetExposure(asset=asset, updated_at=None)
+    price = row.asset.price or 0.0
+    return {
+        "asset": asset_id,
+        "name": row.asset.name,
+        "price": price,
+        "holders": row.holders,
+        "total_quantity": float(row.total_quantity),
+        "market_value": row.market_value,
+        "top_holders": [
+            {"portfolio": pid, "quantity": float(q), "value": float(q) * price}
+            for pid, q in row.top_holders
+        ],
+        "updated_at": row.updated_at,
+    }
+
+
+@dataclass
+class ShockImpact:
+    portfolio_id: int
+    quantity: float
+    market_value: float
+    pnl: float
+
+    @property
+    def shocked_value(self) -> float:
+        return self.market_value + self.pnl
+
+    @property
+    def pct_change(self) -> Optional[float]:
+        return self.pnl / self.market_value if self.market_value else None
+
+
+def shock_asset(asset_id: int, pct: float) -> List[ShockImpact]:
+    """
+    Revalue only the portfolios holding `asset_id` if its price moved by
+    `pct` (-0.1 = -10%). Nothing is written; base market values come from
+    the (cached) valuation engine. Largest absolute impact first.
+    """
+    price = Asset.objects.filter(pk=asset_id).values_list("price", flat=True).first()
+    if price is None:
+        return []
+    holdings = dict(
+        Position.objects.filter(asset_id=asset_id, quantity__gt=0).values_list(
+            "portfolio_id", "quantity"
+        )
+    )
+    base = portfolio_valuations(holdings.keys())
+    impacts = [
+        ShockImpact(
+            portfolio_id=pid,
+            quantity=float(qty),
+            market_value=base[pid].market_value,
+            pnl=float(qty) * price * pct,
+        )
+        for pid, qty in holdings.items()
+    ]
+    impacts.sort(key=lambda i: (-abs(i.pnl), i.portfolio_id))
+    return impacts
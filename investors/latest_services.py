@@ -0,0 +1,214 @@
+"""
+Maintenance of the AssetLatest snapshot (latest close, latest EPS, TTM EPS, P/E).
+
+Ingestion paths call the `bump_*` helpers inside their own transaction, so a
+committed bar or earnings row and the snapshot move together. `expected_latest`
+recomputes the snapshot from EODPrice / Earnings with one index probe per
+asset; reconciliation and bulk loads use it directly.
+"""
+
+from decimal import Decimal
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from investors.models import Asset, AssetLatest, EODPrice, Earnings
+
+LATEST_BATCH_SIZE = 2000
+TTM_QUARTERS = 4
+SNAPSHOT_FIELDS = [
+    "close",
+    "close_date",
+    "volume",
+    "eps",
+    "eps_period_end",
+    "eps_ttm",
+    "pe",
+]
+
+
+def _pe(close, eps_ttm) -> Optional[float]:
+    if close is None or eps_ttm is None or eps_ttm <= 0:
+        return None
+    return float(close) / float(eps_ttm)
+
+
+def _write(snapshots: List[AssetLatest]) -> int:
+    if snapshots:
+        AssetLatest.objects.bulk_create(
+            snapshots,
+            batch_size=LATEST_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["asset"],
+            update_fields=SNAPSHOT_FIELDS + ["updated_at"],
+        )
+    return len(snapshots)
+
+
+def bump_latest_closes(
+    rows: Iterable[Tuple[int, object, Decimal, Optional[int]]],
+) -> int:
+    """
+    Fold (asset_id, date, close, volume) rows into the snapshot. A row only
+    wins if it is at least as new as the stored close, so out-of-order and
+    chunked writes converge. Call inside the transaction that wrote the rows.
+    """
+    newest: Dict[int, tuple] = {}
+    for aid, day, close, volume in rows:
+        if aid not in newest or day >= newest[aid][0]:
+            newest[aid] = (day, close, volume)
+    if not newest:
+        return 0
+    current = AssetLatest.objects.select_for_update().in_bulk(list(newest))
+    now = timezone.now()
+    changed = []
+    for aid, (day, close, volume) in newest.items():
+        snap = current.get(aid) or AssetLatest(asset_id=aid)
+        if snap.close_date is not None and snap.close_date > day:
+            continue
+        snap.close_date, snap.close, snap.volume = day, close, volume
+        snap.pe = _pe(close, snap.eps_ttm)
+        snap.updated_at = now
+        changed.append(snap)
+    return _write(changed)
+
+
+def _eps_snapshots(asset_ids: List[int]) -> Dict[int, Tuple]:
+    """asset_id -> (eps, period_end, eps_ttm) from the newest TTM_QUARTERS rows."""
+    out: Dict[int, Tuple] = {}
+    rows = (
+        Earnings.objects.filter(asset_id__in=asset_ids)
+        .order_by("asset_id", "-period_end")
+        .values_list("asset_id", "period_end", "eps")
+    )
+    quarters: Dict[int, List[Decimal]] = {}
+    for aid, period_end, eps in rows.iterator():
+        seen = quarters.setdefault(aid, [])
+        if not seen:
+            out[aid] = (eps, period_end)
+        if len(seen) < TTM_QUARTERS:
+            seen.append(eps)
+    return {
+        aid: (
+            eps,
+            end,
+            sum(quarters[aid]) if len(quarters[aid]) == TTM_QUARTERS else None,
+        )
+        for aid, (eps, end) in out.items()
+    }
+
+
+def bump_latest_eps(asset_ids: Iterable[int]) -> int:
+    """Recompute the EPS side of the snapshot; call inside the earnings write transaction."""
+    ids = list(set(asset_ids))
+    if not ids:
+        return 0
+    current = AssetLatest.objects.select_for_update().in_bulk(ids)
+    eps_by_asset = _eps_snapshots(ids)
+    now = timezone.now()
+    changed = []
+    for aid in ids:
+        snap = current.get(aid) or AssetLatest(asset_id=aid)
+        snap.eps, snap.eps_period_end, snap.eps_ttm = eps_by_asset.get(
+            aid, (None, None, None)
+        )
+        snap.pe = _pe(snap.close, snap.eps_ttm)
+        snap.updated_at = now
+        changed.append(snap)
+    return _write(changed)
+
+
+def expected_latest(asset_ids: List[int]) -> Dict[int, AssetLatest]:
+    """The snapshot as the source tables say it should be; assets without data are omitted."""
+    bar = EODPrice.objects.filter(asset=OuterRef("pk")).order_by("-date")
+    rows = (
+        Asset.objects.filter(id__in=asset_ids)
+        .annotate(
+            close=Subquery(bar.values("close")[:1]),
+            close_date=Subquery(bar.values("date")[:1]),
+            last_volume=Subquery(bar.values("volume")[:1]),
+        )
+        .values_list("id", "close", "close_date", "last_volume")
+    )
+    eps_by_asset = _eps_snapshots(asset_ids)
+    now = timezone.now()
+    out = {}
+    for aid, close, close_date, volume in rows:
+        eps, eps_end, ttm = eps_by_asset.get(aid, (None, None, None))
+        if close_date is None and eps_end is None:
+            continue
+        out[aid] = AssetLatest(
+            asset_id=aid,
+            close=close,
+            close_date=close_date,
+            volume=volume,
+            eps=eps,
+            eps_period_end=eps_end,
+            eps_ttm=ttm,
+            pe=_pe(close, ttm),
+            updated_at=now,
+        )
+    return out
+
+
+def rebuild_latest(
+    asset_ids: Iterable[int], batch_size: int = LATEST_BATCH_SIZE
+) -> int:
+    """Overwrite the snapshot of `asset_ids` from the source tables (bulk loads)."""
+    ids, written = iter(asset_ids), 0
+    while batch := list(islice(ids, batch_size)):
+        written += _write(list(expected_latest(batch).values()))
+    return written
+
+
+def _differs(stored: AssetLatest, want: AssetLatest) -> bool:
+    for field in SNAPSHOT_FIELDS:
+        a, b = getattr(stored, field), getattr(want, field)
+        if field == "pe" and a is not None and b is not None:
+            if abs(a - b) > 1e-9 * max(1.0, abs(b)):
+                return True
+        elif a != b:
+            return True
+    return False
+
+
+def reconcile_latest(
+    asset_ids: Optional[Iterable[int]] = None,
+    fix: bool = False,
+    batch_size: int = LATEST_BATCH_SIZE,
+) -> dict:
+    """
+    Compare AssetLatest with EODPrice / Earnings in batches of assets and
+    report missing, drifted and orphaned snapshots; `fix=True` rewrites them.
+    """
+    ids = iter(
+        asset_ids
+        if asset_ids is not None
+        else Asset.objects.order_by("id").values_list("id", flat=True).iterator()
+    )
+    report = {"checked": 0, "missing": [], "drifted": [], "orphaned": [], "fixed": 0}
+    while batch := list(islice(ids, batch_size)):
+        want = expected_latest(batch)
+        stored = AssetLatest.objects.in_bulk(batch)
+        report["checked"] += len(batch)
+        bad = []
+        for aid in batch:
+            w, s = want.get(aid), stored.get(aid)
+            if w is None:
+                if s is not None:
+                    report["orphaned"].append(aid)
+            elif s is None:
+                report["missing"].append(aid)
+                bad.append(w)
+            elif _differs(s, w):
+                report["drifted"].append(aid)
+                bad.append(w)
+        if fix:
+            report["fixed"] += _write(bad)
+            orphaned = [aid for aid in batch if aid not in want and aid in stored]
+            report["fixed"] += AssetLatest.objects.filter(
+                asset_id__in=orphaned
+            ).delete()[0]
+    return report
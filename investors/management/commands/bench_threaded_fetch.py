@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from investors.management import threaded_fetch
+
+
+def _chart_body(n_bars: int = 63) -> bytes:
+    closes = [100.0 + (i % 7) for i in range(n_bars)]
+    return json.dumps(
+        {"chart": {"result": [{"indicators": {"quote": [{"close": closes}]}}]}}
+    ).encode()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 + Content-Length so clients can keep the connection alive
+    protocol_version = "HTTP/1.1"
+    # headers and body go out as separate writes; without this, Nagle plus
+    # delayed ACK stalls every keep-alive response by ~40ms
+    disable_nagle_algorithm = True
+    body = _chart_body()
+    latency_sec = 0.0
+
+    def do_GET(self):
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark threaded_fetch requests/sec against a local HTTP stub, with and without pooled sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--max-workers", type=int, default=5)
+        parser.add_argument("--latency-ms", type=float, default=0.0)
+        parser.add_argument("--rounds", type=int, default=3)
+
+    def handle(self, *args, **opts):
+        _StubHandler.latency_sec = opts["latency_ms"] / 1000.0
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/{{symbol}}"
+
+        assets = [(i, f"SYM{i}") for i in range(opts["requests"])]
+        self.stdout.write(
+            self.style.NOTICE(
+                f"Stub at {url}: {len(assets)} requests, "
+                f"workers={opts['max_workers']}, latency={opts['latency_ms']}ms"
+            )
+        )
+        try:
+            with mock.patch.object(threaded_fetch, "YAHOO_CHART_URL", url):
+                for pooled in (False, True):
+                    best = 0.0
+                    for _ in range(opts["rounds"]):
+                        start = time.perf_counter()
+                        quotes = threaded_fetch.fetch_quotes_threaded(
+                            assets, "yahoo", opts["max_workers"], pooled=pooled
+                        )
+                        elapsed = time.perf_counter() - start
+                        best = max(best, len(quotes) / elapsed)
+                    label = "pooled session" if pooled else "new connection/req"
+                    self.stdout.write(
+                        self.style.SUCCESS(f"{label:>20}: {best:,.0f} req/s (best)")
+                    )
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,66 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from investors.models import EODPrice
+from investors.price_cache import PriceCache, build_price_cache, default_cache_dir
+from investors.price_services import VOL_WINDOW
+
+
+class Command(BaseCommand):
+    help = "Build (incrementally) the mmap'd columnar price-history cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cache-dir", default=None)
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Re-read all of EODPrice (picks up backfilled/revised history).",
+        )
+        parser.add_argument("--keep", type=int, default=2, help="Generations kept.")
+        parser.add_argument(
+            "--bench",
+            action="store_true",
+            help="Compare windowed vol reads: ORM rows vs cache slices.",
+        )
+        parser.add_argument("--vol-window", type=int, default=VOL_WINDOW)
+
+    def handle(self, *args, **opts):
+        root = opts["cache_dir"] or default_cache_dir()
+        start = time.perf_counter()
+        stats = build_price_cache(root, full=opts["full"], keep=opts["keep"])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{stats.generation}: {stats.assets:,} assets, {stats.rows:,} closes "
+                f"({stats.new_rows:,} read from EODPrice) through {stats.through} "
+                f"in {elapsed:.2f}s."
+            )
+        )
+        if opts["bench"]:
+            self._bench(root, opts["vol_window"])
+
+    def _bench(self, root, window: int):
+        cache = PriceCache.open(root)
+        ids = cache.asset_ids.tolist()
+
+        start = time.perf_counter()
+        for aid in ids:
+            closes = list(
+                EODPrice.objects.filter(asset_id=aid)
+                .order_by("-date")
+                .values_list("close", flat=True)[: window + 1]
+            )
+            [float(c) for c in reversed(closes)]
+        orm = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vols = cache.volatilities(ids, window)
+        mapped = time.perf_counter() - start
+
+        self.stdout.write(
+            f"last {window + 1} closes for {len(ids):,} assets: "
+            f"ORM {orm * 1000:,.1f}ms, cache + batch vol {mapped * 1000:,.1f}ms "
+            f"({len(vols):,} vols, median {np.median(list(vols.values()) or [np.nan]):.4f})"
+        )
@@ -4,6 +4,8 @@ from django.db.models import Prefetch
 from investors.management.cpu_risk import Position, portfolio_var_parallel
 from investors.management.utils.timer import timer
 from investors.models import Asset, Portfolio
+from investors.price_cache import PriceCache, default_cache_dir
+from investors.price_services import VOL_WINDOW
 
 
 class Command(BaseCommand):
@@ -12,14 +14,32 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("--paths", type=int, default=30_000)
         parser.add_argument("--max-workers", type=int, default=None)
+        parser.add_argument(
+            "--history-vol",
+            action="store_true",
+            help="Derive volatility from the mmap'd price cache (build_price_cache).",
+        )
+        parser.add_argument("--vol-window", type=int, default=VOL_WINDOW)
+        parser.add_argument("--cache-dir", default=None)
 
     def handle(self, *args, **opts):
         paths = opts["paths"]
         max_workers = opts["max_workers"]
+        cache_dir = None
+        if opts["history_vol"]:
+            cache_dir = opts["cache_dir"] or default_cache_dir()
+            if PriceCache.open(cache_dir) is None:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"No price cache at {cache_dir}; run build_price_cache. "
+                        "Falling back to Asset.volatility."
+                    )
+                )
+                cache_dir = None
 
         self.stdout.write(self.style.NOTICE("Loading portfolios and assets..."))
         portfolios = Portfolio.objects.prefetch_related(
-            Prefetch("assets", queryset=Asset.objects.only("price", "volatility"))
+            Prefetch("assets", queryset=Asset.objects.only("id", "price", "volatility"))
         ).only("id", "assets")
         portfolios_inputs = {}
         for p in portfolios:
@@ -28,7 +48,9 @@ class Command(BaseCommand):
                 continue
             w = 1.0 / len(assets)
             positions = [
-                Position(w, float(a.price or 0.0), float(a.volatility or 0.0))
+                Position(
+                    w, float(a.price or 0.0), float(a.volatility or 0.0), asset_id=a.id
+                )
                 for a in assets
             ]
             portfolios_inputs[p.id] = positions
@@ -41,7 +63,11 @@ class Command(BaseCommand):
         )
         with timer("Portfolio VaR computation"):
             var_by_portfolio = portfolio_var_parallel(
-                portfolios_inputs, paths=paths, max_workers=max_workers
+                portfolios_inputs,
+                paths=paths,
+                max_workers=max_workers,
+                price_cache_dir=cache_dir,
+                vol_window=opts["vol_window"] if cache_dir else None,
             )
 
         lines = ["VaR (95%) by portfolio:"]
@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from investors.eod_partitions import (
+    LAST_N_LATERAL,
+    LAST_N_WINDOW,
+    apply_retention,
+    ensure_partitions_ahead,
+    is_partitioned,
+    list_partitions,
+)
+
+
+class Command(BaseCommand):
+    help = "Manage EODPrice storage: partitions, retention/rollup, and a last-N-closes benchmark."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["list", "ensure", "retention", "bench"])
+        parser.add_argument("--months-ahead", type=int, default=3)
+        parser.add_argument("--keep-days", type=int, default=365 * 5)
+        parser.add_argument("--no-rollup", action="store_true")
+        parser.add_argument(
+            "--n", type=int, default=20, help="closes per asset (bench)"
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **opts):
+        action = opts["action"]
+        self.stdout.write(
+            self.style.NOTICE(
+                f"DB vendor: {connection.vendor}, partitioned: {is_partitioned()}"
+            )
+        )
+        if action == "list":
+            for name, start, end in list_partitions():
+                self.stdout.write(f"{name}: [{start}, {end})")
+        elif action == "ensure":
+            created = ensure_partitions_ahead(opts["months_ahead"])
+            self.stdout.write(self.style.SUCCESS(f"Created partitions: {created}"))
+        elif action == "retention":
+            out = apply_retention(opts["keep_days"], rollup=not opts["no_rollup"])
+            self.stdout.write(self.style.SUCCESS(f"Retention: {out}"))
+        else:
+            self._bench(opts["n"], opts["repeat"])
+
+    def _bench(self, n: int, repeat: int):
+        queries = {"window (ROW_NUMBER)": LAST_N_WINDOW}
+        if connection.vendor == "postgresql":
+            queries["lateral (index per asset)"] = LAST_N_LATERAL
+        for label, sql in queries.items():
+            timings, rows = [], 0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                with connection.cursor() as cur:
+                    cur.execute(sql, [n])
+                    rows = len(cur.fetchall())
+                timings.append(time.perf_counter() - start)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"last {n} closes/asset, {label}: {rows:,} rows, "
+                    f"median {statistics.median(timings) * 1000:.1f}ms, "
+                    f"min {min(timings) * 1000:.1f}ms over {repeat} runs"
+                )
+            )
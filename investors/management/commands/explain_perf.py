@@ -1,46 +1,103 @@
 from __future__ import annotations
 
-from django.core.management.base import BaseCommand
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
 from django.db import connection
-from django.db.models import Sum
 
-from investors.models import Portfolio, Position
-from investors.views import annotate_metrics
+from investors.benchmarks import context_for, seed_book, throwaway_database
+from investors.bulk_loader import SCALE_PRESETS
+from investors.query_plans import (
+    HOT_QUERIES,
+    LARGE_TABLE_ROWS,
+    capture_plans,
+    diff_plans,
+    save_plans,
+)
 
 
 class Command(BaseCommand):
-    help = "EXPLAIN/ANALYZE hot queries to validate indexes."
+    """
+    Captures the plans of every registered hot query (investors.query_plans)
+    on a seeded throwaway database, reports full scans / sorts over large
+    tables with index suggestions, and stores or diffs the normalized plans.
+    """
 
-    def handle(self, *args, **opts):
-        vendor = connection.vendor
-        self.stdout.write(self.style.NOTICE(f"DB vendor: {vendor}"))
+    help = "EXPLAIN the hot queries, flag scans/sorts on large tables, store and diff plans."
 
-        agg_qs = (
-            Position.objects.values("portfolio_id")
-            .annotate(total_qty=Sum("quantity"))
-            .order_by("-total_qty")
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale", choices=[s for s in SCALE_PRESETS if s != "xl"], default="small"
         )
-        try:
-            port_qs = annotate_metrics(Portfolio.objects.all()).order_by(
-                "-sharpe_proxy"
-            )
-        except Exception:
-            port_qs = Portfolio.objects.all()
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--only", nargs="+", choices=sorted(HOT_QUERIES))
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="EXPLAIN ANALYZE on Postgres (actual rows; writes are rolled back).",
+        )
+        parser.add_argument("--large-rows", type=int, default=LARGE_TABLE_ROWS)
+        parser.add_argument(
+            "--plans-dir",
+            help="Stored plans; default query_plans/<vendor>-<scale>.",
+        )
+        parser.add_argument(
+            "--save", action="store_true", help="Write the plans to --plans-dir."
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Diff against --plans-dir and fail if any plan changed.",
+        )
+        parser.add_argument("--show-plans", action="store_true")
+        parser.add_argument(
+            "--current-db",
+            action="store_true",
+            help="Explain against the configured database as-is (no seeding).",
+        )
+
+    def handle(self, *args, **opts):
+        scale = SCALE_PRESETS[opts["scale"]]
+        if opts["current_db"]:
+            plans = self._capture(context_for(opts["scale"], scale, opts["seed"]), opts)
+        else:
+            with throwaway_database():
+                self.stdout.write(
+                    self.style.NOTICE(
+                        f"Seeding {opts['scale']} {scale} on {connection.vendor}…"
+                    )
+                )
+                ctx = seed_book(opts["scale"], scale, opts["seed"])
+                plans = self._capture(ctx, opts)
 
-        if vendor == "postgresql":
+        root = opts["plans_dir"] or f"query_plans/{connection.vendor}-{opts['scale']}"
+        if opts["save"]:
+            save_plans(root, plans)
+            self.stdout.write(self.style.SUCCESS(f"Saved {len(plans)} plans to {root}"))
+        if opts["check"]:
+            changed = {n: d for n, d in diff_plans(root, plans).items() if d}
+            for diff in changed.values():
+                sys.stdout.write(diff)
+            if changed:
+                raise CommandError(f"plans changed: {', '.join(sorted(changed))}")
+            self.stdout.write(self.style.SUCCESS(f"All plans match {root}"))
+
+    def _capture(self, ctx, opts):
+        plans = capture_plans(
+            ctx,
+            only=opts["only"],
+            analyze=opts["analyze"],
+            large_rows=opts["large_rows"],
+        )
+        for qp in plans:
+            flag = self.style.WARNING if qp.findings else self.style.SUCCESS
             self.stdout.write(
-                self.style.SUCCESS("Positions aggregation plan (ANALYZE):")
+                flag(
+                    f"{qp.name}: {len(qp.statements)} statements, {len(qp.findings)} findings"
+                )
             )
-            self.stdout.write(agg_qs.explain(analyze=True, verbose=True))
-            self.stdout.write(self.style.SUCCESS("Portfolio metrics plan (ANALYZE):"))
-            self.stdout.write(port_qs.explain(analyze=True, verbose=True))
-        else:
-            with connection.cursor() as cur:
-                self.stdout.write(self.style.SUCCESS("Positions aggregation plan:"))
-                cur.execute("EXPLAIN QUERY PLAN " + str(agg_qs.query))
-                for row in cur.fetchall():
-                    self.stdout.write(str(row))
-                self.stdout.write(self.style.SUCCESS("Portfolio metrics plan:"))
-                cur.execute("EXPLAIN QUERY PLAN " + str(port_qs.query))
-                for row in cur.fetchall():
-                    self.stdout.write(str(row))
+            for finding in qp.findings:
+                self.stdout.write(f"  {finding}")
+            if opts["show_plans"]:
+                self.stdout.write(qp.render())
+        return plans
@@ -0,0 +1,118 @@
+import asyncio
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+import aiohttp
+from django.core.management.base import BaseCommand, CommandError
+
+# (label, sync path, async path); "{pk}" is filled with a random portfolio id
+SLOW = ("analytics", "/api/assets/analytics/", "/api/async/assets/analytics/")
+FAST = [
+    ("assets", "/api/assets/?limit=20", "/api/async/assets/?limit=20"),
+    ("cached", "/api/assets/cached/", "/api/async/assets/cached/"),
+    ("stats", "/api/portfolios/{pk}/stats/", "/api/async/portfolios/{pk}/stats/"),
+]
+
+
+def _pct(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def _run(
+    base: str, flavour: int, opts: dict, pks: List[int]
+) -> Tuple[float, Dict[str, List[float]], int]:
+    """Closed-loop clients for `duration` seconds; label -> latencies (s)."""
+    latencies: Dict[str, List[float]] = {}
+    errors = 0
+    rng = random.Random(opts["seed"])
+    deadline = time.perf_counter() + opts["duration"]
+
+    async def client(session: aiohttp.ClientSession) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            route = SLOW if rng.random() < opts["slow_ratio"] else rng.choice(FAST)
+            path = route[flavour].format(pk=rng.choice(pks))
+            start = time.perf_counter()
+            try:
+                async with session.get(base + path) as resp:
+                    await resp.read()
+                    ok = resp.status < 400
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                ok = False
+            if ok:
+                latencies.setdefault(route[0], []).append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    connector = aiohttp.TCPConnector(limit=opts["concurrency"])
+    timeout = aiohttp.ClientTimeout(total=opts["timeout"])
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(opts["concurrency"])))
+        elapsed = time.perf_counter() - start
+    return elapsed, latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the sync (/api/...) and async (/api/async/...) read endpoints "
+        "of a running server with mixed slow/fast traffic; reports req/s and "
+        "p50/p95 per route."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--duration", type=float, default=20.0)
+        parser.add_argument(
+            "--slow-ratio",
+            type=float,
+            default=0.2,
+            help="Share of requests hitting the analytics aggregate.",
+        )
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--portfolio-ids",
+            default="",
+            help="Comma-separated ids for the stats route (default: from the DB).",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["portfolio_ids"]:
+            pks = [int(p) for p in opts["portfolio_ids"].split(",")]
+        else:
+            from investors.models import Portfolio
+
+            pks = list(Portfolio.objects.values_list("id", flat=True)[:500])
+        if not pks:
+            raise CommandError(
+                "No portfolios found. Seed first or pass --portfolio-ids."
+            )
+
+        base = opts["base_url"].rstrip("/")
+        modes = ["sync", "async"] if opts["mode"] == "both" else [opts["mode"]]
+        for mode in modes:
+            flavour = 1 if mode == "sync" else 2
+            elapsed, latencies, errors = asyncio.run(_run(base, flavour, opts, pks))
+            total = sum(len(v) for v in latencies.values())
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{mode}: {total / elapsed:.1f} req/s "
+                    f"({total} ok, {errors} errors, concurrency={opts['concurrency']})"
+                )
+            )
+            every = [s for v in latencies.values() for s in v]
+            for label, samples in [("all", every)] + sorted(latencies.items()):
+                self.stdout.write(
+                    f"  {label:<10} n={len(samples):<6} "
+                    f"p50={_pct(samples, 0.50) * 1000:7.1f}ms "
+                    f"p95={_pct(samples, 0.95) * 1000:7.1f}ms "
+                    f"mean={statistics.fmean(samples) * 1000 if samples else 0:7.1f}ms"
+                )
@@ -8,7 +8,12 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.db.models import DecimalField, ExpressionWrapper, F, Value
 
+from core.db_pool import ConnectionPool
+
+from investors.exposure_services import apply_position_delta
 from investors.models import Position
+from investors.refdata_services import get_asset_refs
+from investors.valuation_services import bump_position_versions
 
 DEC = DecimalField(max_digits=20, decimal_places=6)
 
@@ -28,23 +33,31 @@ def process_order(msg: OrderMsg) -> None:
         msg["qty"],
         msg["price"],
     )
-    Position.objects.get_or_create(asset=aid, portfolio=pid)
+    # reject unknown assets before opening a transaction (hot refs, no query)
+    if aid not in get_asset_refs([aid]):
+        raise ValueError(f"order {msg['order_id']}: unknown asset {aid}")
+    Position.objects.get_or_create(asset_id=aid, portfolio_id=pid)
     with transaction.atomic():
         num = F("quantity") * F("avg_price") + Value(qty, output_field=DEC) * Value(
             price, output_field=DEC
         )
         den = F("quantity") + Value(qty, output_field=DEC)
         new_avg = ExpressionWrapper(num / den, output_field=DEC)
-        Position.objects.filter(asset=aid, portfolio=pid).update(
-            avg_price=new_avg, quantity=den
-        )
+        position = Position.objects.filter(asset_id=aid, portfolio_id=pid)
+        position.update(avg_price=new_avg, quantity=den)
+        # the row is locked by the update: this is our own write
+        new_qty = position.values_list("quantity", flat=True).get()
+        transaction.on_commit(lambda: bump_position_versions([pid]))
+        apply_position_delta(aid, pid, new_qty - qty, new_qty)
 
 
-def worker(q: queue.Queue[OrderMsg]):
+def worker(q: queue.Queue[OrderMsg], pool: ConnectionPool):
     while True:
         msg = q.get()
         try:
-            process_order(msg)
+            # a connection per order, not per thread: W may exceed the pool
+            with pool.connection():
+                process_order(msg)
         finally:
             q.task_done()
 
@@ -63,6 +76,11 @@ class Command(BaseCommand):
         parser.add_argument("--asset-id", type=int, required=True)
         parser.add_argument("--orders", type=int, default=200)
         parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument(
+            "--pool-size",
+            type=int,
+            help="DB connections shared by the workers (default DB_POOL_SIZE).",
+        )
         parser.add_argument("--qty", type=str, default="1")
         parser.add_argument("--price", type=str, default="100.0")
 
@@ -72,22 +90,24 @@ class Command(BaseCommand):
         qty, price = Decimal(opts["qty"]), Decimal(opts["price"])
 
         q: queue.Queue[OrderMsg] = queue.Queue(maxsize=1000)  # backpressure
-        threads = [
-            threading.Thread(target=worker, args=(q,), daemon=True) for _ in range(W)
-        ]
-        for t in threads:
-            t.start()
-        for _ in range(N):
-            q.put(
-                OrderMsg(
-                    portfolio_id=pid,
-                    asset_id=aid,
-                    qty=qty,
-                    price=price,
-                    order_id=str(uuid.uuid4()),
+        with ConnectionPool("order_queue", size=opts["pool_size"]) as pool:
+            threads = [
+                threading.Thread(target=worker, args=(q, pool), daemon=True)
+                for _ in range(W)
+            ]
+            for t in threads:
+                t.start()
+            for _ in range(N):
+                q.put(
+                    OrderMsg(
+                        portfolio_id=pid,
+                        asset_id=aid,
+                        qty=qty,
+                        price=price,
+                        order_id=str(uuid.uuid4()),
+                    )
                 )
-            )
-        q.join()
+            q.join()
         pos = Position.objects.get(portfolio_id=pid, asset_id=aid)
         self.stdout.write(
             self.style.SUCCESS(
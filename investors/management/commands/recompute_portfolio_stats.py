@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from investors.metrics_services import STATS_BATCH_SIZE, recompute_portfolio_stats
+from investors.models import Portfolio
+from investors.price_services import VOL_WINDOW
+
+
+class Command(BaseCommand):
+    help = "Recompute position-weighted port_vol / sharpe_proxy into PortfolioStat."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--covariance",
+            action="store_true",
+            help="Use the return covariance from the price cache (build_price_cache).",
+        )
+        parser.add_argument("--window", type=int, default=VOL_WINDOW)
+        parser.add_argument("--batch-size", type=int, default=STATS_BATCH_SIZE)
+
+    def handle(self, *args, **opts):
+        total = Portfolio.objects.count()
+        mode = "covariance" if opts["covariance"] else "diagonal"
+        self.stdout.write(
+            self.style.NOTICE(f"Recomputing {total:,} portfolios ({mode})...")
+        )
+        start = time.perf_counter()
+        written = recompute_portfolio_stats(
+            covariance=opts["covariance"],
+            window=opts["window"],
+            batch_size=opts["batch_size"],
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {written:,} PortfolioStat rows in {elapsed:.2f}s "
+                f"({written / elapsed if elapsed else 0:,.0f} portfolios/s)."
+            )
+        )
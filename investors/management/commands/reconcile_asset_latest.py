@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from investors.latest_services import reconcile_latest
+from investors.management.utils.timer import timer
+
+
+class Command(BaseCommand):
+    help = "Check the AssetLatest snapshot against EODPrice/Earnings; --fix rewrites drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true")
+        parser.add_argument(
+            "--assets", type=int, nargs="*", help="Only these asset ids."
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--show", type=int, default=10, help="Ids listed per category."
+        )
+
+    def handle(self, *args, **opts):
+        with timer("AssetLatest reconciliation"):
+            report = reconcile_latest(
+                opts["assets"], fix=opts["fix"], batch_size=opts["batch_size"]
+            )
+        problems = 0
+        for key in ("missing", "drifted", "orphaned"):
+            ids = report[key]
+            problems += len(ids)
+            if ids:
+                head = ", ".join(map(str, ids[: opts["show"]]))
+                more = (
+                    f" (+{len(ids) - opts['show']})" if len(ids) > opts["show"] else ""
+                )
+                self.stdout.write(
+                    self.style.WARNING(f"{key}: {len(ids)} [{head}{more}]")
+                )
+        summary = f"Checked {report['checked']:,} assets, {problems:,} out of sync"
+        if opts["fix"]:
+            summary += f", {report['fixed']:,} fixed"
+        style = (
+            self.style.SUCCESS if not problems or opts["fix"] else self.style.WARNING
+        )
+        self.stdout.write(style(summary + "."))
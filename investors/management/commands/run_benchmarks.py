@@ -0,0 +1,122 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from investors.benchmarks import (
+    BENCHMARKS,
+    compare,
+    context_for,
+    read_results,
+    run_suite,
+    seed_book,
+    throwaway_database,
+    write_results,
+)
+from investors.bulk_loader import SCALE_PRESETS
+
+
+class Command(BaseCommand):
+    """
+    Seeds a deterministic book into a throwaway test database (SQLite or the
+    configured Postgres), times the hot paths and writes JSON results. With
+    --baseline the results are compared and regressions fail the command.
+    """
+
+    help = "Run the hot-path benchmark suite and compare it against a baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale", choices=[s for s in SCALE_PRESETS if s != "xl"], default="tiny"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--warmup", type=int, default=1)
+        parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS))
+        parser.add_argument("--out", default="bench_results.json")
+        parser.add_argument("--baseline", help="Results JSON to compare against.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Relative slowdown of the median that counts as a regression.",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Write the results to --baseline instead of comparing.",
+        )
+        parser.add_argument(
+            "--current-db",
+            action="store_true",
+            help="Benchmark the configured database as-is (no test DB, no seeding).",
+        )
+
+    def handle(self, *args, **opts):
+        scale = SCALE_PRESETS[opts["scale"]]
+        if opts["current_db"]:
+            ctx = context_for(opts["scale"], scale, opts["seed"])
+            results = self._run(ctx, opts)
+        else:
+            with throwaway_database():
+                self.stdout.write(
+                    self.style.NOTICE(
+                        f"Seeding {opts['scale']} {scale} on {connection.vendor}…"
+                    )
+                )
+                ctx = seed_book(opts["scale"], scale, opts["seed"])
+                results = self._run(ctx, opts)
+
+        write_results(opts["out"], results)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {opts['out']}"))
+        baseline = opts["baseline"]
+        if not baseline:
+            return
+        if opts["save_baseline"]:
+            write_results(baseline, results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {baseline}"))
+            return
+        if not Path(baseline).exists():
+            raise CommandError(f"no baseline at {baseline} (use --save-baseline)")
+        try:
+            rows = compare(results, read_results(baseline), opts["threshold"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self._report(rows)
+        regressions = [r.name for r in rows if r.status == "regression"]
+        if regressions:
+            raise CommandError(f"regressions: {', '.join(regressions)}")
+
+    def _run(self, ctx, opts) -> dict:
+        def report(res):
+            d = res.as_dict()
+            self.stdout.write(
+                f"{res.name:<24} median {1000 * d['median_s']:>9.2f}ms "
+                f"min {1000 * d['min_s']:>9.2f}ms p95 {1000 * d['p95_s']:>9.2f}ms "
+                f"{d['queries']:>6} queries"
+            )
+
+        return run_suite(
+            ctx,
+            only=opts["only"],
+            repeat=opts["repeat"],
+            warmup=opts["warmup"],
+            on_result=report,
+        )
+
+    def _report(self, rows):
+        style = {
+            "regression": self.style.ERROR,
+            "improved": self.style.SUCCESS,
+            "new": self.style.NOTICE,
+            "missing": self.style.WARNING,
+        }
+        for r in rows:
+            ratio = f"x{r.ratio:.2f}" if r.ratio is not None else "-"
+            queries = (
+                f"{r.baseline_queries}->{r.current_queries} queries"
+                if r.baseline_queries != r.current_queries
+                else ""
+            )
+            line = f"{r.status:<10} {r.name:<24} {ratio:>7} {queries}"
+            self.stdout.write(style.get(r.status, str)(line))
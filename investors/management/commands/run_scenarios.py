@@ -0,0 +1,88 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db_router import use_replica
+from investors.scenario_services import (
+    DEMO_SCENARIOS,
+    Scenario,
+    load_book,
+    run_scenarios,
+)
+
+
+class Command(BaseCommand):
+    """
+    Stress-test the whole book: every scenario revalues and re-risks each
+    affected portfolio. Output is NDJSON, one summary line per scenario
+    (plus one line per portfolio with --portfolios), written as results land.
+    """
+
+    help = "Run what-if price/vol shock scenarios against every portfolio."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file", help="JSON list of scenarios; built-in demo set if omitted."
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=1,
+            help="Run the scenario list N times (load testing).",
+        )
+        parser.add_argument("--workers", type=int, default=4, help="0 = inline")
+        parser.add_argument("--alpha", type=float, default=0.95)
+        parser.add_argument("--out", help="NDJSON output file (default stdout).")
+        parser.add_argument(
+            "--portfolios",
+            type=int,
+            nargs="?",
+            const=-1,
+            default=0,
+            help="Also emit per-portfolio rows (worst N first; all if no N).",
+        )
+
+    def handle(self, *args, **opts):
+        raw = DEMO_SCENARIOS
+        if opts["file"]:
+            with open(opts["file"]) as fh:
+                raw = json.load(fh)
+        try:
+            scenarios = [Scenario.from_dict(d) for d in raw] * opts["repeat"]
+        except (TypeError, ValueError) as e:
+            raise CommandError(f"bad scenario file: {e}")
+
+        start = time.perf_counter()
+        with use_replica():
+            book = load_book(alpha=opts["alpha"])
+        loaded = time.perf_counter() - start
+        self.stderr.write(
+            self.style.NOTICE(
+                f"Loaded {len(book.portfolio_ids):,} portfolios / "
+                f"{len(book.rows):,} positions in {loaded:.2f}s; "
+                f"running {len(scenarios)} scenarios (workers={opts['workers']})..."
+            )
+        )
+
+        out = open(opts["out"], "w") if opts["out"] else sys.stdout
+        top = None if opts["portfolios"] == -1 else opts["portfolios"]
+        try:
+            start = time.perf_counter()
+            for result in run_scenarios(book, scenarios, workers=opts["workers"]):
+                out.write(json.dumps(result.summary()) + "\n")
+                if opts["portfolios"]:
+                    for row in result.rows(top):
+                        out.write(json.dumps({"scenario": result.name, **row}) + "\n")
+                out.flush()
+            elapsed = time.perf_counter() - start
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        self.stderr.write(
+            self.style.SUCCESS(
+                f"{len(scenarios)} scenarios x {len(book.portfolio_ids):,} portfolios "
+                f"in {elapsed:.2f}s."
+            )
+        )
@@ -0,0 +1,78 @@
+import dataclasses
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from investors.bulk_loader import SCALE_PRESETS, SeedPlan, load_synthetic
+
+
+class Command(BaseCommand):
+    """
+    Scalable counterpart of seed_portfolio_demo for load-testing datasets:
+    chunked generation in worker processes, COPY on Postgres (batched
+    bulk_create on SQLite), secondary indexes rebuilt once at the end.
+    """
+
+    help = (
+        "Bulk-seed investors, assets, portfolios, m2m links, positions and EOD history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=list(SCALE_PRESETS), default="small")
+        parser.add_argument("--investors", type=int)
+        parser.add_argument("--assets", type=int)
+        parser.add_argument("--portfolios", type=int)
+        parser.add_argument("--assets-per-portfolio", type=int)
+        parser.add_argument("--eod-days", type=int)
+        parser.add_argument(
+            "--workers", type=int, default=4, help="0 = generate inline"
+        )
+        parser.add_argument("--chunk-rows", type=int, default=20_000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--keep-indexes",
+            action="store_true",
+            help="Maintain Position/EODPrice indexes during the load instead of rebuilding.",
+        )
+
+    def handle(self, *args, **opts):
+        overrides = {
+            f.name: opts[f.name]
+            for f in dataclasses.fields(SCALE_PRESETS[opts["scale"]])
+            if opts.get(f.name) is not None
+        }
+        scale = dataclasses.replace(SCALE_PRESETS[opts["scale"]], **overrides)
+        plan = SeedPlan.after_existing(
+            scale, seed=opts["seed"], chunk_rows=opts["chunk_rows"]
+        )
+        self.stdout.write(
+            self.style.NOTICE(
+                f"Seeding {scale} on {connection.vendor} "
+                f"(workers={opts['workers']}, chunk_rows={plan.chunk_rows})…"
+            )
+        )
+
+        def report(st):
+            self.stdout.write(
+                f"{st.table:<28} {st.rows:>12,} rows {st.seconds:>8.2f}s "
+                f"{st.rows_per_sec:>12,.0f} rows/s"
+            )
+
+        start = time.perf_counter()
+        stats = load_synthetic(
+            plan,
+            workers=opts["workers"],
+            defer_indexes=not opts["keep_indexes"],
+            on_table=report,
+        )
+        elapsed = time.perf_counter() - start
+        rebuild = [st for st in stats if st.table == "(index rebuild)"]
+        if rebuild:
+            self.stdout.write(f"{'index rebuild':<28} {rebuild[0].seconds:>21.2f}s")
+        total = sum(st.rows for st in stats)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Loaded {total:,} rows in {elapsed:.2f}s ({total / elapsed:,.0f} rows/s)."
+            )
+        )
@@ -7,6 +7,8 @@ from django.core.management.base import BaseCommand
 from django.db import connection, transaction
 from django.db.models import Case, DecimalField, ExpressionWrapper, F, Q, Value, When
 
+from core.db_pool import ConnectionPool
+
 from investors.models import Position
 
 DEC = DecimalField(max_digits=20, decimal_places=6)
@@ -82,9 +84,9 @@ def buy_set_based_pairs(payload: Dict[Pair, Tuple[Decimal, Decimal]]) -> None:
                 ),
                 quantity=ExpressionWrapper(den, output_field=DEC),
             )
-            assert updated == 1, (
-                f"Expected 1 row updated, got {updated} for pos={pos.pk}"
-            )
+            assert (
+                updated == 1
+            ), f"Expected 1 row updated, got {updated} for pos={pos.pk}"
 
 
 def buy_safe_pairs(
@@ -115,9 +117,9 @@ def buy_safe_pairs(
             updated = Position.objects.filter(pk=pos.pk).update(
                 quantity=new_q, avg_price=new_px
             )
-            assert updated == 1, (
-                f"Expected 1 row updated, got {updated} for pos={pos.pk}"
-            )
+            assert (
+                updated == 1
+            ), f"Expected 1 row updated, got {updated} for pos={pos.pk}"
 
 
 class Command(BaseCommand):
@@ -145,14 +147,16 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.WARNING(f"Backend={connection.vendor}, mode={mode}")
         )
+        # both buyer threads run on pooled connections, closed on exit
+        pool = ConnectionPool("simulate_concurrent_buys", size=2)
 
         if mode == "unsafe":
             # Two threads hit SAME row to show lost update
             t1 = threading.Thread(
-                target=buy_unsafe_one, args=(1, 1, qty1, Decimal("20"))
+                target=pool.wrap(buy_unsafe_one), args=(1, 1, qty1, Decimal("20"))
             )
             t2 = threading.Thread(
-                target=buy_unsafe_one, args=(1, 1, qty2, Decimal("40"))
+                target=pool.wrap(buy_unsafe_one), args=(1, 1, qty2, Decimal("40"))
             )
             t1.start()
             t2.start()
@@ -161,8 +165,12 @@ class Command(BaseCommand):
 
         elif mode == "safe":
             # Same scenario but safe with row lock
-            t1 = threading.Thread(target=buy_safe_one, args=(1, 1, qty1, Decimal("20")))
-            t2 = threading.Thread(target=buy_safe_one, args=(1, 1, qty2, Decimal("40")))
+            t1 = threading.Thread(
+                target=pool.wrap(buy_safe_one), args=(1, 1, qty1, Decimal("20"))
+            )
+            t2 = threading.Thread(
+                target=pool.wrap(buy_safe_one), args=(1, 1, qty2, Decimal("40"))
+            )
             t1.start()
             t2.start()
             t1.join()
@@ -182,13 +190,19 @@ class Command(BaseCommand):
                 (2, 1): (Decimal("3"), Decimal("10")),
                 (2, 2): (Decimal("4"), Decimal("10")),
             }
-            t1 = threading.Thread(target=buy_set_based_pairs, args=(payload1,))
-            t2 = threading.Thread(target=buy_set_based_pairs, args=(payload2,))
+            t1 = threading.Thread(
+                target=pool.wrap(buy_set_based_pairs), args=(payload1,)
+            )
+            t2 = threading.Thread(
+                target=pool.wrap(buy_set_based_pairs), args=(payload2,)
+            )
             t1.start()
             t2.start()
             t1.join()
             t2.join()
 
+        pool.close()
+
         for pos in Position.objects.filter(
             portfolio_id__in=[1, 2], asset_id__in=[1, 2]
         ).order_by("portfolio_id", "asset_id"):
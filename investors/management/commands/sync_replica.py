@@ -0,0 +1,41 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.db_router import replica_aliases
+
+
+class Command(BaseCommand):
+    """
+    Local replication for the two-file SQLite setup: snapshots the primary
+    into each SQLite replica with the online backup API. Run it on a loop
+    (or not) to get replicas that trail the primary by a known lag.
+    Postgres replicas are fed by streaming replication, not by this command.
+    """
+
+    help = "Copy the SQLite primary into the SQLite read replicas."
+
+    def handle(self, *args, **opts):
+        primary = connections[DEFAULT_DB_ALIAS]
+        targets = [a for a in replica_aliases() if connections[a].vendor == "sqlite"]
+        if primary.vendor != "sqlite" or not targets:
+            raise CommandError(
+                "needs a SQLite primary and sqlite:/// DATABASE_REPLICA_URLS"
+            )
+        for alias in targets:
+            connections[alias].close()  # no open handle while the file is replaced
+            start = time.perf_counter()
+            src = sqlite3.connect(primary.settings_dict["NAME"])
+            dst = sqlite3.connect(connections[alias].settings_dict["NAME"])
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{alias} synced in {1000 * (time.perf_counter() - start):.1f}ms"
+                )
+            )
@@ -1,31 +1,16 @@
 import asyncio
-from typing import Dict, Tuple, get_args
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, get_args
 
 from django.core.management.base import BaseCommand
-from django.db import transaction
 
-from investors.management.quotes_io import fetch_quotes_async
-from investors.management.utils.timer import timer
-from investors.management.utils.types_and_enums import Source
+from investors.management.quotes_io import ParseOffload, fetch_quotes_async
+from investors.management.utils.timer import LoopLagMonitor, timer
+from investors.management.utils.types_and_enums import Bar, Source
 from investors.models import Asset
-
-
-def collect_to_update(quotes, assets_by_id):
-    to_update = []
-    for aid, (p, v) in quotes.items():
-        asset = assets_by_id[aid]
-        if not asset:
-            continue
-        changed = False
-        if p != asset.price:
-            asset.price = p
-            changed = True
-        if v != asset.volatility:
-            asset.volatility = v
-            changed = True
-        if changed:
-            to_update.append(asset)
-    return to_update
+from investors.price_services import store_bars_and_refresh_vol
+from investors.quote_services import apply_quotes
 
 
 class Command(BaseCommand):
@@ -34,6 +19,32 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("--source", choices=list(get_args(Source)), default="demo")
         parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument(
+            "--parse-mode",
+            choices=["inline", "offload"],
+            default="inline",
+            help="offload: decode Yahoo bodies and compute vol on an executor.",
+        )
+        parser.add_argument(
+            "--parse-executor", choices=["process", "thread"], default="process"
+        )
+        parser.add_argument("--parse-workers", type=int, default=None)
+        parser.add_argument("--max-pending-parses", type=int, default=32)
+        parser.add_argument(
+            "--report-lag",
+            action="store_true",
+            help="Sample event-loop lag during the fetch and print a summary.",
+        )
+        parser.add_argument(
+            "--store-bars",
+            action="store_true",
+            help="Upsert fetched daily bars into EODPrice and take vol from stored returns.",
+        )
+        parser.add_argument(
+            "--rebuild-vol",
+            action="store_true",
+            help="Replay full EODPrice history instead of advancing the running vol state.",
+        )
 
     def handle(self, *args, **opts):
         source = opts["source"]
@@ -51,26 +62,51 @@ class Command(BaseCommand):
             )
         )
 
-        with timer("Async fetch"):
-            quotes: Dict[int, Tuple[float, float]] = asyncio.run(
-                fetch_quotes_async(id_and_ticker, source, concurrency)
-            )
-        self.stdout.write(self.style.SUCCESS(f"Fetched {len(quotes)} quotes."))
+        bars: Optional[Dict[int, List[Bar]]] = {} if opts["store_bars"] else None
+        lag = LoopLagMonitor() if opts["report_lag"] else None
+        with contextlib.ExitStack() as stack:
+            offload = None
+            if opts["parse_mode"] == "offload":
+                pool_cls = (
+                    ProcessPoolExecutor
+                    if opts["parse_executor"] == "process"
+                    else ThreadPoolExecutor
+                )
+                pool = stack.enter_context(pool_cls(max_workers=opts["parse_workers"]))
+                offload = ParseOffload(pool, max_pending=opts["max_pending_parses"])
 
-        ids = quotes.keys()
-        assets_by_id = Asset.objects.in_bulk(ids)
-        if not assets_by_id:
+            with timer("Async fetch"):
+                quotes: Dict[int, Tuple[float, float]] = asyncio.run(
+                    fetch_quotes_async(
+                        id_and_ticker,
+                        source,
+                        concurrency,
+                        bars=bars,
+                        offload=offload,
+                        lag_monitor=lag,
+                    )
+                )
+        self.stdout.write(self.style.SUCCESS(f"Fetched {len(quotes)} quotes."))
+        if lag is not None:
+            stats = lag.summary()
             self.stdout.write(
-                self.style.WARNING("No matching assets for returned quotes.")
+                self.style.NOTICE(
+                    f"Event-loop lag (parse_mode={opts['parse_mode']}): "
+                    f"mean={stats['mean_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms "
+                    f"max={stats['max_ms']:.2f}ms over {stats['samples']} samples"
+                )
             )
-            return
-        to_update = collect_to_update(quotes, assets_by_id)
-        if not to_update:
+
+        if bars:
+            with timer("EODPrice upsert + vol refresh"):
+                written = store_bars_and_refresh_vol(
+                    quotes, bars, rebuild=opts["rebuild_vol"]
+                )
+            self.stdout.write(self.style.SUCCESS(f"Upserted {written} daily bars."))
+
+        with timer("Quote apply"):
+            changed_ids = apply_quotes(quotes)
+        if not changed_ids:
             self.stdout.write("Quotes identical to current values. Nothing to update.")
             return
-
-        with transaction.atomic():
-            Asset.objects.bulk_update(
-                to_update, ["price", "volatility"], batch_size=500
-            )
-        self.stdout.write(self.style.SUCCESS(f"Updated {len(to_update)} assets."))
+        self.stdout.write(self.style.SUCCESS(f"Updated {len(changed_ids)} assets."))
@@ -1,30 +1,13 @@
-from typing import get_args
+from typing import Dict, List, Optional, get_args
 
 from django.core.management.base import BaseCommand
-from django.db import transaction
 
 from investors.management.threaded_fetch import fetch_quotes_threaded
 from investors.management.utils.timer import timer
-from investors.management.utils.types_and_enums import Source
+from investors.management.utils.types_and_enums import Bar, Source
 from investors.models import Asset
-
-
-def collect_to_update(quotes, assets_by_id):
-    to_update = []
-    for aid, (p, v) in quotes.items():
-        asset = assets_by_id[aid]
-        if not asset:
-            continue
-        changed = False
-        if p != asset.price:
-            asset.price = p
-            changed = True
-        if v != asset.volatility:
-            asset.volatility = v
-            changed = True
-        if changed:
-            to_update.append(asset)
-    return to_update
+from investors.price_services import store_bars_and_refresh_vol
+from investors.quote_services import apply_quotes
 
 
 class Command(BaseCommand):
@@ -33,6 +16,16 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("--source", choices=list(get_args(Source)), default="demo")
         parser.add_argument("--max-workers", type=int, default=50)
+        parser.add_argument(
+            "--store-bars",
+            action="store_true",
+            help="Upsert fetched daily bars into EODPrice and take vol from stored returns.",
+        )
+        parser.add_argument(
+            "--rebuild-vol",
+            action="store_true",
+            help="Replay full EODPrice history instead of advancing the running vol state.",
+        )
 
     def handle(self, *args, **opts):
         source = opts["source"]
@@ -51,21 +44,18 @@ class Command(BaseCommand):
             )
         )
 
+        bars: Optional[Dict[int, List[Bar]]] = {} if opts["store_bars"] else None
         with timer("Threaded fetch"):
-            quotes = fetch_quotes_threaded(aid_and_tkr, source, max_workers)
+            quotes = fetch_quotes_threaded(aid_and_tkr, source, max_workers, bars=bars)
         self.stdout.write(self.style.SUCCESS(f"Fetched {len(quotes)} quotes."))
-        print(quotes)
-        ids = quotes.keys()
-        assets_by_id = Asset.objects.in_bulk(ids)
-        if not assets_by_id:
-            self.stdout.write(
-                self.style.WARNING("No matching assets for returned quotes.")
-            )
-            return
-        to_update = collect_to_update(quotes, assets_by_id)
-        with transaction.atomic():
-            if to_update:
-                Asset.objects.bulk_update(
-                    to_update, ["price", "volatility"], batch_size=500
+
+        if bars:
+            with timer("EODPrice upsert + vol refresh"):
+                written = store_bars_and_refresh_vol(
+                    quotes, bars, rebuild=opts["rebuild_vol"]
                 )
-        self.stdout.write(self.style.SUCCESS(f"Updated {len(to_update)} assets."))
+            self.stdout.write(self.style.SUCCESS(f"Upserted {written} daily bars."))
+        print(quotes)
+        with timer("Quote apply"):
+            changed_ids = apply_quotes(quotes)
+        self.stdout.write(self.style.SUCCESS(f"Updated {len(changed_ids)} assets."))
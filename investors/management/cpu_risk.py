@@ -2,14 +2,24 @@ from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from math import sqrt
 from random import gauss
+from statistics import NormalDist
 from typing import Dict, List, Optional
 
+import numpy as np
+
+from investors.price_cache import PriceCache
+
 
 @dataclass
 class Position:
     weight: float  # shares
     price: float
     volatility: float
+    asset_id: Optional[int] = None
+
+
+# per-process handle on the mmap'd price cache, opened once by the pool initializer
+_price_cache: Optional[PriceCache] = None
 
 
 # paths = days
@@ -35,7 +45,41 @@ def value_at_risk(pnls, alpha=0.95) -> int:
     return -sorted_pnls[idx]
 
 
-def task(positions, paths, alpha=0.95):
+def _open_price_cache(root) -> None:
+    global _price_cache
+    _price_cache = PriceCache.open(root)
+
+
+def _with_history_vol(positions: List[Position], window: int) -> List[Position]:
+    # vol from cached closes where the asset has enough history, else keep the quote's
+    vols = _price_cache.volatilities(
+        [p.asset_id for p in positions if p.asset_id is not None], window
+    )
+    return [
+        Position(p.weight, p.price, vols.get(p.asset_id, p.volatility), p.asset_id)
+        for p in positions
+    ]
+
+
+def parametric_var(
+    market_values: np.ndarray,
+    port_vols: np.ndarray,
+    alpha: float = 0.95,
+    horizon_days: int = 1,
+) -> np.ndarray:
+    """
+    Closed-form counterpart of `value_at_risk(simulate_portfolio_pnl(...))` for
+    whole books at once: the same normal daily returns, so VaR is
+    z_alpha * sigma_daily * sqrt(horizon) * market value.
+    """
+    z = NormalDist().inv_cdf(alpha)
+    daily = np.nan_to_num(port_vols) / sqrt(252.0)
+    return z * daily * sqrt(horizon_days) * market_values
+
+
+def task(positions, paths, alpha=0.95, vol_window=None):
+    if vol_window and _price_cache is not None:
+        positions = _with_history_vol(positions, vol_window)
     pnls = simulate_portfolio_pnl(positions, paths=paths)
     return value_at_risk(pnls, alpha)
 
@@ -44,10 +88,19 @@ def portfolio_var_parallel(
     portfolios_inputs: Dict[int, List[Position]],
     paths: int = 50_000,
     max_workers: Optional[int] = None,
+    price_cache_dir=None,
+    vol_window: Optional[int] = None,
 ) -> Dict[int, float]:
-    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+    """
+    With `price_cache_dir` and `vol_window`, each worker maps the price cache
+    once and derives position vols from cached history instead of the DB.
+    """
+    init = {}
+    if price_cache_dir and vol_window:
+        init = {"initializer": _open_price_cache, "initargs": (price_cache_dir,)}
+    with ProcessPoolExecutor(max_workers=max_workers, **init) as pool:
         futures = {
-            idx: pool.submit(task, positions, paths)
+            idx: pool.submit(task, positions, paths, vol_window=vol_window)
             for idx, positions in portfolios_inputs.items()
         }
 
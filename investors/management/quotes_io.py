@@ -3,13 +3,18 @@ from __future__ import annotations
 import asyncio
 import json
 import random
+from concurrent.futures import Executor
+from math import isnan
 from typing import Dict, Iterable, List, Optional, Tuple
 
 from investors.management.utils.parser_and_financial_computations import (
+    annualized_volatility_batch,
     demo_quote,
+    parse_yahoo_chart_bars,
     parse_yahoo_chart_payload,
 )
-from investors.management.utils.types_and_enums import Source
+from investors.management.utils.timer import LoopLagMonitor
+from investors.management.utils.types_and_enums import Bar, Source
 
 try:
     import aiohttp
@@ -21,6 +26,11 @@ try:
 except ImportError:
     requests = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 YAHOO_CHART_URL = (
     "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}?range=3mo&interval=1d"
 )
@@ -29,6 +39,10 @@ ALPHAVANTAGE_URL = "https://www.alphavantage.co/query"
 ALPHAVANTAGE_API_KEY = "WTU2S8XTKLIY589G"
 
 
+def _fast_loads(raw: bytes):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
 async def _fake_network_fetch(asset_id: int, ticker: str) -> Tuple[int, float, float]:
     await asyncio.sleep(0.1 + hash(ticker) % 300 / 1000.0)
     price, vol = demo_quote(ticker)
@@ -70,14 +84,13 @@ def _parse_retry_after(seconds_or_date: str) -> Optional[float]:
         return None
 
 
-async def _yahoo_fetch(
+async def _yahoo_get_bytes(
     session,
-    asset_id,
     symbol,
     max_retries: int = 4,
     base_delay: float = 0.4,
     cap_delay: float = 6.0,  # an upper bound so the wait doesn’t explode forever
-) -> Optional[Tuple[int, float, float]]:
+) -> Optional[bytes]:
     url = YAHOO_CHART_URL.format(symbol=symbol)
 
     attempt = 0
@@ -111,12 +124,7 @@ async def _yahoo_fetch(
 
                 # Other 4xx raise for non retriable client errors
                 resp.raise_for_status()
-                payload = await resp.json(loads=json.loads)
-                parsed = parse_yahoo_chart_payload(payload)
-                if parsed is None:
-                    return None
-                price, vol = parsed
-                return asset_id, price, vol
+                return await resp.read()
         except (
             aiohttp.ClientConnectionError,
             aiohttp.ServerTimeoutError,
@@ -132,12 +140,134 @@ async def _yahoo_fetch(
             return None
 
 
+async def _yahoo_fetch(
+    session,
+    asset_id,
+    symbol,
+    bars: Optional[Dict[int, List[Bar]]] = None,
+    **retry_opts,
+) -> Optional[Tuple[int, float, float]]:
+    raw = await _yahoo_get_bytes(session, symbol, **retry_opts)
+    if raw is None:
+        return None
+    # inline mode: decoding and the vol math run on the event loop
+    payload = json.loads(raw)
+    parsed = parse_yahoo_chart_payload(payload)
+    if parsed is None:
+        return None
+    if bars is not None:
+        # keep the daily series for EODPrice instead of dropping it
+        bars[asset_id] = parse_yahoo_chart_bars(payload)
+    price, vol = parsed
+    return asset_id, price, vol
+
+
+ChartExtract = Tuple[float, List[Optional[float]], Optional[List[Bar]]]
+
+
+def extract_chart_bytes(raw: bytes, with_bars: bool = False) -> Optional[ChartExtract]:
+    """
+    Executor side of the offload mode: decode a raw chart body and pull out
+    (last price, closes, bars). Top-level so it pickles into a process pool.
+    """
+    try:
+        payload = _fast_loads(raw)
+        closes = payload["chart"]["result"][0]["indicators"]["quote"][0]["close"]
+    except Exception:
+        return None
+    price = next((float(c) for c in reversed(closes) if c is not None), None)
+    if price is None:
+        return None
+    return price, closes, parse_yahoo_chart_bars(payload) if with_bars else None
+
+
+class ParseOffload:
+    """
+    Moves chart decoding off the event loop onto `executor`. At most
+    `max_pending` bodies are queued on the executor; further fetchers wait
+    for a slot, which keeps memory bounded when the network outpaces parsing.
+    """
+
+    def __init__(self, executor: Executor, max_pending: int = 32):
+        self.executor = executor
+        self._slots = asyncio.Semaphore(max_pending)
+        self.closes: Dict[int, List[Optional[float]]] = {}
+
+    async def run(self, fn, *args):
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, *args)
+
+    async def fetch(
+        self, session, asset_id, symbol, bars: Optional[Dict[int, List[Bar]]] = None
+    ) -> Optional[float]:
+        raw = await _yahoo_get_bytes(session, symbol)
+        if raw is None:
+            return None
+        extracted = await self.run(extract_chart_bytes, raw, bars is not None)
+        if extracted is None:
+            return None
+        price, closes, day_bars = extracted
+        self.closes[asset_id] = closes
+        if bars is not None:
+            bars[asset_id] = day_bars
+        return price
+
+    async def volatilities(self) -> Dict[int, float]:
+        """One vectorized vol pass over every series collected so far."""
+        if not self.closes:
+            return {}
+        ids = list(self.closes)
+        rows = [self.closes[aid] for aid in ids]
+        vols = await self.run(annualized_volatility_batch, rows)
+        # same fallback as parse_yahoo_chart_payload for too-short history
+        return {aid: 0.0 if isnan(v) else float(v) for aid, v in zip(ids, vols)}
+
+
 async def fetch_quotes_async(
     ids_and_names: Iterable[Tuple[int, str]],
     source: Source = "demo",
     concurrency: int = 50,
     total_timeout_sec: float = 30.0,
     connector_limit: int = 100,
+    bars: Optional[Dict[int, List[Bar]]] = None,
+    offload: Optional[ParseOffload] = None,
+    lag_monitor: Optional[LoopLagMonitor] = None,
+) -> Dict[int, Tuple[float, float]]:
+    """
+    `offload` moves Yahoo body decoding and the vol math onto an executor;
+    `lag_monitor` samples event-loop lag for the duration of the fetch.
+    """
+    if lag_monitor is None:
+        return await _fetch_quotes(
+            ids_and_names,
+            source,
+            concurrency,
+            total_timeout_sec,
+            connector_limit,
+            bars,
+            offload,
+        )
+    async with lag_monitor:
+        return await _fetch_quotes(
+            ids_and_names,
+            source,
+            concurrency,
+            total_timeout_sec,
+            connector_limit,
+            bars,
+            offload,
+        )
+
+
+async def _fetch_quotes(
+    ids_and_names: Iterable[Tuple[int, str]],
+    source: Source,
+    concurrency: int,
+    total_timeout_sec: float,
+    connector_limit: int,
+    bars: Optional[Dict[int, List[Bar]]],
+    offload: Optional[ParseOffload],
 ) -> Dict[int, Tuple[float, float]]:
     result: Dict[int, Tuple[float, float]] = {}
 
@@ -171,8 +301,13 @@ async def fetch_quotes_async(
             aid: int, symbol: str
         ) -> Optional[Tuple[int, Tuple[float, float]]]:
             async with sem:
+                if source == "yahoo" and offload is not None:
+                    price = await offload.fetch(session, aid, symbol, bars=bars)
+                    if price is not None:
+                        result[aid] = (price, 0.0)  # vol filled in below
+                    return
                 data = (
-                    await _yahoo_fetch(session, aid, symbol)
+                    await _yahoo_fetch(session, aid, symbol, bars=bars)
                     if source == "yahoo"
                     else await _alpha_vantage_fetch(
                         session, ALPHAVANTAGE_API_KEY, aid, symbol
@@ -185,4 +320,8 @@ async def fetch_quotes_async(
         tasks = [bounded_real(aid, name) for aid, name in ids_and_names]
         await asyncio.gather(*tasks, return_exceptions=False)
 
+    if source == "yahoo" and offload is not None:
+        for aid, vol in (await offload.volatilities()).items():
+            if aid in result:
+                result[aid] = (result[aid][0], vol)
     return result
@@ -1,14 +1,20 @@
+import logging
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Iterable, Optional, Tuple
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from investors.management.utils.parser_and_financial_computations import (
     demo_quote,
+    parse_yahoo_chart_bars,
     parse_yahoo_chart_payload,
 )
-from investors.management.utils.types_and_enums import Source
+from investors.management.utils.types_and_enums import Bar, Source
 
 YAHOO_CHART_URL = (
     "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}?range=3mo&interval=1d"
@@ -17,6 +23,52 @@ ALPHAVANTAGE_URL = "https://www.alphavantage.co/query"
 
 ALPHAVANTAGE_API_KEY = "WTU2S8XTKLIY589G" #free tier key , they give this to anyone right away
 
+log = logging.getLogger(__name__)
+
+# Same retry budget as quotes_io._yahoo_fetch: 4 retries, 0.4s base, 6s cap, jitter
+MAX_RETRIES = 4
+BASE_DELAY = 0.4
+CAP_DELAY = 6.0
+POOL_MAXSIZE = 10
+
+_local = threading.local()
+
+
+def make_session(pool_maxsize: int = POOL_MAXSIZE) -> requests.Session:
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BASE_DELAY,
+        backoff_max=CAP_DELAY,
+        backoff_jitter=BASE_DELAY,  # desynchronize clients
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # hand the last response back; raise_for_status decides
+    )
+    adapter = HTTPAdapter(
+        pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _thread_session() -> requests.Session:
+    # one pooled keep-alive session per worker thread; Session isn't thread-safe
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = make_session()
+    return session
+
+
+def _http_get(url: str, pooled: bool = True, **kwargs) -> requests.Response:
+    if pooled:
+        return _thread_session().get(url, **kwargs)
+    # fresh connection (TCP + TLS handshake) per request, same retry policy
+    with make_session() as session:
+        return session.get(url, **kwargs)
+
 
 def _fake_network_fetch(asset_id: int, ticker: str) -> Tuple[int, float, float]:
     time.sleep(0.1 + hash(ticker) % 300 / 1000.0)
@@ -24,14 +76,17 @@ def _fake_network_fetch(asset_id: int, ticker: str) -> Tuple[int, float, float]:
     return asset_id, price, vol
 
 
-def _alpha_vantage_fetch(asset_id: int, ticker: str) -> Tuple[int, float, float]:
+def _alpha_vantage_fetch(
+    asset_id: int, ticker: str, pooled: bool = True
+) -> Tuple[int, float, float]:
     params = {
         "function": "GLOBAL_QUOTE",
         "symbol": ticker,
         "apikey": ALPHAVANTAGE_API_KEY,
     }
 
-    with requests.get(ALPHAVANTAGE_URL, params=params, timeout=10) as res:
+    with _http_get(ALPHAVANTAGE_URL, pooled, params=params, timeout=10) as res:
+        res.raise_for_status()
         data = res.json()
 
     price_str = data.get("Global Quote", {}).get("05. price")
@@ -43,12 +98,22 @@ def _alpha_vantage_fetch(asset_id: int, ticker: str) -> Tuple[int, float, float]
     return asset_id, price, vol
 
 
-def _yahoo_fetch(asset_id: int, name: str) -> Optional[Tuple[float, float, float]]:
+def _yahoo_fetch(
+    asset_id: int,
+    name: str,
+    bars: Optional[Dict[int, List[Bar]]] = None,
+    pooled: bool = True,
+) -> Optional[Tuple[float, float, float]]:
     url = YAHOO_CHART_URL.format(symbol=name)
-    r = requests.get(url, timeout=8)
-    r.raise_for_status()
-    payload = r.json()
+    with _http_get(url, pooled, timeout=8) as r:
+        r.raise_for_status()
+        payload = r.json()
     parsed = parse_yahoo_chart_payload(payload)
+    if parsed is None:
+        return None
+    if bars is not None:
+        # distinct key per asset, so concurrent writers don't collide
+        bars[asset_id] = parse_yahoo_chart_bars(payload)
     price, vol = parsed
     return asset_id, price, vol
 
@@ -57,21 +122,31 @@ def fetch_quotes_threaded(
     assets: Iterable[tuple[int, str]],
     source: Source = "demo",
     max_workers: int = 50,
+    bars: Optional[Dict[int, List[Bar]]] = None,
+    pooled: bool = True,
 ) -> dict[int, tuple[float, float]]:
     result: dict[int, tuple[float, float]] = {}
     fn = None
     if source == "demo":
         fn = _fake_network_fetch
     if source == "alphavantage":
-        fn = _alpha_vantage_fetch
+        fn = partial(_alpha_vantage_fetch, pooled=pooled)
     if source == "yahoo":
-        fn = _yahoo_fetch
+        fn = partial(_yahoo_fetch, bars=bars, pooled=pooled)
 
     # free-tier: keep workers small to respect rate limits
     max_workers = min(max_workers, 5)
     with ThreadPoolExecutor(max_workers=max_workers) as pool:
-        futs = [pool.submit(fn, aid, tkr) for aid, tkr in assets]
+        futs = {pool.submit(fn, aid, tkr): (aid, tkr) for aid, tkr in assets}
         for fut in as_completed(futs):
-            aid, price, vol = fut.result()
-            result[aid] = (price, vol)
+            # one failed symbol must not abort the rest of the batch
+            try:
+                data = fut.result()
+            except (requests.RequestException, ValueError) as e:
+                aid, tkr = futs[fut]
+                log.warning(f"quote fetch failed for asset={aid} ({tkr}): {e}")
+                continue
+            if data:
+                aid, price, vol = data
+                result[aid] = (price, vol)
     return result
@@ -1,6 +1,11 @@
 import math
 import statistics
-from typing import List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from investors.management.utils.types_and_enums import Bar
 
 
 def annualized_volatility_from_closes(closes: List[float]) -> Optional[float]:
@@ -20,6 +25,87 @@ def annualized_volatility_from_closes(closes: List[float]) -> Optional[float]:
     return float(daily_sigma * math.sqrt(252.0))
 
 
+CloseMatrix = Union[np.ndarray, Sequence[Sequence[Optional[float]]]]
+
+
+def _as_padded_closes(closes: CloseMatrix) -> np.ndarray:
+    """Ragged rows / None -> 2-D float64 array padded with NaN."""
+    if isinstance(closes, np.ndarray):
+        arr = np.array(closes, dtype=np.float64, ndmin=2)
+    else:
+        rows = [[np.nan if c is None else float(c) for c in row] for row in closes]
+        width = max((len(r) for r in rows), default=0)
+        arr = np.full((len(rows), width), np.nan)
+        for i, row in enumerate(rows):
+            arr[i, : len(row)] = row
+    # drop missing closes per row like the scalar version does: a stable sort
+    # on the NaN mask packs the remaining closes to the left in order
+    order = np.argsort(np.isnan(arr), axis=1, kind="stable")
+    return np.take_along_axis(arr, order, axis=1)
+
+
+def _masked_log_returns(arr: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    p0, p1 = arr[:, :-1], arr[:, 1:]
+    rets = np.zeros_like(p0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        valid = (p0 > 0) & (p1 > 0)
+        np.log(p1 / p0, out=rets, where=valid)
+    return rets, valid
+
+
+def annualized_volatility_batch(closes: CloseMatrix) -> np.ndarray:
+    """
+    Vectorized annualized_volatility_from_closes for many series at once.
+    Rows may be ragged or NaN/None padded; rows that cannot produce a
+    volatility come back as NaN.
+    """
+    arr = _as_padded_closes(closes)
+    if arr.shape[1] < 2:
+        return np.full(arr.shape[0], np.nan)
+    rets, valid = _masked_log_returns(arr)
+    n = valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = rets.sum(axis=1) / n
+        dev = np.where(valid, rets - mean[:, None], 0.0)
+        var = (dev * dev).sum(axis=1) / (n - 1)
+    return np.where(n >= 2, np.sqrt(var) * math.sqrt(252.0), np.nan)
+
+
+def rolling_annualized_volatility(closes: CloseMatrix, window: int) -> np.ndarray:
+    """
+    Historical vol curve over the last `window` returns, per row. Column j
+    holds the vol of the window ending at return j (after dropping missing
+    closes); NaN until the window holds at least 2 returns.
+    """
+    if window < 2:
+        raise ValueError("window must be >= 2 returns")
+    arr = _as_padded_closes(closes)
+    if arr.shape[1] < 2:
+        return np.empty((arr.shape[0], 0))
+    rets, valid = _masked_log_returns(arr)
+    count_total = valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # center on the row mean first so the running sums stay well conditioned
+        center = np.where(count_total > 0, rets.sum(axis=1) / count_total, 0.0)
+    x = np.where(valid, rets - center[:, None], 0.0)
+
+    def _window_sum(a: np.ndarray) -> np.ndarray:
+        c = np.cumsum(a, axis=1)
+        out = c.copy()
+        out[:, window:] -= c[:, :-window]
+        return out
+
+    n = _window_sum(valid.astype(np.float64))
+    s1 = _window_sum(x)
+    s2 = _window_sum(x * x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = np.maximum(s2 - s1 * s1 / n, 0.0) / (n - 1)
+    # columns past a short row's last close are padding, not history
+    n_slots = (~np.isnan(arr)).sum(axis=1) - 1
+    in_row = np.arange(rets.shape[1])[None, :] < n_slots[:, None]
+    return np.where((n >= 2) & in_row, np.sqrt(var) * math.sqrt(252.0), np.nan)
+
+
 def parse_yahoo_chart_payload(payload: dict) -> Optional[Tuple[float, float]]:
     """Extract (price, vol) from Yahoo chart JSON payload."""
     try:
@@ -38,6 +124,28 @@ def parse_yahoo_chart_payload(payload: dict) -> Optional[Tuple[float, float]]:
         return None
 
 
+def parse_yahoo_chart_bars(payload: dict) -> List[Bar]:
+    """Extract daily bars from Yahoo chart JSON payload, skipping null closes."""
+    try:
+        result = payload["chart"]["result"][0]
+        timestamps = result.get("timestamp") or []
+        quote = result["indicators"]["quote"][0]
+        closes = quote["close"]
+        volumes = quote.get("volume") or [None] * len(closes)
+        # bar timestamps are the session open; shift to exchange local time
+        offset = timedelta(seconds=int(result.get("meta", {}).get("gmtoffset") or 0))
+    except Exception:
+        return []
+
+    bars: List[Bar] = []
+    for ts, close, volume in zip(timestamps, closes, volumes):
+        if close is None:
+            continue
+        day = (datetime.fromtimestamp(ts, tz=timezone.utc) + offset).date()
+        bars.append(Bar(day, float(close), int(volume) if volume is not None else None))
+    return bars
+
+
 def demo_quote(ticker: str) -> Tuple[float, float]:
     base = (sum(ord(c) for c in ticker) % 25) + 5  # 5..29
     price = float(20 + base * 18)  # 20..542
@@ -1,5 +1,7 @@
+import asyncio
 import contextlib
 import time
+from typing import Dict, List, Optional
 
 
 @contextlib.contextmanager
@@ -11,3 +13,45 @@ def timer(label: str = "Block"):
         end = time.perf_counter()
         elapsed = end - start
         print(f"{label} took {elapsed:.2f} seconds")
+
+
+class LoopLagMonitor:
+    """
+    Async context manager that measures event-loop lag: how late a periodic
+    `sleep(interval)` wakes up. Anything running inline on the loop (JSON
+    decoding, math) shows up here as lag for every other coroutine.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    async def __aenter__(self) -> "LoopLagMonitor":
+        self._task = asyncio.create_task(self._probe())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+    def summary(self) -> Dict[str, float]:
+        """Lag stats in milliseconds."""
+        if not self.samples:
+            return {"samples": 0, "mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self.samples)
+        p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+        return {
+            "samples": len(ordered),
+            "mean_ms": 1000 * sum(ordered) / len(ordered),
+            "p99_ms": 1000 * p99,
+            "max_ms": 1000 * ordered[-1],
+        }
@@ -1,3 +1,10 @@
-from typing import Literal
+from datetime import date
+from typing import Literal, NamedTuple, Optional
 
 Source = Literal["demo", "alphavantage", "yahoo"]
+
+
+class Bar(NamedTuple):
+    date: date
+    close: float
+    volume: Optional[int]
@@ -1,108 +1,192 @@
-from typing import Dict, Optional
-
-from django.db.models import (
-    Case,
-    Count,
-    ExpressionWrapper,
-    F,
-    FloatField,
-    Sum,
-    Value,
-    When,
+import math
+from itertools import islice
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from investors.models import Asset, Portfolio, PortfolioStat
+from investors.price_cache import PriceCache
+from investors.price_services import VOL_WINDOW
+from investors.valuation_services import (
+    BookWeights,
+    book_weights,
+    market_value_subquery,
 )
-from django.db.models.functions import Coalesce, Sqrt
 
-from investors.models import Portfolio
+STATS_BATCH_SIZE = 2000
+# COO entries expanded against the return history at a time (entries x window floats)
+COV_CHUNK_ENTRIES = 50_000
 
 
 def annotate_metrics(qs):
     """
     Portfolio metrics:
       - asset_count: number of assets in the portfolio
-      - port_vol:    rough portfolio volatility proxy (sum of vol^2)^(1/2) / count
-      - sharpe_proxy: 1 / port_vol (only when port_vol > 0)
+      - port_vol:    position-weighted portfolio volatility, from PortfolioStat
+      - sharpe_proxy: 1 / port_vol, from PortfolioStat
+      - total_value: market value, sum of position quantity x asset price
+    port_vol / sharpe_proxy are precomputed by recompute_portfolio_stats and
+    are null until a portfolio has been through it.
+    """
+    qs_annotated = qs.annotate(
+        asset_count=Count(
+            "assets", distinct=True
+        ),  # m2m relations can bring duplicates in the table
+        port_vol=F("stat__port_vol"),
+        sharpe_proxy=F("stat__sharpe_proxy"),
+        # a subquery, not a positions join: joining both m2m paths would
+        # multiply every asset row by the number of positions
+        total_value=market_value_subquery(),
+    )
+    return qs_annotated
+
+
+def _diagonal_variance(book: BookWeights, vols: np.ndarray) -> np.ndarray:
+    # sum_i (w_i * sigma_i)^2 per portfolio: the sparse W times the vol vector
+    wv = book.weights * vols[book.cols]
+    return np.bincount(book.rows, weights=wv * wv, minlength=len(book.portfolio_ids))
+
+
+def _return_factors(
+    cache: PriceCache, asset_ids: np.ndarray, window: int
+) -> Tuple[np.ndarray, np.ndarray]:
     """
-    qs_annotated = (
-        qs.annotate(
-            asset_count=Count(
-                "assets", distinct=True
-            ),  # m2m relations can bring duplicates in the table
-            sum_var=Coalesce(
-                Sum(
-                    F("assets__volatility") * F("assets__volatility"),
-                    output_field=FloatField(),
-                ),
-                Value(0.0),
-            ),
+    Demeaned daily log returns X (assets x window) scaled so that X @ X.T is
+    the annualized covariance, plus a mask of assets with enough history.
+    Missing returns contribute zero deviation.
+    """
+    closes = cache.window_matrix(asset_ids.tolist(), window + 1)
+    p0, p1 = closes[:, :-1], closes[:, 1:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        valid = (p0 > 0) & (p1 > 0)
+        rets = np.where(valid, np.log(p1 / p0), 0.0)
+    n = valid.sum(axis=1)
+    has_history = n >= 2
+    mean = np.divide(rets.sum(axis=1), n, out=np.zeros(len(n)), where=n > 0)
+    dev = np.where(valid, rets - mean[:, None], 0.0)
+    scale = np.sqrt(252.0 / np.maximum(n - 1, 1))
+    return dev * scale[:, None], has_history
+
+
+def _covariance_variance(
+    book: BookWeights, vols: np.ndarray, cache: PriceCache, window: int
+) -> np.ndarray:
+    """
+    w' S w per portfolio without forming S: with S = X X', w' S w = |X' w|^2,
+    so only a (portfolios x window) matrix is accumulated. Assets the cache
+    has no history for fall back to their own variance (no correlation).
+    """
+    factors, has_history = _return_factors(cache, book.asset_ids, window)
+    weights = book.weights
+    exposure = np.zeros((len(book.portfolio_ids), factors.shape[1]))
+    covered = has_history[book.cols]
+    rows, cols, w = book.rows[covered], book.cols[covered], weights[covered]
+    for lo in range(0, len(rows), COV_CHUNK_ENTRIES):
+        hi = lo + COV_CHUNK_ENTRIES
+        np.add.at(exposure, rows[lo:hi], w[lo:hi, None] * factors[cols[lo:hi]])
+    var = (exposure * exposure).sum(axis=1)
+
+    missing = ~covered
+    wv = weights[missing] * vols[book.cols[missing]]
+    var += np.bincount(
+        book.rows[missing], weights=wv * wv, minlength=len(book.portfolio_ids)
+    )
+    return var
+
+
+def compute_book_metrics(
+    portfolio_ids: Optional[Iterable[int]] = None,
+    covariance: bool = False,
+    window: int = VOL_WINDOW,
+    cache: Optional[PriceCache] = None,
+) -> Dict[int, Dict[str, Optional[float]]]:
+    """
+    Position-weighted port_vol (and sharpe_proxy = 1 / port_vol) for many
+    portfolios at once. Weights are market-value weights from Positions;
+    by default assets are treated as uncorrelated (sqrt(sum (w*vol)^2)),
+    with `covariance=True` the full covariance of the last `window` returns
+    from the price cache is used. Portfolios without positions get None.
+    """
+    ids = None if portfolio_ids is None else list(portfolio_ids)
+    book = book_weights(ids)
+    vol_by_id = dict(
+        Asset.objects.filter(id__in=book.asset_ids.tolist()).values_list(
+            "id", "volatility"
         )
-        .annotate(
-            port_vol=Case(
-                When(
-                    asset_count__gt=0,
-                    then=ExpressionWrapper(
-                        Sqrt(F("sum_var")) / F("asset_count"), output_field=FloatField()
-                    ),
-                ),
-                default=Value(None, output_field=FloatField()),
-                output_field=FloatField(),
-            )
+    )
+    vols = np.array([vol_by_id.get(a) or 0.0 for a in book.asset_ids.tolist()])
+
+    if covariance:
+        cache = cache or PriceCache.open()
+    if covariance and cache is not None:
+        var = _covariance_variance(book, vols, cache, window)
+    else:
+        var = _diagonal_variance(book, vols)
+
+    out: Dict[int, Dict[str, Optional[float]]] = {
+        pid: {"port_vol": None, "sharpe_proxy": None} for pid in ids or []
+    }
+    has_value = book.market_values > 0
+    for pid, v, ok in zip(book.portfolio_ids.tolist(), var.tolist(), has_value):
+        if not ok:
+            out[pid] = {"port_vol": None, "sharpe_proxy": None}
+            continue
+        port_vol = math.sqrt(max(v, 0.0))
+        out[pid] = {
+            "port_vol": port_vol,
+            "sharpe_proxy": 1.0 / port_vol if port_vol > 0 else None,
+        }
+    return out
+
+
+def write_portfolio_stats(metrics: Dict[int, Dict[str, Optional[float]]]) -> int:
+    now = timezone.now()
+    rows = [
+        PortfolioStat(
+            portfolio_id=pid,
+            port_vol=m["port_vol"],
+            sharpe_proxy=m["sharpe_proxy"],
+            updated_at=now,
         )
-        .annotate(
-            sharpe_proxy=Case(
-                When(
-                    port_vol__gt=0,
-                    then=ExpressionWrapper(
-                        Value(1.0) / F("port_vol"), output_field=FloatField()
-                    ),
-                ),
-                default=Value(None, output_field=FloatField()),
-                output_field=FloatField(),
-            )
+        for pid, m in metrics.items()
+    ]
+    with transaction.atomic():
+        PortfolioStat.objects.bulk_create(
+            rows,
+            batch_size=STATS_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["portfolio"],
+            update_fields=["port_vol", "sharpe_proxy", "updated_at"],
         )
-        .annotate(total_value=Sum(F("positions__quantity") * F("positions__avg_price")))
+    return len(rows)
+
+
+def recompute_portfolio_stats(
+    portfolio_ids: Optional[Iterable[int]] = None,
+    covariance: bool = False,
+    window: int = VOL_WINDOW,
+    batch_size: int = STATS_BATCH_SIZE,
+) -> int:
+    """Compute and store PortfolioStat for every portfolio (or `portfolio_ids`) in batches."""
+    ids = iter(
+        portfolio_ids
+        if portfolio_ids is not None
+        else Portfolio.objects.order_by("id").values_list("id", flat=True).iterator()
     )
-    return qs_annotated
+    cache = PriceCache.open() if covariance else None
+    written = 0
+    while batch := list(islice(ids, batch_size)):
+        metrics = compute_book_metrics(
+            batch, covariance=covariance, window=window, cache=cache
+        )
+        written += write_portfolio_stats(metrics)
+    return written
 
 
 def compute_for_portfolio_id(portfolio_id: int) -> Optional[Dict[str, float]]:
-    qs = annotate_metrics(Portfolio.objects.filter(id=portfolio_id))
-    row = qs.values("port_vol", "sharpe_proxy").first()
-    if not row:
+    if not Portfolio.objects.filter(id=portfolio_id).exists():
         return None
-    return {
-        "port_vol": float(row["port_vol"]) if row["port_vol"] is not None else None,
-        "sharpe_proxy": float(row["sharpe_proxy"])
-        if row["sharpe_proxy"] is not None
-        else None,
-    }
-
-
-# def portfolio_market_value():
-#     portfolio_mv = Portfolio.objects.annotate(
-#         total_value=Sum(F("positions__qty") * F("positions__asset__price"))
-#     ).values("id", "name", "total_value")
-#     return portfolio_mv
-
-
-# def holder_concentration_per_asset():
-#     Asset.objects.annotate(
-#         holder=Count("portfolios", distinct=True, total_qty=Sum("positions__qty"))
-#     ).values("asset_id", "name", "holders", "total_qty")
-
-
-# def portfolio_weights(portfolio_id: int):
-#     Portfolio.objects.filter(id=portfolio_id).annotate(
-#         total_value=Sum(
-#             F("positions__qty") * F("positions__asset__price"),
-#             output_field=FloatField(),
-#         )
-#     ).annotate(
-#         value_of_this_row=ExpressionWrapper(
-#             F("positions__qty") * F("positions__asset__price"),
-#             output_field=FloatField(),
-#         )
-#     ).annotate(
-#         weight=ExpressionWrapper(
-#             F("value_of_this_row") / F("total_value"), output_field=FloatField()
-#         )
-#     )
+    return compute_book_metrics([portfolio_id])[portfolio_id]
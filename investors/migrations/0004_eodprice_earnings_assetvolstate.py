@@ -0,0 +1,111 @@
+# Generated by Django 4.2.23 on 2026-10-18 22:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("investors", "0003_portfoliostat"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AssetVolState",
+            fields=[
+                (
+                    "asset",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="vol_state",
+                        serialize=False,
+                        to="investors.asset",
+                    ),
+                ),
+                ("window", models.PositiveIntegerField()),
+                ("n", models.PositiveIntegerField(default=0)),
+                ("mean", models.FloatField(default=0.0)),
+                ("m2", models.FloatField(default=0.0)),
+                ("first_date", models.DateField(blank=True, null=True)),
+                ("last_date", models.DateField(blank=True, null=True)),
+                ("last_close", models.FloatField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Earnings",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("period_end", models.DateField()),
+                ("eps", models.DecimalField(decimal_places=6, max_digits=18)),
+                (
+                    "asset",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="investors.asset",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="EODPrice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("close", models.DecimalField(decimal_places=6, max_digits=18)),
+                ("volume", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "asset",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="investors.asset",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["asset", "-date"], name="investors_e_asset_i_8fc01b_idx"
+                    ),
+                    models.Index(fields=["date"], name="investors_e_date_407f4e_idx"),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="eodprice",
+            constraint=models.UniqueConstraint(
+                fields=("asset", "date"), name="uniq_asset_date"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="earnings",
+            index=models.Index(
+                fields=["asset", "-period_end"], name="investors_e_asset_i_a49461_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="earnings",
+            constraint=models.UniqueConstraint(
+                fields=("asset", "period_end"), name="uniq_asset_period"
+            ),
+        ),
+    ]
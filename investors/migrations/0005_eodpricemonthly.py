@@ -0,0 +1,48 @@
+# Generated by Django 4.2.23 on 2026-10-18 22:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("investors", "0004_eodprice_earnings_assetvolstate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EODPriceMonthly",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                ("close_last", models.DecimalField(decimal_places=6, max_digits=18)),
+                ("close_min", models.DecimalField(decimal_places=6, max_digits=18)),
+                ("close_max", models.DecimalField(decimal_places=6, max_digits=18)),
+                ("close_avg", models.DecimalField(decimal_places=6, max_digits=18)),
+                ("volume_sum", models.BigIntegerField(blank=True, null=True)),
+                ("bars", models.PositiveIntegerField()),
+                (
+                    "asset",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="investors.asset",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="eodpricemonthly",
+            constraint=models.UniqueConstraint(
+                fields=("asset", "month"), name="uniq_asset_month"
+            ),
+        ),
+    ]
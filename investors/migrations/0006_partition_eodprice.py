@@ -0,0 +1,135 @@
+"""
+Convert investors_eodprice into a date range-partitioned table on Postgres.
+
+The Django model is unchanged: same columns, same uniq_asset_date
+constraint (it includes the partition key), and the same index names.
+The primary key becomes (id, date), because Postgres requires the
+partition key in every unique index. id is a plain sequence rather than
+an identity column, which partitioned parents do not support before PG17.
+The date index is rebuilt as BRIN, because dates arrive in near-insertion
+order. Other backends are left untouched.
+
+Partition DDL is inlined rather than imported so the migration keeps
+working as investors.eod_partitions evolves; the names and bounds must
+match what that module creates later (it parses them back).
+"""
+
+from datetime import date
+
+from django.conf import settings
+from django.db import migrations
+
+OLD = "investors_eodprice_unpartitioned"
+SEQ = "investors_eodprice_part_id_seq"
+ASSET_DATE_IDX = "investors_e_asset_i_8fc01b_idx"
+DATE_IDX = "investors_e_date_407f4e_idx"
+
+
+def create_partitions(cur, first, last):
+    """One partition per month (or year) covering [first, last]."""
+    yearly = getattr(settings, "EODPRICE_PARTITION_INTERVAL", "month") == "year"
+    day = first
+    while day <= last:
+        if yearly:
+            name = f"investors_eodprice_y{day.year}"
+            start, end = date(day.year, 1, 1), date(day.year + 1, 1, 1)
+        else:
+            name = f"investors_eodprice_p{day.year}_{day.month:02d}"
+            start = date(day.year, day.month, 1)
+            end = date(day.year + (day.month == 12), day.month % 12 + 1, 1)
+        cur.execute(
+            f"CREATE TABLE {name} PARTITION OF investors_eodprice"
+            f" FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        day = end
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cur:
+        cur.execute(f"ALTER TABLE investors_eodprice RENAME TO {OLD}")
+        cur.execute(
+            f"ALTER TABLE {OLD} RENAME CONSTRAINT uniq_asset_date TO uniq_asset_date_old"
+        )
+        cur.execute(f"ALTER INDEX {ASSET_DATE_IDX} RENAME TO {ASSET_DATE_IDX}_old")
+        cur.execute(f"ALTER INDEX {DATE_IDX} RENAME TO {DATE_IDX}_old")
+
+        cur.execute(f"CREATE SEQUENCE {SEQ} AS bigint")
+        cur.execute(f"""
+            CREATE TABLE investors_eodprice (
+                id bigint NOT NULL DEFAULT nextval('{SEQ}'),
+                date date NOT NULL,
+                close numeric(18, 6) NOT NULL,
+                volume bigint NULL,
+                asset_id bigint NOT NULL
+                    REFERENCES investors_asset (id) DEFERRABLE INITIALLY DEFERRED,
+                PRIMARY KEY (id, date),
+                CONSTRAINT uniq_asset_date UNIQUE (asset_id, date)
+            ) PARTITION BY RANGE (date)
+            """)
+        cur.execute(f"ALTER SEQUENCE {SEQ} OWNED BY investors_eodprice.id")
+        cur.execute(
+            f"CREATE INDEX {ASSET_DATE_IDX} ON investors_eodprice (asset_id, date DESC)"
+        )
+        cur.execute(f"CREATE INDEX {DATE_IDX} ON investors_eodprice USING brin (date)")
+
+        cur.execute(f"SELECT min(date), max(date), max(id) FROM {OLD}")
+        first, last, max_id = cur.fetchone()
+        today = date.today()
+        create_partitions(cur, min(first or today, today), max(last or today, today))
+        cur.execute(
+            f"INSERT INTO investors_eodprice (id, date, close, volume, asset_id)"
+            f" SELECT id, date, close, volume, asset_id FROM {OLD}"
+        )
+        if max_id:
+            cur.execute("SELECT setval(%s, %s)", [SEQ, max_id])
+        cur.execute(f"DROP TABLE {OLD}")
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cur:
+        cur.execute(f"ALTER TABLE investors_eodprice RENAME TO {OLD}")
+        cur.execute(
+            f"ALTER TABLE {OLD} RENAME CONSTRAINT uniq_asset_date TO uniq_asset_date_old"
+        )
+        cur.execute(f"ALTER INDEX {ASSET_DATE_IDX} RENAME TO {ASSET_DATE_IDX}_old")
+        cur.execute(f"ALTER INDEX {DATE_IDX} RENAME TO {DATE_IDX}_old")
+        cur.execute("""
+            CREATE TABLE investors_eodprice (
+                id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                date date NOT NULL,
+                close numeric(18, 6) NOT NULL,
+                volume bigint NULL,
+                asset_id bigint NOT NULL
+                    REFERENCES investors_asset (id) DEFERRABLE INITIALLY DEFERRED,
+                CONSTRAINT uniq_asset_date UNIQUE (asset_id, date)
+            )
+            """)
+        cur.execute(
+            f"CREATE INDEX {ASSET_DATE_IDX} ON investors_eodprice (asset_id, date DESC)"
+        )
+        cur.execute(f"CREATE INDEX {DATE_IDX} ON investors_eodprice (date)")
+        cur.execute(
+            f"INSERT INTO investors_eodprice (id, date, close, volume, asset_id)"
+            f" OVERRIDING SYSTEM VALUE"
+            f" SELECT id, date, close, volume, asset_id FROM {OLD}"
+        )
+        cur.execute(
+            "SELECT setval(pg_get_serial_sequence('investors_eodprice', 'id'),"
+            " coalesce(max(id), 1)) FROM investors_eodprice"
+        )
+        cur.execute(f"DROP TABLE {OLD}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("investors", "0005_eodpricemonthly"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.23 on 2026-10-18 23:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("investors", "0006_partition_eodprice"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AssetLatest",
+            fields=[
+                (
+                    "asset",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="latest",
+                        serialize=False,
+                        to="investors.asset",
+                    ),
+                ),
+                (
+                    "close",
+                    models.DecimalField(decimal_places=6, max_digits=18, null=True),
+                ),
+                ("close_date", models.DateField(blank=True, null=True)),
+                ("volume", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "eps",
+                    models.DecimalField(decimal_places=6, max_digits=18, null=True),
+                ),
+                ("eps_period_end", models.DateField(blank=True, null=True)),
+                (
+                    "eps_ttm",
+                    models.DecimalField(decimal_places=6, max_digits=18, null=True),
+                ),
+                ("pe", models.FloatField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.23 on 2026-10-18 23:09
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("investors", "0007_assetlatest"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AssetExposure",
+            fields=[
+                (
+                    "asset",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="exposure",
+                        serialize=False,
+                        to="investors.asset",
+                    ),
+                ),
+                ("holders", models.PositiveIntegerField(default=0)),
+                (
+                    "total_quantity",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0"), max_digits=28
+                    ),
+                ),
+                ("market_value", models.FloatField(default=0.0)),
+                ("top_holders", models.JSONField(default=list)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -86,6 +86,24 @@ class EODPrice(models.Model):
         ]
 
 
+class EODPriceMonthly(models.Model):
+    """Monthly rollup of EODPrice, kept after daily bars age out of retention."""
+
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE)
+    month = models.DateField()  # first day of the month
+    close_last = models.DecimalField(max_digits=18, decimal_places=6)
+    close_min = models.DecimalField(max_digits=18, decimal_places=6)
+    close_max = models.DecimalField(max_digits=18, decimal_places=6)
+    close_avg = models.DecimalField(max_digits=18, decimal_places=6)
+    volume_sum = models.BigIntegerField(null=True, blank=True)
+    bars = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["asset", "month"], name="uniq_asset_month")
+        ]
+
+
 class Earnings(models.Model):
     asset = models.ForeignKey(Asset, on_delete=models.CASCADE)
     period_end = models.DateField()  # quarter end
@@ -100,6 +118,52 @@ class Earnings(models.Model):
         indexes = [models.Index(fields=["asset", "-period_end"])]
 
 
+class AssetLatest(models.Model):
+    """
+    Latest close and EPS per asset, maintained in the same transaction as the
+    EODPrice / Earnings writes so readers never scan history for "latest".
+    reconcile_asset_latest checks it against the source tables.
+    """
+
+    asset = models.OneToOneField(
+        Asset, on_delete=models.CASCADE, related_name="latest", primary_key=True
+    )
+    close = models.DecimalField(max_digits=18, decimal_places=6, null=True)
+    close_date = models.DateField(null=True, blank=True)
+    volume = models.BigIntegerField(null=True, blank=True)
+    eps = models.DecimalField(max_digits=18, decimal_places=6, null=True)
+    eps_period_end = models.DateField(null=True, blank=True)
+    # trailing twelve months: sum of the last four quarters, when there are four
+    eps_ttm = models.DecimalField(max_digits=18, decimal_places=6, null=True)
+    pe = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"AssetLatest(a={self.asset_id}, close={self.close}@{self.close_date}, pe={self.pe})"
+
+
+class AssetExposure(models.Model):
+    """
+    Reverse-exposure index: who holds an asset and how much. Rebuilt per
+    asset on position writes; market_value follows quote updates.
+    """
+
+    asset = models.OneToOneField(
+        Asset, on_delete=models.CASCADE, related_name="exposure", primary_key=True
+    )
+    holders = models.PositiveIntegerField(default=0)
+    total_quantity = models.DecimalField(
+        max_digits=28, decimal_places=6, default=Decimal("0")
+    )
+    market_value = models.FloatField(default=0.0)
+    # [[portfolio_id, quantity], ...] largest first, at most EXPOSURE_TOP_N
+    top_holders = models.JSONField(default=list)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"AssetExposure(a={self.asset_id}, holders={self.holders}, mv={self.market_value})"
+
+
 class PortfolioStat(models.Model):
     portfolio = models.OneToOneField(
         "Portfolio", on_delete=models.CASCADE, related_name="stat", primary_key=True
@@ -110,3 +174,26 @@ class PortfolioStat(models.Model):
 
     def __str__(self) -> str:
         return f"PortfolioStat(p={self.portfolio_id}, vol={self.port_vol}, sharpe={self.sharpe_proxy})"
+
+
+class AssetVolState(models.Model):
+    """
+    Running Welford state over the last `window` daily log returns of an asset,
+    so volatility can be advanced with only the bars stored since `last_date`.
+    """
+
+    asset = models.OneToOneField(
+        Asset, on_delete=models.CASCADE, related_name="vol_state", primary_key=True
+    )
+    window = models.PositiveIntegerField()
+    n = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(default=0.0)
+    m2 = models.FloatField(default=0.0)
+    # first bar whose return is still inside the window / last bar consumed
+    first_date = models.DateField(null=True, blank=True)
+    last_date = models.DateField(null=True, blank=True)
+    last_close = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"AssetVolState(a={self.asset_id}, n={self.n}, last={self.last_date})"
@@ -0,0 +1,262 @@
+"""
+Columnar, memory-mapped snapshot of EODPrice closes for risk and vol jobs.
+
+A cache generation is a directory of three .npy files:
+
+    closes.npy  float64, every asset's closes back to back, oldest first
+    dates.npy   int32 date ordinals, parallel to closes
+    index.npy   (asset_id, offset, length) rows sorted by asset_id
+
+`CURRENT` in the cache root names the live generation and is swapped with
+os.replace, so readers never see a half-written snapshot. Readers open the
+files with mmap: every worker process shares the same page-cache pages and
+slices history as zero-copy views, without touching the database.
+"""
+
+import operator
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import date
+from functools import reduce
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, FloatField, Q
+from django.db.models.functions import Cast
+
+from investors.management.utils.parser_and_financial_computations import (
+    annualized_volatility_batch,
+)
+from investors.models import EODPrice
+
+INDEX_DTYPE = np.dtype([("asset_id", "<i8"), ("offset", "<i8"), ("length", "<i8")])
+CURRENT = "CURRENT"
+
+
+def default_cache_dir() -> Path:
+    return Path(getattr(settings, "PRICE_CACHE_DIR", settings.BASE_DIR / "price_cache"))
+
+
+class PriceCache:
+    """Read-only view over one cache generation."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.closes_arr = np.load(self.path / "closes.npy", mmap_mode="r")
+        self.dates_arr = np.load(self.path / "dates.npy", mmap_mode="r")
+        # the index is small and searched on every lookup, so keep it in memory
+        self.index = np.load(self.path / "index.npy")
+        self._ids = self.index["asset_id"]
+
+    @classmethod
+    def open(cls, root: Union[str, Path, None] = None) -> Optional["PriceCache"]:
+        """The live generation under `root`, or None if nothing was built yet."""
+        root = Path(root or default_cache_dir())
+        try:
+            name = (root / CURRENT).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return cls(root / name)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, asset_id: int) -> bool:
+        return self._slot(asset_id) is not None
+
+    @property
+    def asset_ids(self) -> np.ndarray:
+        return self._ids
+
+    @property
+    def through(self) -> Optional[date]:
+        """Latest date held by any asset."""
+        if not len(self.dates_arr):
+            return None
+        return date.fromordinal(int(self.dates_arr.max()))
+
+    def watermarks(self) -> Dict[int, int]:
+        """asset_id -> ordinal of its last cached bar: the incremental watermarks."""
+        held = self.index[self.index["length"] > 0]
+        last = self.dates_arr[held["offset"] + held["length"] - 1]
+        return dict(zip(held["asset_id"].tolist(), last.tolist()))
+
+    def _slot(self, asset_id: int) -> Optional[int]:
+        i = int(np.searchsorted(self._ids, asset_id))
+        if i < len(self._ids) and self._ids[i] == asset_id:
+            return i
+        return None
+
+    def _span(self, asset_id: int, last_n: Optional[int]) -> slice:
+        i = self._slot(asset_id)
+        if i is None:
+            return slice(0, 0)
+        off, length = int(self.index["offset"][i]), int(self.index["length"][i])
+        if last_n is not None:
+            off, length = off + max(0, length - last_n), min(length, last_n)
+        return slice(off, off + length)
+
+    def closes(self, asset_id: int, last_n: Optional[int] = None) -> np.ndarray:
+        """Zero-copy view of an asset's closes (optionally the last `last_n`)."""
+        return self.closes_arr[self._span(asset_id, last_n)]
+
+    def dates(self, asset_id: int, last_n: Optional[int] = None) -> np.ndarray:
+        """Date ordinals parallel to `closes`; date.fromordinal() to convert."""
+        return self.dates_arr[self._span(asset_id, last_n)]
+
+    def window_matrix(self, asset_ids: Iterable[int], last_n: int) -> np.ndarray:
+        """Last `last_n` closes per asset, right-aligned and NaN-padded on the left."""
+        ids = list(asset_ids)
+        out = np.full((len(ids), last_n), np.nan)
+        for row, aid in enumerate(ids):
+            tail = self.closes(aid, last_n)
+            if len(tail):
+                out[row, last_n - len(tail) :] = tail
+        return out
+
+    def volatilities(self, asset_ids: Iterable[int], window: int) -> Dict[int, float]:
+        """Annualized vol over the last `window` returns; assets without enough history are omitted."""
+        ids = list(asset_ids)
+        vols = annualized_volatility_batch(self.window_matrix(ids, window + 1))
+        return {aid: float(v) for aid, v in zip(ids, vols) if not np.isnan(v)}
+
+
+@dataclass
+class BuildStats:
+    generation: str
+    assets: int
+    rows: int
+    new_rows: int
+    through: Optional[date]
+
+
+def _generations(root: Path) -> List[Path]:
+    return sorted(p for p in root.glob("gen-*") if p.is_dir() and p.suffix != ".tmp")
+
+
+def _next_generation(root: Path) -> str:
+    gens = _generations(root)
+    n = int(gens[-1].name.split("-")[1]) + 1 if gens else 1
+    return f"gen-{n:06d}"
+
+
+def _delta_filter(previous: Optional[PriceCache], new_assets: List[int]) -> Q:
+    """
+    Bars after each cached asset's own last date, plus all of the new assets.
+    Assets are grouped by watermark, so a book that is mostly up to date
+    stays a handful of terms; an asset whose bars landed late is caught up.
+    """
+    if previous is None or previous.through is None:
+        return Q()
+    by_mark: Dict[int, List[int]] = {}
+    for aid, mark in previous.watermarks().items():
+        by_mark.setdefault(mark, []).append(aid)
+    terms = [
+        Q(asset_id__in=ids, date__gt=date.fromordinal(mark))
+        for mark, ids in by_mark.items()
+    ]
+    if new_assets:
+        terms.append(Q(asset_id__in=new_assets))
+    return reduce(operator.or_, terms, Q(pk__in=[]))
+
+
+def build_price_cache(
+    root: Union[str, Path, None] = None, full: bool = False, keep: int = 2
+) -> BuildStats:
+    """
+    Write a new cache generation and make it current. Incremental by default:
+    existing segments are copied from the previous generation and only bars
+    newer than each asset's last cached date (plus the full history of assets
+    it has never seen) are read from EODPrice. Backfilled or revised history needs
+    `full=True`, like refresh_volatility's `rebuild`.
+    """
+    root = Path(root or default_cache_dir())
+    root.mkdir(parents=True, exist_ok=True)
+    previous = None if full else PriceCache.open(root)
+
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            # count and stream must see the same rows
+            with connection.cursor() as cur:
+                cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        new_assets: List[int] = []
+        if previous is not None and previous.through is not None:
+            all_ids = EODPrice.objects.values_list("asset_id", flat=True).distinct()
+            new_assets = np.setdiff1d(
+                np.fromiter(all_ids.iterator(), dtype=np.int64), previous.asset_ids
+            ).tolist()
+        delta = EODPrice.objects.filter(_delta_filter(previous, new_assets))
+        counts = dict(delta.values_list("asset_id").annotate(n=Count("id")).order_by())
+
+        old_lengths: Dict[int, int] = {}
+        if previous is not None:
+            old_lengths = dict(
+                zip(
+                    previous.index["asset_id"].tolist(),
+                    previous.index["length"].tolist(),
+                )
+            )
+        ids = sorted(set(old_lengths) | set(counts))
+        index = np.zeros(len(ids), dtype=INDEX_DTYPE)
+        index["asset_id"] = ids
+        index["length"] = [old_lengths.get(a, 0) + counts.get(a, 0) for a in ids]
+        if len(ids):
+            index["offset"][1:] = np.cumsum(index["length"])[:-1]
+        total = int(index["length"].sum())
+
+        gen = _next_generation(root)
+        tmp = root / f"{gen}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        closes = np.lib.format.open_memmap(
+            tmp / "closes.npy", mode="w+", dtype=np.float64, shape=(total,)
+        )
+        dates = np.lib.format.open_memmap(
+            tmp / "dates.npy", mode="w+", dtype=np.int32, shape=(total,)
+        )
+
+        # 1) old segments: a memcpy per asset, no Decimal anywhere
+        cursor = {a: int(o) for a, o in zip(ids, index["offset"].tolist())}
+        if previous is not None:
+            for aid, off, length in previous.index.tolist():
+                dst = cursor[aid]
+                closes[dst : dst + length] = previous.closes_arr[off : off + length]
+                dates[dst : dst + length] = previous.dates_arr[off : off + length]
+                cursor[aid] = dst + length
+
+        # 2) new bars appended behind them; the DB does the Decimal -> float cast
+        rows = (
+            delta.order_by("asset_id", "date")
+            .annotate(close_f=Cast("close", FloatField()))
+            .values_list("asset_id", "date", "close_f")
+            .iterator(chunk_size=20_000)
+        )
+        for aid, day, close in rows:
+            dst = cursor[aid]
+            closes[dst] = close
+            dates[dst] = day.toordinal()
+            cursor[aid] = dst + 1
+
+    through = date.fromordinal(int(dates.max())) if total else None
+    closes.flush()
+    dates.flush()
+    del closes, dates
+    np.save(tmp / "index.npy", index)
+    tmp.rename(root / gen)
+    pointer = root / f"{CURRENT}.tmp"
+    pointer.write_text(gen)
+    os.replace(pointer, root / CURRENT)
+    _prune(root, keep)
+
+    return BuildStats(gen, len(ids), total, sum(counts.values()), through)
+
+
+def _prune(root: Path, keep: int) -> None:
+    # older generations may still be mapped by running workers; unlinking is
+    # safe on POSIX, the pages stay valid until those mappings close
+    for old in _generations(root)[: -max(1, keep)]:
+        shutil.rmtree(old, ignore_errors=True)
@@ -0,0 +1,197 @@
+import math
+from datetime import date
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from investors.eod_partitions import ensure_partitions_for
+from investors.latest_services import bump_latest_closes, bump_latest_eps
+from investors.management.utils.types_and_enums import Bar
+from investors.models import AssetVolState, EODPrice, Earnings
+
+# ~3 months of trading days, same horizon as the Yahoo chart range we fetch
+VOL_WINDOW = 63
+UPSERT_BATCH_SIZE = 1000
+
+
+def _chunked(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def upsert_eod_bars(
+    bars_by_asset: Dict[int, List[Bar]], batch_size: int = UPSERT_BATCH_SIZE
+) -> int:
+    """
+    Write daily bars into EODPrice, one INSERT ... ON CONFLICT (asset, date)
+    DO UPDATE per chunk. Re-fetching an overlapping range is idempotent.
+    AssetLatest moves in the same transaction as each chunk.
+    """
+    ensure_partitions_for(bar.date for bars in bars_by_asset.values() for bar in bars)
+    rows = (
+        EODPrice(asset_id=aid, date=bar.date, close=bar.close, volume=bar.volume)
+        for aid, bars in bars_by_asset.items()
+        for bar in bars
+    )
+    written = 0
+    for chunk in _chunked(rows, batch_size):
+        with transaction.atomic():
+            EODPrice.objects.bulk_create(
+                chunk,
+                update_conflicts=True,
+                unique_fields=["asset", "date"],
+                update_fields=["close", "volume"],
+            )
+            bump_latest_closes((e.asset_id, e.date, e.close, e.volume) for e in chunk)
+        written += len(chunk)
+    return written
+
+
+def upsert_earnings(
+    eps_by_asset: Dict[int, List[Tuple[date, float]]],
+    batch_size: int = UPSERT_BATCH_SIZE,
+) -> int:
+    """Upsert (period_end, eps) rows per asset and refresh their AssetLatest EPS/P/E."""
+    rows = [
+        Earnings(asset_id=aid, period_end=period_end, eps=eps)
+        for aid, quarters in eps_by_asset.items()
+        for period_end, eps in quarters
+    ]
+    with transaction.atomic():
+        Earnings.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["asset", "period_end"],
+            update_fields=["eps"],
+        )
+        bump_latest_eps(eps_by_asset.keys())
+    return len(rows)
+
+
+# Welford add/remove. Removing lets the state slide over a fixed window of returns.
+def _welford_add(state: AssetVolState, x: float) -> None:
+    state.n += 1
+    delta = x - state.mean
+    state.mean += delta / state.n
+    state.m2 += delta * (x - state.mean)
+
+
+def _welford_remove(state: AssetVolState, x: float) -> None:
+    if state.n <= 1:
+        state.n, state.mean, state.m2 = 0, 0.0, 0.0
+        return
+    state.n -= 1
+    delta = x - state.mean
+    state.mean -= delta / state.n
+    state.m2 = max(0.0, state.m2 - delta * (x - state.mean))
+
+
+def _log_return(p0: Optional[float], p1: float) -> Optional[float]:
+    # same pair rule as annualized_volatility_from_closes
+    if p0 and p1 and p0 > 0 and p1 > 0:
+        return math.log(p1 / p0)
+    return None
+
+
+def _closes(asset_id: int, **date_filter) -> Iterator[Tuple[date, float]]:
+    qs = EODPrice.objects.filter(asset_id=asset_id, **date_filter).order_by("date")
+    for d, close in qs.values_list("date", "close").iterator():
+        yield d, float(close)
+
+
+def state_volatility(state: AssetVolState) -> Optional[float]:
+    if state.n < 2:
+        return None
+    return float(math.sqrt(state.m2 / (state.n - 1)) * math.sqrt(252.0))
+
+
+def advance_vol_state(state: AssetVolState) -> AssetVolState:
+    """
+    Fold bars newer than `state.last_date` into the running state, then evict
+    the oldest returns until at most `state.window` remain. Only the new bars
+    and the evicted head of the window are read from the DB.
+    """
+    new_filter = {"date__gt": state.last_date} if state.last_date else {}
+    for d, close in _closes(state.asset_id, **new_filter):
+        r = _log_return(state.last_close, close)
+        if r is not None:
+            _welford_add(state, r)
+        if state.first_date is None:
+            state.first_date = d
+        state.last_date, state.last_close = d, close
+
+    if state.n > state.window:
+        prev: Optional[float] = None
+        for d, close in _closes(state.asset_id, date__gte=state.first_date):
+            if prev is not None:
+                r = _log_return(prev, close)
+                if r is not None:
+                    _welford_remove(state, r)
+            prev = close
+            state.first_date = d
+            if state.n <= state.window:
+                break
+    return state
+
+
+def refresh_volatility(
+    asset_ids: Iterable[int], window: int = VOL_WINDOW, rebuild: bool = False
+) -> Dict[int, Optional[float]]:
+    """
+    Advance the stored Welford state for each asset and return its annualized
+    volatility. `rebuild=True` (or a window change) replays the full history,
+    which is also the way to pick up revised historical closes.
+    """
+    ids = list(asset_ids)
+    states = AssetVolState.objects.in_bulk(ids)
+    out: Dict[int, Optional[float]] = {}
+    to_create, to_update = [], []
+    for aid in ids:
+        state = states.get(aid)
+        if state is None or rebuild or state.window != window:
+            fresh = AssetVolState(asset_id=aid, window=window)
+            (to_update if state is not None else to_create).append(fresh)
+            state = fresh
+        else:
+            to_update.append(state)
+        advance_vol_state(state)
+        state.updated_at = timezone.now()
+        out[aid] = state_volatility(state)
+
+    fields = [
+        "window",
+        "n",
+        "mean",
+        "m2",
+        "first_date",
+        "last_date",
+        "last_close",
+        "updated_at",
+    ]
+    with transaction.atomic():
+        AssetVolState.objects.bulk_create(to_create, batch_size=UPSERT_BATCH_SIZE)
+        AssetVolState.objects.bulk_update(
+            to_update, fields, batch_size=UPSERT_BATCH_SIZE
+        )
+    return out
+
+
+def store_bars_and_refresh_vol(
+    quotes: Dict[int, Tuple[float, float]],
+    bars_by_asset: Dict[int, List[Bar]],
+    rebuild: bool = False,
+) -> int:
+    """
+    Persist fetched bars, then replace each quote's volatility with the one
+    derived from stored returns. Mutates `quotes`, returns bars written.
+    """
+    written = upsert_eod_bars(bars_by_asset)
+    vols = refresh_volatility(bars_by_asset.keys(), rebuild=rebuild)
+    for aid, vol in vols.items():
+        if vol is not None and aid in quotes:
+            quotes[aid] = (quotes[aid][0], vol)
+    return written
@@ -0,0 +1,504 @@
+"""
+Plan capture and analysis for the hot queries.
+
+A hot query is a callable that exercises a real code path (a view, a
+service). It runs inside a rolled-back transaction while every statement it
+sends is recorded; each statement is then EXPLAINed (Postgres JSON plans,
+SQLite EXPLAIN QUERY PLAN) and normalized to a stable text form that can be
+stored and diffed between commits. Full scans and sorts over large tables
+are reported with an index suggestion built from the statement's predicate
+and ORDER BY columns, unless an existing index already leads with them.
+"""
+
+import difflib
+import json
+import re
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import Sum
+from rest_framework.test import APIRequestFactory
+
+from investors.benchmarks import BenchContext
+from investors.exposure_services import exposure_of, shock_asset
+from investors.management.commands.order_queue import OrderMsg, process_order
+from investors.management.utils.parser_and_financial_computations import demo_quote
+from investors.models import Position
+from investors.quote_services import apply_quotes
+from investors.valuation_services import portfolio_valuations
+from investors.views import (
+    AssetAnalyticsView,
+    AssetLatestView,
+    CachedAssetListView,
+    PortfolioViewSet,
+)
+
+LARGE_TABLE_ROWS = 1000
+
+Statement = Tuple[str, Sequence]
+
+
+@dataclass
+class HotQuery:
+    name: str
+    run: Callable[..., object]
+    # runs before capture; its result is passed to `run` (keeps lookups out of the plans)
+    prepare: Optional[Callable[[BenchContext], tuple]] = None
+
+
+HOT_QUERIES: Dict[str, HotQuery] = {}
+
+
+def hot_query(name: str, prepare: Optional[Callable[[BenchContext], tuple]] = None):
+    def register(fn):
+        HOT_QUERIES[name] = HotQuery(name, fn, prepare)
+        return fn
+
+    return register
+
+
+_factory = APIRequestFactory(SERVER_NAME="localhost")
+
+
+def _get(view, path: str, **params):
+    return view(_factory.get(path, params)).render()
+
+
+@hot_query("portfolio_list")
+def _portfolio_list(ctx):
+    return _get(PortfolioViewSet.as_view({"get": "list"}), "/api/portfolios/")
+
+
+@hot_query("portfolio_top")
+def _portfolio_top(ctx):
+    view = PortfolioViewSet.as_view({"get": "top"})
+    return _get(view, "/api/portfolios/top/", limit=10)
+
+
+@hot_query("portfolio_detail")
+def _portfolio_detail(ctx):
+    view = PortfolioViewSet.as_view({"get": "retrieve"})
+    pk = ctx.portfolio_ids[len(ctx.portfolio_ids) // 2]
+    return view(_factory.get(f"/api/portfolios/{pk}/"), pk=pk).render()
+
+
+@hot_query("asset_analytics")
+def _asset_analytics(ctx):
+    return _get(AssetAnalyticsView.as_view(), "/api/assets/analytics/")
+
+
+@hot_query("asset_latest")
+def _asset_latest(ctx):
+    return _get(AssetLatestView.as_view(), "/api/assets/latest/", max_pe=30)
+
+
+@hot_query("asset_export")
+def _asset_export(ctx):
+    # the full (id, name) asset list behind ETag / Last-Modified
+    return _get(CachedAssetListView.as_view(), "/api/assets/cached/")
+
+
+@hot_query("portfolio_valuations")
+def _portfolio_valuations(ctx):
+    return portfolio_valuations(ctx.portfolio_ids[:100], use_cache=False)
+
+
+@hot_query("asset_exposure")
+def _asset_exposure(ctx):
+    aid = ctx.asset_ids[len(ctx.asset_ids) // 2]
+    return exposure_of(aid), shock_asset(aid, -0.1)
+
+
+def _first_position(ctx):
+    return Position.objects.order_by("id").values_list("portfolio_id", "asset_id")[0]
+
+
+@hot_query("order_update", prepare=_first_position)
+def _order_update(ctx, pid, aid):
+    process_order(
+        OrderMsg(
+            portfolio_id=pid,
+            asset_id=aid,
+            qty=Decimal("5"),
+            price=Decimal("101.5"),
+            order_id="plan",
+        )
+    )
+
+
+@hot_query("quote_apply")
+def _quote_apply(ctx):
+    return apply_quotes({aid: demo_quote(f"SYN{aid}x") for aid in ctx.asset_ids[:100]})
+
+
+@hot_query("position_totals")
+def _position_totals(ctx):
+    return list(
+        Position.objects.values("portfolio_id")
+        .annotate(total_qty=Sum("quantity"))
+        .order_by("-total_qty")[:20]
+    )
+
+
+# ---- capture ----------------------------------------------------------------
+
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|UPDATE|INSERT|DELETE)\b", re.I)
+_READ_ONLY = re.compile(r"^\s*SELECT\b", re.I)
+
+
+def capture_plans_of(
+    fn: Callable[[], object], analyze: bool = False
+) -> List[Tuple[str, Sequence, List["PlanNode"]]]:
+    """
+    Run `fn` in a rolled-back transaction and EXPLAIN each statement it sends
+    just before it executes, so temp tables and earlier writes of the same
+    code path are visible to the planner. ANALYZE applies to SELECTs only:
+    analyzing a write would execute it twice.
+    """
+    captured = []
+    explaining = False
+
+    def record(execute, sql, params, many, context):
+        nonlocal explaining
+        if not explaining and not many and _EXPLAINABLE.match(sql):
+            explaining = True
+            try:
+                nodes = explain(sql, params, analyze and bool(_READ_ONLY.match(sql)))
+            finally:
+                explaining = False
+            captured.append((sql, tuple(params or ()), nodes))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record), transaction.atomic():
+        fn()
+        transaction.set_rollback(True)
+    return captured
+
+
+# ---- plans ------------------------------------------------------------------
+
+
+@dataclass
+class PlanNode:
+    depth: int
+    op: str
+    relation: Optional[str] = None
+    index: Optional[str] = None
+    detail: str = ""
+    rows: Optional[float] = None
+
+    def line(self) -> str:
+        parts = [self.op]
+        if self.relation:
+            parts.append(f"on {self.relation}")
+        if self.index:
+            parts.append(f"using {self.index}")
+        if self.detail:
+            parts.append(self.detail)
+        return "  " * self.depth + " ".join(parts)
+
+
+_PG_DETAIL_KEYS = (
+    "Join Type",
+    "Sort Key",
+    "Group Key",
+    "Index Cond",
+    "Hash Cond",
+    "Merge Cond",
+    "Filter",
+)
+
+
+def _pg_nodes(plan: dict, depth: int = 0) -> Iterable[PlanNode]:
+    details = []
+    for key in _PG_DETAIL_KEYS:
+        value = plan.get(key)
+        if value:
+            value = ", ".join(value) if isinstance(value, list) else value
+            details.append(f"[{key}: {value}]")
+    yield PlanNode(
+        depth,
+        plan["Node Type"],
+        plan.get("Relation Name"),
+        plan.get("Index Name"),
+        " ".join(details),
+        plan.get("Actual Rows", plan.get("Plan Rows")),
+    )
+    for child in plan.get("Plans", []):
+        yield from _pg_nodes(child, depth + 1)
+
+
+_SQLITE_TABLE = re.compile(r"^(SCAN|SEARCH) (\w+)(?: USING (?:COVERING )?INDEX (\w+))?")
+
+
+def _table_aliases(sql: str) -> Dict[str, str]:
+    # Django aliases subquery/join tables: "investors_position" U0
+    return {alias: table for table, alias in re.findall(r'"(\w+)" ([A-Z]\d+)\b', sql)}
+
+
+def _sqlite_nodes(rows, sql: str) -> Iterable[PlanNode]:
+    aliases = _table_aliases(sql)
+    depth_of = {0: -1}
+    for node_id, parent, _unused, detail in rows:
+        depth = depth_of.get(parent, -1) + 1
+        depth_of[node_id] = depth
+        m = _SQLITE_TABLE.match(detail)
+        if m:
+            op, rel, idx = m.groups()
+            rest = detail[m.end() :].strip()
+            yield PlanNode(depth, op, aliases.get(rel, rel), idx, rest)
+        else:
+            yield PlanNode(depth, detail)
+
+
+def explain(sql: str, params: Sequence, analyze: bool = False) -> List[PlanNode]:
+    with connection.cursor() as cur:
+        if connection.vendor == "postgresql":
+            opts = "FORMAT JSON, ANALYZE" if analyze else "FORMAT JSON"
+            cur.execute(f"EXPLAIN ({opts}) {sql}", params)
+            raw = cur.fetchone()[0]
+            doc = json.loads(raw) if isinstance(raw, str) else raw
+            return list(_pg_nodes(doc[0]["Plan"]))
+        cur.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return list(_sqlite_nodes(cur.fetchall(), sql))
+
+
+# ---- analysis ---------------------------------------------------------------
+
+
+@dataclass
+class Finding:
+    query: str
+    statement: int
+    kind: str  # "full_scan" | "sort"
+    table: str
+    rows: float
+    suggestion: Optional[str] = None
+
+    def __str__(self) -> str:
+        text = f"{self.query}#{self.statement}: {self.kind} on {self.table} (~{self.rows:,.0f} rows)"
+        return text + (f"; suggest {self.suggestion}" if self.suggestion else "")
+
+
+class _Tables:
+    """Row counts and index-leading columns per table, looked up once."""
+
+    def __init__(self):
+        self._rows: Dict[str, float] = {}
+        self._leading: Dict[str, set] = {}
+        self.names = set(connection.introspection.table_names())
+
+    def rows(self, table: str) -> float:
+        if table not in self._rows:
+            with connection.cursor() as cur:
+                if connection.vendor == "postgresql":
+                    # planner statistics, kept current by (auto)ANALYZE
+                    cur.execute(
+                        "SELECT GREATEST(reltuples, 0) FROM pg_class WHERE relname = %s",
+                        [table],
+                    )
+                    row = cur.fetchone()
+                    self._rows[table] = float(row[0]) if row else 0.0
+                else:
+                    cur.execute(f'SELECT COUNT(*) FROM "{table}"')
+                    self._rows[table] = float(cur.fetchone()[0])
+        return self._rows[table]
+
+    def leading_columns(self, table: str) -> set:
+        if table not in self._leading:
+            with connection.cursor() as cur:
+                constraints = connection.introspection.get_constraints(cur, table)
+            self._leading[table] = {
+                c["columns"][0]
+                for c in constraints.values()
+                if c["columns"] and (c["index"] or c["primary_key"] or c["unique"])
+            }
+        return self._leading[table]
+
+
+_PREDICATE = r'(?:"{t}"|\b{a})\."(\w+)"\s*(?:=|<|>|IN\b|BETWEEN\b|IS\b)'
+
+
+def _qualifiers(table: str, sql: str) -> List[str]:
+    return [table] + [a for a, t in _table_aliases(sql).items() if t == table]
+
+
+def _predicate_columns(table: str, sql: str) -> List[str]:
+    found = []
+    for qual in _qualifiers(table, sql):
+        pattern = _PREDICATE.format(t=re.escape(qual), a=re.escape(qual))
+        where = sql.split(" WHERE ", 1)[1] if " WHERE " in sql else ""
+        found += re.findall(pattern, where)
+    return list(dict.fromkeys(found))
+
+
+def _order_columns(table: str, sql: str) -> List[str]:
+    # the outermost ORDER BY is the last one (inner ones sit in subqueries/windows)
+    at = sql.rfind("ORDER BY ")
+    if at < 0:
+        return []
+    clause = re.split(r" LIMIT | OFFSET |\)", sql[at + len("ORDER BY ") :], 1)[0]
+    cols = []
+    for qual in _qualifiers(table, sql):
+        cols += re.findall(rf'"{re.escape(qual)}"\."(\w+)"', clause)
+    return list(dict.fromkeys(cols))
+
+
+def _model_index(table: str, columns: List[str]) -> str:
+    for model in apps.get_models():
+        if model._meta.db_table == table:
+            by_column = {f.column: f.name for f in model._meta.concrete_fields}
+            fields = ", ".join(f'"{by_column.get(c, c)}"' for c in columns)
+            return f"{model.__name__}: models.Index(fields=[{fields}])"
+    return f"CREATE INDEX ON {table} ({', '.join(columns)})"
+
+
+def _suggest(tables: _Tables, table: str, columns: List[str]) -> Optional[str]:
+    missing = [c for c in columns if c not in tables.leading_columns(table)]
+    return _model_index(table, missing[:2]) if missing else None
+
+
+def analyze_statement(
+    query: str,
+    n: int,
+    sql: str,
+    nodes: List[PlanNode],
+    tables: _Tables,
+    large_rows: int = LARGE_TABLE_ROWS,
+) -> List[Finding]:
+    findings = []
+    scanned: List[Tuple[int, str]] = []  # (depth, table), outer loops first
+    for node in nodes:
+        if node.relation not in tables.names:
+            continue  # subqueries, CTEs, constant rows
+        scanned.append((node.depth, node.relation))
+        if not (node.op == "Seq Scan" or (node.op == "SCAN" and not node.index)):
+            continue
+        rows = tables.rows(node.relation)
+        if rows >= large_rows:
+            cols = _predicate_columns(node.relation, sql)
+            findings.append(
+                Finding(
+                    query,
+                    n,
+                    "full_scan",
+                    node.relation,
+                    rows,
+                    _suggest(tables, node.relation, cols) if cols else None,
+                )
+            )
+    for node in nodes:
+        pg_sort = node.op in ("Sort", "Incremental Sort")
+        if not (pg_sort or node.op.startswith("USE TEMP B-TREE FOR ORDER BY")):
+            continue
+        # the sort's input is driven by the outer loop at its level; SQLite
+        # gives no estimate, so that table's size stands in for the rows
+        driving = next((t for d, t in scanned if d == node.depth), None)
+        if pg_sort and node.rows is not None:
+            rows = node.rows
+        elif driving is not None:
+            rows = tables.rows(driving)
+        else:
+            continue
+        if rows < large_rows:
+            continue
+        # the ORDER BY may be on a joined table (e.g. stat__sharpe_proxy);
+        # positional ORDER BY 6 leaves it on the driving table, unsuggested
+        owner, cols = driving, []
+        for _, t in scanned:
+            cols = _order_columns(t, sql)
+            if cols:
+                owner = t
+                break
+        if owner is None:
+            continue
+        findings.append(
+            Finding(
+                query,
+                n,
+                "sort",
+                owner,
+                rows,
+                _suggest(tables, owner, cols) if cols else None,
+            )
+        )
+    return findings
+
+
+@dataclass
+class QueryPlans:
+    name: str
+    statements: List[Statement]
+    plans: List[List[PlanNode]]
+    findings: List[Finding] = field(default_factory=list)
+
+    def render(self) -> str:
+        """Stable text form: costs and timings left out so only structure diffs."""
+        out = [f"# {self.name}: {len(self.statements)} statement(s)"]
+        for i, ((sql, _params), nodes) in enumerate(zip(self.statements, self.plans)):
+            out.append(f"\n-- [{i}] {' '.join(sql.split())}")
+            out += [node.line() for node in nodes]
+        return "\n".join(out) + "\n"
+
+
+def capture_plans(
+    ctx: BenchContext,
+    only: Optional[Sequence[str]] = None,
+    analyze: bool = False,
+    large_rows: int = LARGE_TABLE_ROWS,
+) -> List[QueryPlans]:
+    names = list(only) if only else list(HOT_QUERIES)
+    unknown = set(names) - set(HOT_QUERIES)
+    if unknown:
+        raise ValueError(f"unknown hot queries: {sorted(unknown)}")
+    tables = _Tables()
+    out = []
+    for name in names:
+        hq = HOT_QUERIES[name]
+        args = hq.prepare(ctx) if hq.prepare else ()
+        captured = capture_plans_of(lambda: hq.run(ctx, *args), analyze)
+        qp = QueryPlans(
+            name,
+            [(sql, params) for sql, params, _ in captured],
+            [nodes for _, _, nodes in captured],
+        )
+        for i, (sql, _, nodes) in enumerate(captured):
+            qp.findings += analyze_statement(name, i, sql, nodes, tables, large_rows)
+        out.append(qp)
+    return out
+
+
+# ---- storage ----------------------------------------------------------------
+
+
+def plan_path(root, name: str) -> Path:
+    return Path(root) / f"{name}.plan"
+
+
+def save_plans(root, plans: Iterable[QueryPlans]) -> List[Path]:
+    Path(root).mkdir(parents=True, exist_ok=True)
+    paths = []
+    for qp in plans:
+        path = plan_path(root, qp.name)
+        path.write_text(qp.render())
+        paths.append(path)
+    return paths
+
+
+def diff_plans(root, plans: Iterable[QueryPlans]) -> Dict[str, str]:
+    """name -> unified diff against the stored plan ("" when unchanged)."""
+    out = {}
+    for qp in plans:
+        path = plan_path(root, qp.name)
+        stored = path.read_text().splitlines(keepends=True) if path.exists() else []
+        current = qp.render().splitlines(keepends=True)
+        out[qp.name] = "".join(
+            difflib.unified_diff(
+                stored, current, f"stored/{qp.name}.plan", f"current/{qp.name}.plan"
+            )
+        )
+    return out
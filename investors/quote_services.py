@@ -0,0 +1,93 @@
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.db import connection, transaction
+
+from investors.bulk_loader import copy_into
+from investors.exposure_services import reprice_exposure
+from investors.models import Asset
+from investors.refdata_services import bump_asset_refs
+from investors.valuation_services import bump_asset_versions
+
+QuoteRow = Tuple[int, float, float]  # (asset_id, price, volatility)
+
+TMP_TABLE = "tmp_quote_apply"
+CHUNK_ROWS = 50_000
+
+
+def _chunks(rows: Iterable[QuoteRow], size: int) -> Iterator[List[QuoteRow]]:
+    it = iter(rows)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def _copy_rows_pg(cur, rows: Iterable[QuoteRow]) -> None:
+    # COPY in bounded chunks; repr() round-trips floats exactly through text
+    for chunk in _chunks(rows, CHUNK_ROWS):
+        copy_into(cur, TMP_TABLE, ("id", "price", "volatility"), chunk)
+
+
+def _load_postgresql(cur, rows: Iterable[QuoteRow]) -> None:
+    # inside a caller's transaction atomic() is only a savepoint, so ON COMMIT
+    # DROP would keep the table alive for the next call: drop it explicitly
+    cur.execute(f"DROP TABLE IF EXISTS pg_temp.{TMP_TABLE}")
+    cur.execute(
+        f"CREATE TEMP TABLE {TMP_TABLE} ("
+        " id bigint PRIMARY KEY, price double precision, volatility double precision"
+        ")"
+    )
+    _copy_rows_pg(cur, rows)
+
+
+def _load_sqlite(cur, rows: Iterable[QuoteRow]) -> None:
+    cur.execute(f"DROP TABLE IF EXISTS temp.{TMP_TABLE}")
+    cur.execute(
+        f"CREATE TEMP TABLE {TMP_TABLE} ("
+        " id integer PRIMARY KEY, price real, volatility real)"
+    )
+    for chunk in _chunks(rows, CHUNK_ROWS):
+        cur.executemany(
+            f"INSERT OR REPLACE INTO {TMP_TABLE} (id, price, volatility)"
+            " VALUES (%s, %s, %s)",
+            chunk,
+        )
+
+
+def apply_quotes(quotes: Dict[int, Tuple[float, float]]) -> List[int]:
+    """
+    Write (price, vol) quotes to Asset without loading model rows: stream them
+    into a temp table (COPY on Postgres, executemany elsewhere), then run one
+    set-based UPDATE that only touches rows whose values actually differ.
+    Returns the ids that changed, for downstream invalidation.
+    """
+    if not quotes:
+        return []
+    rows = ((aid, p, v) for aid, (p, v) in quotes.items())
+    asset_table = connection.ops.quote_name(Asset._meta.db_table)
+    pg = connection.vendor == "postgresql"
+    # `IS NOT` is SQLite's spelling of the null-safe IS DISTINCT FROM
+    distinct = "IS DISTINCT FROM" if pg else "IS NOT"
+    with transaction.atomic(), connection.cursor() as cur:
+        (_load_postgresql if pg else _load_sqlite)(cur, rows)
+        # bulk writes skip post_save: the cached refs only carry volatility
+        cur.execute(
+            f"SELECT 1 FROM {asset_table} JOIN {TMP_TABLE} AS t"
+            f" ON {asset_table}.id = t.id"
+            f" WHERE {asset_table}.volatility {distinct} t.volatility LIMIT 1"
+        )
+        vol_changed = cur.fetchone() is not None
+        cur.execute(
+            f"UPDATE {asset_table} SET price = t.price, volatility = t.volatility"
+            f" FROM {TMP_TABLE} AS t WHERE {asset_table}.id = t.id"
+            f" AND ({asset_table}.price {distinct} t.price"
+            f" OR {asset_table}.volatility {distinct} t.volatility)"
+            f" RETURNING {asset_table}.id"
+        )
+        changed = [r[0] for r in cur.fetchall()]
+        cur.execute(f"DROP TABLE {TMP_TABLE}")
+        if changed:
+            reprice_exposure(changed)
+    transaction.on_commit(lambda: bump_asset_versions(changed))
+    if vol_changed:
+        transaction.on_commit(bump_asset_refs)
+    return changed
@@ -0,0 +1,81 @@
+"""
+Hot reference data behind core.hot_cache: asset volatility/category and
+investor email -> id, for the paths that keep re-reading the same rows
+(order processing, portfolio bulk upsert, the scenario/VaR book loader).
+Prices are left out: they change on every quote refresh.
+
+Invalidation: model saves and deletes of Asset and Investor bump the
+namespace once the transaction commits (creates need nothing, misses are
+not cached). Bulk writers that bypass signals bump it themselves:
+apply_quotes when a volatility changed. Loaders always read the primary:
+a replica row loaded after a bump would be cached under the new version.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.db_router import use_replica
+from core.hot_cache import TwoTierCache
+from investors.models import Asset, Investor
+
+
+@dataclass(frozen=True)
+class AssetRef:
+    id: int
+    category: str
+    volatility: float
+
+
+def _load_assets(ids: List[int]) -> Dict[int, AssetRef]:
+    with use_replica(False):
+        rows = list(
+            Asset.objects.filter(id__in=ids).values_list("id", "category", "volatility")
+        )
+    return {row[0]: AssetRef(*row) for row in rows}
+
+
+def _load_investor_ids(emails: List[str]) -> Dict[str, int]:
+    with use_replica(False):
+        return dict(
+            Investor.objects.filter(email__in=emails).values_list("email", "id")
+        )
+
+
+asset_refs: TwoTierCache[int, AssetRef] = TwoTierCache("asset", _load_assets)
+investor_ids: TwoTierCache[str, int] = TwoTierCache(
+    "investor-email", _load_investor_ids
+)
+
+
+def get_asset_refs(asset_ids: Iterable[int]) -> Dict[int, AssetRef]:
+    """Refs for the assets that exist, keyed by id."""
+    return asset_refs.get_many(asset_ids)
+
+
+def investor_ids_by_email(emails: Iterable[str]) -> Dict[str, int]:
+    """Ids of the investors that exist, keyed by email."""
+    return investor_ids.get_many(emails)
+
+
+def bump_asset_refs() -> None:
+    asset_refs.bump()
+
+
+def bump_investor_refs() -> None:
+    investor_ids.bump()
+
+
+@receiver([post_save, post_delete], sender=Asset, dispatch_uid="refdata-asset")
+def _asset_written(created=False, **_kwargs) -> None:
+    if not created:
+        transaction.on_commit(bump_asset_refs)
+
+
+@receiver([post_save, post_delete], sender=Investor, dispatch_uid="refdata-investor")
+def _investor_written(created=False, **_kwargs) -> None:
+    if not created:
+        transaction.on_commit(bump_investor_refs)
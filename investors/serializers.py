@@ -1,7 +1,8 @@
 from django.db import transaction
 from rest_framework import serializers
 
-from .models import Asset, Investor, InvestorProfile, Portfolio
+from .models import Asset, AssetLatest, Investor, InvestorProfile, Portfolio
+from .refdata_services import investor_ids_by_email
 
 
 class InvestorSerializer(serializers.ModelSerializer):
@@ -22,6 +23,25 @@ class AssetSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class AssetLatestSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source="asset.name", read_only=True)
+
+    class Meta:
+        model = AssetLatest
+        fields = (
+            "asset",
+            "name",
+            "close",
+            "close_date",
+            "volume",
+            "eps",
+            "eps_period_end",
+            "eps_ttm",
+            "pe",
+            "updated_at",
+        )
+
+
 class PortfolioDetailSerializer(serializers.ModelSerializer):
     # these fields exist at render time
     asset_count = serializers.IntegerField(read_only=True)
@@ -51,7 +71,14 @@ class PortfolioSummarySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Portfolio
-        fields = ("id", "name", "asset_count", "port_vol", "sharpe_proxy")
+        fields = (
+            "id",
+            "name",
+            "asset_count",
+            "port_vol",
+            "sharpe_proxy",
+            "total_value",
+        )
 
 
 class PortfolioUpsertSerializer(serializers.ModelSerializer):
@@ -72,12 +99,17 @@ class PortfolioUpsertListSerializer(serializers.ListSerializer):
     def create(self, validated_data):
         # validated_data: list of dicts
         created_or_updated = []
+        ids = investor_ids_by_email({item["investor_email"] for item in validated_data})
+        unknown = sorted({i["investor_email"] for i in validated_data} - set(ids))
+        if unknown:
+            raise serializers.ValidationError(
+                {"investor_email": [f"unknown investor: {e}" for e in unknown]}
+            )
         with transaction.atomic():
             for item in validated_data:
                 email = item.pop("investor_email")
-                inv = Investor.objects.get(email=email)
                 obj, _ = Portfolio.objects.update_or_create(
-                    investor=inv, name=item["name"], defaults={}
+                    investor_id=ids[email], name=item["name"], defaults={}
                 )
                 created_or_updated.append(obj)
         return created_or_updated
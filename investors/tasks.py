@@ -1,28 +1,42 @@
+import asyncio
 import logging
 import random
 import time
-from typing import Optional
+from typing import List, Optional, Tuple
 
-import redis
-from celery import shared_task
+from celery import chord, shared_task
 from django.conf import settings
 from django.utils import timezone
 
-from investors.metrics_services import compute_for_portfolio_id
-from investors.models import Portfolio, PortfolioStat
+from core.db_router import use_replica
+from core.redis_client import acquire_many, acquire_once, release
+from core.task_metrics import (
+    record_items,
+    record_skip,
+    run_summary,
+    summarize_runs,
+    task_phase,
+)
+from investors.eod_partitions import apply_retention, ensure_partitions_ahead
+from investors.exposure_services import refresh_exposure
+from investors.management.quotes_io import fetch_quotes_async
+from investors.metrics_services import (
+    STATS_BATCH_SIZE,
+    compute_book_metrics,
+    compute_for_portfolio_id,
+    write_portfolio_stats,
+)
+from investors.models import Asset, Portfolio, PortfolioStat
+from investors.price_cache import PriceCache, build_price_cache
+from investors.quote_services import apply_quotes
 
 log = logging.getLogger(__name__)
-R = redis.from_url(getattr(settings, "REDIS_URL", "redis://localhost:6379/0"))
-
 
-def _idempotency_key(portfolio_id: int) -> str:
-    # key for 1 day
-    return f"task:recompute_portfolio_metrics:{portfolio_id}:{timezone.now().date()}"
 
-
-def _acquire_once(key: str, ttl_sec: int = 86400) -> bool:
-    # set key if not exists -> 1 means acquired
-    return bool(R.set(key, "1", ex=ttl_sec, nx=True))
+def _idempotency_key(portfolio_id: int, run_key: Optional[str] = None) -> str:
+    # key for 1 day, unless the caller scopes it to a specific run
+    scope = run_key or timezone.now().date()
+    return f"task:recompute_portfolio_metrics:{portfolio_id}:{scope}"
 
 
 @shared_task(
@@ -33,39 +47,257 @@ def _acquire_once(key: str, ttl_sec: int = 86400) -> bool:
     retry_jitter=True,
     max_retries=5,
 )
-def recompute_portfolio_metrics_task(self, portfolio_id: int) -> Optional[dict]:
-    key = _idempotency_key(portfolio_id)
-    if not _acquire_once(key, ttl_sec=3600):
+def recompute_portfolio_metrics_task(
+    self, portfolio_id: int, run_key: Optional[str] = None
+) -> Optional[dict]:
+    key = _idempotency_key(portfolio_id, run_key)
+    with task_phase(self, "claim"):
+        acquired = acquire_once(key, ttl_sec=3600)
+    if not acquired:
+        record_skip(self, "idempotent")
         log.info(f"skip: idempotency key exists for portfolio={portfolio_id}")
         return None
 
     # extra jitter when many tasks start at once
-    time.sleep(random.uniform(0.05, 0.25))
+    with task_phase(self, "jitter"):
+        time.sleep(random.uniform(0.05, 0.25))
 
-    data = compute_for_portfolio_id(portfolio_id)
+    with task_phase(self, "compute"):
+        data = compute_for_portfolio_id(portfolio_id)
     if data is None:
+        record_skip(self, "missing")
         log.warning(f"portfolio {portfolio_id} not found; skipping")
         return None
 
-    obj, _created = PortfolioStat.objects.update_or_create(
-        portfolio_id=portfolio_id,
-        defaults={
-            "port_vol": data["port_vol"],
-            "sharpe_proxy": data["sharpe_proxy"],
-            "updated_at": timezone.now(),
-        },
-    )
+    with task_phase(self, "write"):
+        obj, _created = PortfolioStat.objects.update_or_create(
+            portfolio_id=portfolio_id,
+            defaults={
+                "port_vol": data["port_vol"],
+                "sharpe_proxy": data["sharpe_proxy"],
+                "updated_at": timezone.now(),
+            },
+        )
+    record_items(self, 1)
     log.info(f"updated PortfolioStat p={portfolio_id} data={data}")
     return data
 
 
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=2,
+    retry_backoff_max=30,
+    retry_jitter=True,
+    max_retries=5,
+    soft_time_limit=240,
+    time_limit=300,
+)
+def recompute_portfolio_stats_batch(
+    self,
+    portfolio_ids: List[int],
+    covariance: bool = False,
+    run_key: Optional[str] = None,
+    primary: bool = False,
+) -> Optional[dict]:
+    # one vectorized pass over the batch instead of a query per portfolio.
+    # Claims are per portfolio (the same keys as the single-portfolio task),
+    # taken for the whole batch in one pipelined round trip.
+    keys = {_idempotency_key(pid, run_key): pid for pid in portfolio_ids}
+    with task_phase(self, "claim"):
+        claimed = [k for k, ok in acquire_many(keys, ttl_sec=3600).items() if ok]
+    if not claimed:
+        record_skip(self, "idempotent")
+        log.info(f"skip: idempotency keys exist for {len(keys)} portfolios")
+        return {"portfolios": 0, "skipped": True, "metrics": run_summary(self)}
+    todo = [keys[k] for k in claimed]
+    started = time.perf_counter()
+    written = 0
+    try:
+        cache = PriceCache.open() if covariance else None
+        for lo in range(0, len(todo), STATS_BATCH_SIZE):
+            chunk = todo[lo : lo + STATS_BATCH_SIZE]
+            # analytics reads may trail the primary by up to REPLICA_MAX_LAG,
+            # unless the run follows writes it must see (`primary`)
+            with task_phase(self, "compute"), use_replica(not primary):
+                metrics = compute_book_metrics(
+                    chunk, covariance=covariance, cache=cache
+                )
+            with task_phase(self, "write"):
+                written += write_portfolio_stats(metrics)
+    except Exception:
+        release(claimed)  # let the autoretry claim them again
+        raise
+    record_items(self, written)
+    elapsed = time.perf_counter() - started
+    log.info(f"updated PortfolioStat for {written} portfolios in {elapsed:.2f}s")
+    return {
+        "portfolios": written,
+        "seconds": round(elapsed, 3),
+        "metrics": run_summary(self),
+    }
+
+
+@shared_task(bind=True)
+def portfolio_stats_recomputed(self, batch_results: List[dict]) -> dict:
+    # Chord callback: one summary of the whole run, for sizing worker concurrency
+    summary = {
+        "batches": len(batch_results),
+        "portfolios": sum(r["portfolios"] for r in batch_results),
+        "skipped_batches": sum(1 for r in batch_results if r.get("skipped")),
+        **summarize_runs(r.get("metrics") for r in batch_results),
+    }
+    log.info(f"portfolio stats recompute done: {summary}")
+    return summary
+
+
+@shared_task(bind=True)
+def nightly_recompute_all_portfolios(
+    self,
+    batch_size: int = 2000,
+    run_key: Optional[str] = None,
+    covariance: bool = False,
+    primary: bool = False,
+):
+    # Fan-out: one batch task per `batch_size` portfolios; the chord callback
+    # summarizes queue wait, phase times and per-worker throughput of the run
+    ids = list(Portfolio.objects.order_by("id").values_list("id", flat=True))
+    batches = [ids[i : i + batch_size] for i in range(0, len(ids), batch_size)]
+    if not batches:
+        return {"queued": 0, "batches": 0}
+    header = [
+        recompute_portfolio_stats_batch.s(
+            batch, covariance=covariance, run_key=run_key, primary=primary
+        )
+        for batch in batches
+    ]
+    result = chord(header)(portfolio_stats_recomputed.s())
+    return {"queued": len(ids), "batches": len(batches), "chord_id": result.id}
+
+
+def asset_id_shards(shard_size: int) -> List[Tuple[int, int]]:
+    """
+    Half-open [lo, hi) id ranges holding ~shard_size assets each. Boundaries
+    come from the actual ids, so gaps in the sequence don't skew shard sizes.
+    """
+    ids = list(Asset.objects.order_by("id").values_list("id", flat=True))
+    if not ids:
+        return []
+    bounds = ids[::shard_size] + [ids[-1] + 1]
+    return list(zip(bounds, bounds[1:]))
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=2,
+    retry_backoff_max=30,
+    max_retries=2,
+    soft_time_limit=240,
+    time_limit=300,
+)
+def refresh_quotes_shard(
+    self, id_lo: int, id_hi: int, source: str = "demo", concurrency: int = 50
+) -> dict:
+    # One shard per worker task: async fetch for its id range, one bulk write
+    ids_and_names = list(
+        Asset.objects.filter(id__gte=id_lo, id__lt=id_hi)
+        .order_by("id")
+        .values_list("id", "name")
+    )
+    started = time.perf_counter()
+    with task_phase(self, "fetch"):
+        quotes = asyncio.run(fetch_quotes_async(ids_and_names, source, concurrency))
+    with task_phase(self, "apply"):
+        updated = len(apply_quotes(quotes))
+    record_items(self, len(ids_and_names))
+    elapsed = time.perf_counter() - started
+    log.info(
+        f"quote shard [{id_lo},{id_hi}) fetched={len(quotes)} "
+        f"updated={updated} in {elapsed:.2f}s"
+    )
+    return {
+        "shard": [id_lo, id_hi],
+        "assets": len(ids_and_names),
+        "fetched": len(quotes),
+        "updated": updated,
+        "seconds": round(elapsed, 3),
+        "metrics": run_summary(self),
+    }
+
+
 @shared_task(bind=True)
-def nightly_recompute_all_portfolios(self, batch_size: int = 200):
-    # Fan-out: queue one task per portfolio
-    ids = list(Portfolio.objects.values_list("id", flat=True))
-    for pid in ids:
-        recompute_portfolio_metrics_task.delay(pid)
-    return {"queued": len(ids)}
+def quotes_refreshed(self, shard_results: List[dict], recompute: bool = True) -> dict:
+    # Chord callback: runs once, after every shard has written its quotes
+    summary = {
+        "shards": len(shard_results),
+        "fetched": sum(r["fetched"] for r in shard_results),
+        "updated": sum(r["updated"] for r in shard_results),
+        "slowest_shard_sec": max((r["seconds"] for r in shard_results), default=0.0),
+        **summarize_runs(r.get("metrics") for r in shard_results),
+    }
+    if recompute and summary["updated"]:
+        # scope idempotency to this refresh so a same-day nightly run doesn't mask
+        # it; read from the primary, a lagging replica may predate these prices
+        nightly_recompute_all_portfolios.delay(
+            run_key=f"quotes:{self.request.id}", primary=True
+        )
+        summary["recompute_queued"] = True
+    log.info(f"quote refresh done: {summary}")
+    return summary
+
+
+@shared_task(bind=True)
+def refresh_all_quotes(
+    self,
+    source: str = "demo",
+    shard_size: int = 500,
+    concurrency: int = 50,
+    recompute: bool = True,
+) -> dict:
+    # Fan-out by id range; throughput scales with the number of workers
+    shards = asset_id_shards(shard_size)
+    if not shards:
+        return {"shards": 0}
+    header = [
+        refresh_quotes_shard.s(lo, hi, source=source, concurrency=concurrency)
+        for lo, hi in shards
+    ]
+    result = chord(header)(quotes_refreshed.s(recompute=recompute))
+    return {"shards": len(shards), "chord_id": result.id}
+
+
+@shared_task(bind=True, soft_time_limit=1800, time_limit=1900)
+def maintain_eod_storage(self, months_ahead: int = 3) -> dict:
+    # Partitions are created ahead of time so nightly upserts never miss one
+    created = ensure_partitions_ahead(months_ahead)
+    out = {"created_partitions": created}
+    keep_days = getattr(settings, "EODPRICE_RETENTION_DAYS", None)
+    if keep_days:
+        out.update(apply_retention(int(keep_days)))
+    log.info(f"eod storage maintenance: {out}")
+    return out
+
+
+@shared_task(bind=True, soft_time_limit=1800, time_limit=1900)
+def build_price_cache_task(self, full: bool = False) -> dict:
+    # after the nightly EOD ingest; risk/vol workers pick up the new CURRENT
+    stats = build_price_cache(full=full)
+    log.info(f"price cache: {stats}")
+    return {
+        "generation": stats.generation,
+        "assets": stats.assets,
+        "rows": stats.rows,
+        "new_rows": stats.new_rows,
+    }
+
+
+@shared_task(bind=True, soft_time_limit=1800, time_limit=1900)
+def refresh_exposure_index(self) -> dict:
+    # full rebuild; catches position writes that bypass refresh_exposure
+    started = time.perf_counter()
+    assets = refresh_exposure()
+    return {"assets": assets, "seconds": round(time.perf_counter() - started, 3)}
 
 
 @shared_task(bind=True, name="investors.tasks.debug_sleep")
@@ -0,0 +1,10 @@
+import pytest
+
+from investors.refdata_services import bump_asset_refs, bump_investor_refs
+
+
+@pytest.fixture(autouse=True)
+def _fresh_refdata():
+    # rolled-back tests reuse ids and emails: never serve a previous test's refs
+    bump_asset_refs()
+    bump_investor_refs()
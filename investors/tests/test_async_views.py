@@ -0,0 +1,91 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from core import db_router
+from investors.models import PortfolioStat
+from investors.tests.factories import AssetFactory, InvestorFactory, PortfolioFactory
+
+
+def _aget(path, headers=None):
+    async def get():
+        return await AsyncClient().get(path, headers=headers)
+
+    return async_to_sync(get)()
+
+
+@pytest.fixture
+def budgets(settings):
+    settings.QUERY_BUDGET_MODE = "raise"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_asset_list_matches_the_drf_page(budgets):
+    AssetFactory.create_batch(25)
+
+    a = _aget("/api/async/assets/?limit=10&offset=10").json()
+    s = APIClient().get("/api/assets/?limit=10&offset=10").json()
+
+    assert a["count"] == s["count"] == 25
+    assert a["results"] == s["results"]
+    assert a["next"].endswith("/api/async/assets/?limit=10&offset=20")
+    assert a["previous"].endswith("/api/async/assets/?limit=10")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_analytics_and_stats_match_the_sync_views(budgets):
+    assets = AssetFactory.create_batch(4, volatility=0.35)
+    p = PortfolioFactory(investor=InvestorFactory())
+    p.assets.set(assets)
+    PortfolioStat.objects.create(portfolio=p, port_vol=0.21, sharpe_proxy=1.5)
+
+    assert (
+        _aget("/api/async/assets/analytics/").json()
+        == APIClient().get("/api/assets/analytics/").json()
+    )
+    assert _aget(f"/api/async/portfolios/{p.id}/stats/").json() == {
+        "volatility": 0.21,
+        "sharpe": 1.5,
+    }
+    assert _aget("/api/async/portfolios/999999/stats/").status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_cached_list_revalidates_and_caches_the_body(budgets):
+    AssetFactory.create_batch(3)
+    first = _aget("/api/async/assets/cached/")
+    sync = APIClient().get("/api/assets/cached/")
+
+    assert first.json() == sync.json() and first["ETag"] == sync["ETag"]
+    again = _aget("/api/async/assets/cached/", {"If-None-Match": first["ETag"]})
+    assert again.status_code == 304
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_requests_are_counted_and_replica_scoped(settings, monkeypatch):
+    # a "replica" that is the default database: only the routing is observed
+    settings.DATABASE_REPLICAS = ["replica_0"]
+    monkeypatch.setattr(db_router, "healthy_replicas", lambda: ["default"])
+    AssetFactory.create_batch(2)
+    labels = {"view": "async-asset-analytics", "method": "GET"}
+    queries = REGISTRY.get_sample_value("http_request_db_queries_sum", labels) or 0
+    routed = REGISTRY.get_sample_value("db_replica_routed_total", {"db": "default"})
+
+    assert _aget("/api/async/assets/analytics/").status_code == 200
+
+    assert REGISTRY.get_sample_value("http_request_db_queries_sum", labels) == (
+        queries + 4
+    )
+    assert REGISTRY.get_sample_value("db_replica_routed_total", {"db": "default"}) > (
+        routed or 0
+    )
+
+
+@pytest.mark.django_db
+def test_async_views_are_read_only():
+    async def post():
+        return await AsyncClient().post("/api/async/assets/")
+
+    assert async_to_sync(post)().status_code == 405
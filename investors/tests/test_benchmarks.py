@@ -0,0 +1,74 @@
+import pytest
+
+from investors.benchmarks import compare, run_suite, seed_book
+from investors.bulk_loader import SeedScale
+from investors.models import Asset, Portfolio
+
+
+def _results(benchmarks, scale="tiny", vendor="sqlite"):
+    return {
+        "meta": {"scale": scale, "vendor": vendor, "dataset": {}},
+        "benchmarks": {
+            name: {"median_s": median, "queries": queries}
+            for name, (median, queries) in benchmarks.items()
+        },
+    }
+
+
+def test_compare_flags_slowdowns_and_extra_queries():
+    baseline = _results(
+        {
+            "slower": (0.100, 3),
+            "noisy": (0.0002, 1),
+            "more_queries": (0.050, 2),
+            "faster": (0.100, 1),
+            "steady": (0.100, 1),
+            "dropped": (0.010, 1),
+        }
+    )
+    current = _results(
+        {
+            "slower": (0.130, 3),
+            "noisy": (0.0009, 1),  # x4.5 but under min_delta_s
+            "more_queries": (0.050, 3),
+            "faster": (0.050, 1),
+            "steady": (0.110, 1),
+            "added": (0.010, 0),
+        }
+    )
+    status = {c.name: c.status for c in compare(current, baseline, threshold=0.2)}
+    assert status == {
+        "slower": "regression",
+        "noisy": "ok",
+        "more_queries": "regression",
+        "faster": "improved",
+        "steady": "ok",
+        "added": "new",
+        "dropped": "missing",
+    }
+
+
+def test_compare_refuses_a_baseline_from_another_dataset():
+    with pytest.raises(ValueError, match="scale"):
+        compare(_results({}, scale="small"), _results({}, scale="tiny"))
+
+
+@pytest.mark.django_db
+def test_suite_runs_on_a_seeded_book_and_rolls_back_writes():
+    scale = SeedScale(
+        investors=5, assets=8, portfolios=12, assets_per_portfolio=3, eod_days=0
+    )
+    ctx = seed_book("test", scale, seed=1, defer_indexes=False)
+    prices = dict(Asset.objects.values_list("id", "price"))
+    names = ["annotate_metrics_list", "quote_apply", "portfolio_bulk_upsert"]
+
+    out = run_suite(ctx, only=names, repeat=2, warmup=0)
+
+    assert list(out["benchmarks"]) == names
+    assert out["benchmarks"]["annotate_metrics_list"]["queries"] == 1
+    assert all(b["runs"] == 2 for b in out["benchmarks"].values())
+    # writers ran inside a rolled-back transaction
+    assert dict(Asset.objects.values_list("id", "price")) == prices
+    assert Portfolio.objects.count() == 12
+    with pytest.raises(ValueError, match="unknown"):
+        run_suite(ctx, only=["nope"])
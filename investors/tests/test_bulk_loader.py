@@ -0,0 +1,49 @@
+import pytest
+
+from investors import bulk_loader
+from investors.bulk_loader import SeedPlan, SeedScale, load_synthetic
+from investors.models import EODPrice, Investor, Portfolio, Position
+
+
+@pytest.mark.django_db
+def test_load_synthetic_is_consistent_across_chunks():
+    scale = SeedScale(
+        investors=7, assets=12, portfolios=25, assets_per_portfolio=4, eod_days=5
+    )
+    # tiny chunks so every table spans several generated chunks
+    plan = SeedPlan.after_existing(scale, seed=3, chunk_rows=9)
+
+    stats = load_synthetic(plan, workers=0, defer_indexes=False)
+
+    rows = {st.table: st.rows for st in stats}
+    assert rows["investors_portfolio_assets"] == 25 * 4
+    assert Investor.objects.count() == 7
+    assert EODPrice.objects.count() == 12 * 5
+    for p in Portfolio.objects.prefetch_related("assets", "positions"):
+        linked = sorted(a.id for a in p.assets.all())
+        held = sorted(pos.asset_id for pos in p.positions.all())
+        assert linked == held and len(set(linked)) == 4
+    assert Position.objects.filter(quantity__lte=0).count() == 0
+
+
+@pytest.mark.django_db
+def test_index_rebuild_time_is_read_after_the_rebuild(monkeypatch):
+    class FakeDeferred:
+        def __init__(self, *models):
+            self.rebuild_sec = 0.0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.rebuild_sec = 1.5  # set only when the indexes come back
+
+    monkeypatch.setattr(bulk_loader, "deferred_indexes", FakeDeferred)
+    scale = SeedScale(
+        investors=2, assets=3, portfolios=2, assets_per_portfolio=1, eod_days=0
+    )
+
+    stats = load_synthetic(SeedPlan.after_existing(scale, seed=1), workers=0)
+
+    (rebuild,) = [st for st in stats if st.table == "(index rebuild)"]
+    assert rebuild.seconds == 1.5
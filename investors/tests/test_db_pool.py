@@ -0,0 +1,99 @@
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, connections
+from prometheus_client import REGISTRY
+
+from core.db_pool import ConnectionPool, PoolTimeout
+from investors.models import Position
+from investors.tests.factories import AssetFactory, InvestorFactory, PortfolioFactory
+
+
+def _run_threads(n, target):
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_threads_share_a_bounded_set_of_connections(transactional_db):
+    pool = ConnectionPool("test-bounded", size=2, timeout=5)
+    lock, active, peak, pooled = threading.Lock(), [0], [0], []
+
+    def work():
+        with pool.connection() as conn:
+            pooled.append(connections["default"] is conn)  # thread's default
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            with connection.cursor() as cur:
+                cur.execute("SELECT 1")
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+
+    with pool:
+        _run_threads(6, work)
+        assert pooled == [True] * 6
+        assert peak[0] <= 2
+        assert len(pool._all) <= 2
+        assert len(pool._idle) == len(pool._all)
+    labels = {"pool": "test-bounded"}
+    assert REGISTRY.get_sample_value("db_pool_wait_seconds_count", labels) == 6
+    assert REGISTRY.get_sample_value("db_pool_checked_out", labels) == 0
+
+
+def test_checkout_times_out_when_the_pool_is_exhausted(transactional_db):
+    pool = ConnectionPool("test-timeout", size=1, timeout=0.05)
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with pool.connection():
+            held.set()
+            release.wait()
+
+    t = threading.Thread(target=hold)
+    t.start()
+    held.wait()
+    try:
+        with pytest.raises(PoolTimeout):
+            with pool.connection():
+                pass
+    finally:
+        release.set()
+        t.join()
+        pool.close()
+    labels = {"pool": "test-timeout"}
+    assert REGISTRY.get_sample_value("db_pool_timeouts_total", labels) == 1
+
+
+def test_order_queue_workers_apply_every_order_on_pooled_connections(
+    transactional_db,
+):
+    # SQLite's shared in-memory test DB locks concurrent writers: one connection
+    p = PortfolioFactory(investor=InvestorFactory())
+    a = AssetFactory()
+    Position.objects.create(portfolio=p, asset=a, quantity=0, avg_price=0)
+
+    call_command(
+        "order_queue",
+        "--portfolio-id",
+        str(p.id),
+        "--asset-id",
+        str(a.id),
+        "--orders",
+        "20",
+        "--workers",
+        "4",
+        "--pool-size",
+        "1",
+        "--price",
+        "10",
+    )
+
+    pos = Position.objects.get(portfolio=p, asset=a)
+    assert pos.quantity == 20 and pos.avg_price == Decimal("10")
@@ -0,0 +1,83 @@
+import pytest
+from django.db import transaction
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core import db_router
+from core.db_router import STICKY_COOKIE, PrimaryReplicaRouter, use_replica
+from investors.models import Asset
+from investors.views import AssetLatestView
+
+router = PrimaryReplicaRouter()
+
+
+@pytest.fixture
+def replicas(settings, monkeypatch):
+    settings.DATABASE_REPLICAS = ["replica_0", "replica_1"]
+    settings.REPLICA_MAX_LAG = 10.0
+    lags = {"replica_0": 1.0, "replica_1": 1.0}
+    monkeypatch.setattr(db_router, "replica_lag", lags.get)
+    return lags
+
+
+def test_reads_use_a_fresh_replica_only_inside_a_replica_scope(replicas):
+    assert router.db_for_read(Asset) is None
+    assert router.db_for_write(Asset) == "default"
+    with use_replica():
+        replicas["replica_0"] = 30.0  # lagging
+        replicas["replica_1"] = None  # probe failed
+        assert router.db_for_read(Asset) == "default"
+        replicas["replica_1"] = 0.5
+        assert router.db_for_read(Asset) == "replica_1"
+    assert router.db_for_read(Asset) is None
+
+
+@pytest.mark.django_db
+def test_reads_inside_a_primary_transaction_stay_on_the_primary(replicas):
+    with use_replica(), transaction.atomic():
+        assert router.db_for_read(Asset) == "default"
+
+
+def test_lag_is_probed_at_most_once_per_interval(settings, monkeypatch):
+    settings.REPLICA_LAG_CHECK_INTERVAL = 60
+    calls = []
+    monkeypatch.setattr(db_router, "_lag_cache", {})
+    monkeypatch.setattr(db_router, "_probe_lag", lambda a: calls.append(a) or 2.5)
+
+    assert db_router.replica_lag("replica_9") == 2.5
+    assert db_router.replica_lag("replica_9") == 2.5
+    assert calls == ["replica_9"]
+
+
+@pytest.mark.django_db(transaction=True)  # no test transaction on the primary
+def test_read_only_views_route_to_replicas_until_the_client_writes(
+    replicas, monkeypatch
+):
+    replicas.pop("replica_1")
+    monkeypatch.setattr(
+        AssetLatestView,
+        "get",
+        lambda self, request: Response({"db": router.db_for_read(Asset)}),
+    )
+    client = APIClient()
+    assert client.get("/api/assets/latest/").data == {"db": "replica_0"}
+
+    res = client.post(
+        "/api/assets/",
+        {"name": "NEW", "category": "Equity", "price": 10, "volatility": 0.2},
+        format="json",
+    )
+    assert res.status_code == 201 and res.cookies[STICKY_COOKIE]["max-age"] == 15
+
+    # pinned: no replica scope, so the router defers to "default"
+    assert client.get("/api/assets/latest/").data == {"db": None}
+    assert APIClient().get("/api/assets/latest/").data == {"db": "replica_0"}
+
+
+@pytest.mark.django_db
+def test_read_only_post_does_not_pin_the_client(replicas):
+    res = APIClient().post(
+        "/api/scenarios/run/", {"scenarios": [{"name": "flat"}]}, format="json"
+    )
+    assert res.status_code == 200
+    assert STICKY_COOKIE not in res.cookies
@@ -0,0 +1,127 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from investors.exposure_services import (
+    apply_position_delta,
+    refresh_exposure,
+    shock_asset,
+)
+from investors.models import AssetExposure, Position
+from investors.quote_services import apply_quotes
+from investors.tests.factories import AssetFactory, InvestorFactory, PortfolioFactory
+
+FIELDS = ("holders", "total_quantity", "market_value", "top_holders")
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def make_holders(asset, quantities):
+    portfolios = []
+    for qty in quantities:
+        p = PortfolioFactory(investor=InvestorFactory())
+        p.assets.add(asset)
+        Position.objects.create(portfolio=p, asset=asset, quantity=Decimal(qty))
+        portfolios.append(p)
+    return portfolios
+
+
+@pytest.mark.django_db
+def test_refresh_builds_totals_and_top_holders():
+    a, b = AssetFactory(price=10), AssetFactory(price=1)
+    ps = make_holders(a, [5, 0, 20, 1])
+    refresh_exposure([a.id, b.id], top_n=2)
+
+    exp = AssetExposure.objects.get(asset=a)
+    assert (exp.holders, exp.total_quantity, exp.market_value) == (3, 26, 260.0)
+    assert exp.top_holders == [[ps[2].id, "20.000000"], [ps[0].id, "5.000000"]]
+    assert AssetExposure.objects.get(asset=b).holders == 0
+
+
+@pytest.mark.django_db
+def test_position_deltas_match_a_full_rebuild():
+    a = AssetFactory(price=10)
+    ps = make_holders(a, [5, 0, 20, 1])
+    refresh_exposure([a.id], top_n=2)
+
+    def fill(portfolio, qty):
+        pos = Position.objects.get(portfolio=portfolio, asset=a)
+        old = pos.quantity
+        pos.quantity = old + Decimal(qty)
+        pos.save()
+        apply_position_delta(a.id, portfolio.id, old, pos.quantity, top_n=2)
+        patched = AssetExposure.objects.values(*FIELDS).get(asset=a)
+        refresh_exposure([a.id], top_n=2)
+        assert patched == AssetExposure.objects.values(*FIELDS).get(asset=a)
+        return patched
+
+    assert fill(ps[1], 3)["holders"] == 4  # crosses zero, stays off the list
+    assert fill(ps[3], 30)["top_holders"][0] == [ps[3].id, "31.000000"]
+    fill(ps[2], 1)  # listed holder grows
+    fill(ps[3], -29)  # listed holder shrinks below an unlisted one: rebuilt
+    assert fill(ps[0], -5)["holders"] == 3  # leaves entirely
+    assert fill(ps[0], 2)["market_value"] == 280.0
+
+
+@pytest.mark.django_db
+def test_quote_update_reprices_exposure():
+    a = AssetFactory(price=10)
+    make_holders(a, [3])
+    refresh_exposure([a.id])
+
+    apply_quotes({a.id: (12.5, 0.2)})
+
+    assert AssetExposure.objects.get(asset=a).market_value == 37.5
+
+
+@pytest.mark.django_db
+def test_shock_revalues_only_holders():
+    a, other = AssetFactory(price=10), AssetFactory(price=100)
+    small, big = make_holders(a, [1, 4])
+    bystander = make_holders(other, [1])[0]
+    Position.objects.create(portfolio=big, asset=other, quantity=Decimal(1))
+
+    impacts = shock_asset(a.id, -0.2)
+
+    assert [i.portfolio_id for i in impacts] == [big.id, small.id]
+    assert bystander.id not in {i.portfolio_id for i in impacts}
+    assert impacts[0].pnl == pytest.approx(-8.0)
+    assert impacts[0].market_value == 140.0
+    assert impacts[0].pct_change == pytest.approx(-8.0 / 140.0)
+
+
+@pytest.mark.django_db
+def test_exposure_and_shock_endpoints(django_assert_num_queries):
+    a = AssetFactory(price=2)
+    (p,) = make_holders(a, [10])
+    refresh_exposure([a.id])
+    client = APIClient()
+
+    with django_assert_num_queries(1):
+        resp = client.get(reverse("asset-exposure", args=[a.id]))
+    body = resp.json()
+    assert body["holders"] == 1 and body["market_value"] == 20.0
+    assert body["top_holders"] == [{"portfolio": p.id, "quantity": 10.0, "value": 20.0}]
+
+    resp = client.post(reverse("asset-shock", args=[a.id]), {"pct": 0.5}, format="json")
+    assert resp.status_code == 200
+    assert resp.json()["total_pnl"] == 10.0
+    assert client.post(reverse("asset-shock", args=[a.id]), {}).status_code == 400
+    for pct in ("nan", "inf", "-inf", -1, -5):
+        resp = client.post(
+            reverse("asset-shock", args=[a.id]), {"pct": pct}, format="json"
+        )
+        assert resp.status_code == 400, pct
+    assert client.get(reverse("asset-exposure", args=[10**9])).status_code == 404
+    fresh = AssetFactory(price=3.0)  # no index row until a position write
+    body = client.get(reverse("asset-exposure", args=[fresh.id])).json()
+    assert (body["holders"], body["top_holders"], body["updated_at"]) == (0, [], None)
+    assert client.get("/api/assets/abc/exposure/").status_code == 404
+    resp = client.post("/api/assets/abc/shock/", {"pct": 0.5}, format="json")
+    assert resp.status_code == 404
@@ -0,0 +1,152 @@
+import time
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY
+from rest_framework.exceptions import ValidationError
+
+from core import db_router
+from core.db_router import use_replica
+from core.hot_cache import LRU, TwoTierCache
+from investors.management.commands.order_queue import OrderMsg, process_order
+from investors.models import Asset
+from investors.quote_services import apply_quotes
+from investors.refdata_services import get_asset_refs, investor_ids_by_email
+from investors.serializers import PortfolioUpsertSerializer
+from investors.tests.factories import AssetFactory, InvestorFactory
+
+
+def _lookups(cache_name, tier):
+    return (
+        REGISTRY.get_sample_value(
+            "hot_cache_lookups_total", {"cache": cache_name, "tier": tier}
+        )
+        or 0.0
+    )
+
+
+def test_lru_evicts_least_recently_used_and_expires():
+    lru = LRU(maxsize=2, ttl=0.05)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")  # b is now the oldest
+    lru.set("c", 3)
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+
+    time.sleep(0.06)
+    assert lru.get("a") is None and len(lru) == 1
+
+
+def test_two_tiers_and_version_bumps_across_processes(settings):
+    settings.HOT_CACHE_VERSION_CHECK = 0
+    source = {1: "one", 2: "two"}
+    loads = []
+
+    def loader(keys):
+        loads.append(sorted(keys))
+        return {k: source[k] for k in keys if k in source}
+
+    here = TwoTierCache("test-tiers", loader)
+    there = TwoTierCache("test-tiers", loader)  # another process, same Redis
+    here.bump()
+
+    assert here.get_many([1, 2, 3]) == {1: "one", 2: "two"}
+    assert here.get_many([1, 2]) == {1: "one", 2: "two"}  # local tier
+    assert there.get_many([1, 2]) == {1: "one", 2: "two"}  # shared tier
+    assert loads == [[1, 2, 3]]
+    assert _lookups("test-tiers", "local") == 2
+    assert _lookups("test-tiers", "shared") == 2
+    assert _lookups("test-tiers", "miss") == 3
+
+    source[1] = "uno"
+    there.bump()  # a writer elsewhere publishes a new version
+    assert here.get(1) == "uno"
+    assert loads[-1] == [1]
+
+
+@pytest.mark.django_db
+def test_asset_refs_follow_model_and_quote_writes(
+    django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    asset = AssetFactory(volatility=0.2, category="Equity")
+    assert get_asset_refs([asset.id])[asset.id].volatility == 0.2
+    with django_assert_num_queries(0):
+        assert get_asset_refs([asset.id])[asset.id].volatility == 0.2
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Asset.objects.update_or_create(id=asset.id, defaults={"category": "Bond"})
+    assert get_asset_refs([asset.id])[asset.id].category == "Bond"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        apply_quotes({asset.id: (99.0, 0.2)})  # price only: refs stay warm
+    with django_assert_num_queries(0):
+        get_asset_refs([asset.id])
+    with django_capture_on_commit_callbacks(execute=True):
+        apply_quotes({asset.id: (99.0, 0.35)})
+    assert get_asset_refs([asset.id])[asset.id].volatility == 0.35
+
+
+@pytest.mark.django_db
+def test_investor_email_changes_outside_the_api_drop_the_lookup(
+    django_capture_on_commit_callbacks,
+):
+    inv = InvestorFactory(email="old@example.com")
+    assert investor_ids_by_email(["old@example.com"]) == {"old@example.com": inv.id}
+
+    inv.email = "new@example.com"
+    with django_capture_on_commit_callbacks(execute=True):
+        inv.save()
+    assert investor_ids_by_email(["old@example.com"]) == {}
+    with django_capture_on_commit_callbacks(execute=True):
+        inv.delete()
+    assert investor_ids_by_email(["new@example.com"]) == {}
+
+
+@pytest.mark.django_db(transaction=True)  # no test transaction pinning the primary
+def test_refs_load_from_the_primary_inside_a_replica_scope(settings, monkeypatch):
+    settings.DATABASE_REPLICAS = ["replica_0"]  # not configured: reading it fails
+    monkeypatch.setattr(db_router, "replica_lag", lambda alias: 0.0)
+    asset, inv = AssetFactory(volatility=0.3), InvestorFactory()
+
+    with use_replica():
+        assert get_asset_refs([asset.id])[asset.id].volatility == 0.3
+        assert investor_ids_by_email([inv.email]) == {inv.email: inv.id}
+
+
+@pytest.mark.django_db
+def test_bulk_upsert_resolves_emails_from_the_cache():
+    investors = [InvestorFactory() for _ in range(3)]
+    payload = [
+        {"name": f"P{n}", "investor_email": inv.email}
+        for n, inv in enumerate(investors)
+    ]
+    investor_ids_by_email(i.email for i in investors)  # warm
+
+    ser = PortfolioUpsertSerializer(data=payload, many=True)
+    ser.is_valid(raise_exception=True)
+    with CaptureQueriesContext(connection) as ctx:
+        objs = ser.save()
+    assert not any('"investors_investor"' in q["sql"] for q in ctx.captured_queries)
+    assert [o.investor_id for o in objs] == [i.id for i in investors]
+
+    bad = PortfolioUpsertSerializer(
+        data=[{"name": "X", "investor_email": "nobody@example.com"}], many=True
+    )
+    bad.is_valid(raise_exception=True)
+    with pytest.raises(ValidationError, match="unknown investor"):
+        bad.save()
+
+
+@pytest.mark.django_db
+def test_process_order_rejects_unknown_assets():
+    msg = OrderMsg(
+        portfolio_id=1,
+        asset_id=987654,
+        qty=Decimal("1"),
+        price=Decimal("1"),
+        order_id="o-1",
+    )
+    with pytest.raises(ValueError, match="unknown asset"):
+        process_order(msg)
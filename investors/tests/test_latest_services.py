@@ -0,0 +1,80 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from investors.latest_services import reconcile_latest
+from investors.models import AssetLatest, EODPrice
+from investors.price_services import upsert_earnings, upsert_eod_bars
+from investors.tests.factories import AssetFactory
+from investors.tests.test_price_services import make_bars
+
+
+@pytest.mark.django_db
+def test_snapshot_tracks_newest_bar_even_when_written_out_of_order():
+    asset = AssetFactory()
+    upsert_eod_bars({asset.id: make_bars([10.0, 11.0, 12.0])}, batch_size=2)
+    # an older revision arrives later: the snapshot must not go back in time
+    upsert_eod_bars({asset.id: make_bars([9.5])})
+
+    snap = AssetLatest.objects.get(asset=asset)
+    assert (snap.close, snap.close_date, snap.volume) == (
+        Decimal("12"),
+        date(2025, 1, 3),
+        1002,
+    )
+
+
+@pytest.mark.django_db
+def test_earnings_set_ttm_eps_and_pe():
+    asset = AssetFactory()
+    upsert_eod_bars({asset.id: make_bars([100.0])})
+    quarters = [(date(2024, m, 28), 1.0) for m in (3, 6, 9)]
+    upsert_earnings({asset.id: quarters})
+    snap = AssetLatest.objects.get(asset=asset)
+    assert snap.eps == 1 and snap.eps_ttm is None and snap.pe is None
+
+    upsert_earnings({asset.id: [(date(2024, 12, 31), 2.0)]})
+    snap.refresh_from_db()
+    assert snap.eps_period_end == date(2024, 12, 31)
+    assert snap.eps_ttm == 5 and snap.pe == pytest.approx(20.0)
+
+
+@pytest.mark.django_db
+def test_reconcile_reports_and_fixes_drift():
+    a, b, c = AssetFactory(), AssetFactory(), AssetFactory()
+    upsert_eod_bars({a.id: make_bars([10.0, 11.0]), b.id: make_bars([5.0])})
+    # writes that bypass the ingestion path leave the snapshot behind
+    EODPrice.objects.create(asset=a, date=date(2025, 2, 1), close=13)
+    AssetLatest.objects.filter(asset=b).delete()
+    AssetLatest.objects.create(asset=c, close=1, close_date=date(2025, 1, 1))
+
+    report = reconcile_latest(fix=True)
+
+    assert (report["drifted"], report["missing"], report["orphaned"]) == (
+        [a.id],
+        [b.id],
+        [c.id],
+    )
+    assert reconcile_latest()["checked"] == 3
+    assert not any(reconcile_latest()[k] for k in ("drifted", "missing", "orphaned"))
+    assert AssetLatest.objects.get(asset=a).close == 13
+
+
+@pytest.mark.django_db
+def test_latest_endpoint_reads_snapshot(django_assert_max_num_queries):
+    a, b = AssetFactory(), AssetFactory()
+    upsert_eod_bars({a.id: make_bars([50.0]), b.id: make_bars([20.0])})
+    upsert_earnings({a.id: [(date(2024, m, 28), 1.0) for m in (3, 6, 9, 12)]})
+
+    client = APIClient()
+    with django_assert_max_num_queries(2):
+        resp = client.get(reverse("asset-latest"), {"max_pe": 15})
+    assert resp.status_code == 200
+    assert resp.json()["count"] == 1
+    assert [(r["asset"], r["pe"]) for r in resp.json()["results"]] == [(a.id, 12.5)]
+    page = client.get(reverse("asset-latest"), {"limit": 1, "offset": 1}).json()
+    assert page["count"] == 2 and [r["asset"] for r in page["results"]] == [b.id]
+    assert client.get(reverse("asset-latest"), {"ids": "x"}).status_code == 400
@@ -0,0 +1,82 @@
+import math
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from investors.metrics_services import compute_book_metrics, recompute_portfolio_stats
+from investors.models import PortfolioStat, Position
+from investors.price_cache import PriceCache, build_price_cache
+from investors.price_services import upsert_eod_bars
+from investors.tests.factories import AssetFactory, InvestorFactory, PortfolioFactory
+from investors.tests.test_price_services import make_bars, walk
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def hold(portfolio, asset, qty):
+    portfolio.assets.add(asset)
+    Position.objects.create(portfolio=portfolio, asset=asset, quantity=Decimal(qty))
+
+
+@pytest.mark.django_db
+def test_port_vol_uses_market_value_weights():
+    a = AssetFactory(price=10, volatility=0.2)
+    b = AssetFactory(price=10, volatility=0.4)
+    p = PortfolioFactory(investor=InvestorFactory())
+    empty = PortfolioFactory(investor=InvestorFactory())
+    hold(p, a, 3)  # weight 0.75
+    hold(p, b, 1)  # weight 0.25
+
+    got = compute_book_metrics([p.id, empty.id])
+
+    expected = math.sqrt((0.75 * 0.2) ** 2 + (0.25 * 0.4) ** 2)
+    assert got[p.id]["port_vol"] == pytest.approx(expected)
+    assert got[p.id]["sharpe_proxy"] == pytest.approx(1 / expected)
+    assert got[empty.id] == {"port_vol": None, "sharpe_proxy": None}
+
+
+@pytest.mark.django_db
+def test_covariance_path_matches_dense_formula(tmp_path):
+    a, b, c = AssetFactory(price=1), AssetFactory(price=1), AssetFactory(price=1)
+    c.volatility = 0.3
+    c.save()
+    upsert_eod_bars(
+        {a.id: make_bars(walk(40, seed=3)), b.id: make_bars(walk(40, seed=5))}
+    )
+    build_price_cache(tmp_path)
+    cache_ = PriceCache.open(tmp_path)
+    p = PortfolioFactory(investor=InvestorFactory())
+    for asset, qty in ((a, 2), (b, 1), (c, 1)):  # c has no history
+        hold(p, asset, qty)
+
+    got = compute_book_metrics([p.id], covariance=True, window=20, cache=cache_)
+
+    rets = np.diff(np.log(cache_.window_matrix([a.id, b.id], 21)), axis=1)
+    cov = np.cov(rets) * 252.0
+    w = np.array([0.5, 0.25])
+    expected = math.sqrt(w @ cov @ w + (0.25 * 0.3) ** 2)
+    assert got[p.id]["port_vol"] == pytest.approx(expected, rel=1e-9)
+
+
+@pytest.mark.django_db
+def test_recompute_writes_stats_read_by_list_endpoint(django_assert_max_num_queries):
+    a = AssetFactory(price=5, volatility=0.3)
+    portfolios = [PortfolioFactory(investor=InvestorFactory()) for _ in range(5)]
+    for p in portfolios:
+        hold(p, a, 1)
+
+    assert recompute_portfolio_stats(batch_size=2) == 5
+    vols = PortfolioStat.objects.values_list("port_vol", flat=True)
+    assert list(vols) == pytest.approx([0.3] * 5)
+
+    with django_assert_max_num_queries(3):
+        body = APIClient().get(reverse("portfolio-list")).json()
+    assert body["results"][0]["port_vol"] == pytest.approx(0.3)
+    assert body["results"][0]["total_value"] == 5.0
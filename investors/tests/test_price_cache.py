@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from investors.management import cpu_risk
+from investors.management.utils.parser_and_financial_computations import (
+    annualized_volatility_from_closes,
+)
+from investors.price_cache import PriceCache, build_price_cache
+from investors.price_services import upsert_eod_bars
+from investors.tests.factories import AssetFactory
+from investors.tests.test_price_services import make_bars, walk
+
+
+@pytest.mark.django_db
+def test_incremental_build_appends_new_bars_and_new_assets(tmp_path):
+    a, b = AssetFactory(), AssetFactory()
+    upsert_eod_bars({a.id: make_bars(walk(30)), b.id: make_bars(walk(10, seed=3))})
+    first = build_price_cache(tmp_path)
+    assert (first.rows, first.new_rows) == (40, 40)
+
+    later = date(2025, 1, 1) + timedelta(days=30)
+    c = AssetFactory()
+    upsert_eod_bars(
+        {a.id: make_bars([120.0, 121.0], start=later), c.id: make_bars(walk(5))}
+    )
+    second = build_price_cache(tmp_path)
+
+    assert second.new_rows == 7 and second.rows == 47
+    cache = PriceCache.open(tmp_path)
+    assert cache.path.name == second.generation
+    assert cache.closes(a.id).tolist() == pytest.approx(walk(30) + [120.0, 121.0])
+    assert cache.closes(a.id, last_n=2).tolist() == [120.0, 121.0]
+    assert date.fromordinal(int(cache.dates(a.id)[-1])) == later + timedelta(days=1)
+    assert len(cache.closes(c.id)) == 5
+    assert len(cache.closes(10**9)) == 0
+    # the slice is a view on the mapped file, not a copy
+    assert isinstance(cache.closes_arr, np.memmap)
+    assert np.shares_memory(cache.closes(a.id), cache.closes_arr)
+
+
+@pytest.mark.django_db
+def test_incremental_build_catches_up_an_asset_whose_bars_landed_late(tmp_path):
+    a, b = AssetFactory(), AssetFactory()
+    start = date(2025, 1, 1)
+    # A is through Jan 30, B only through Jan 10 (its fetch failed)
+    upsert_eod_bars(
+        {a.id: make_bars(walk(30), start=start), b.id: make_bars(walk(10, seed=3))}
+    )
+    build_price_cache(tmp_path)
+
+    late = walk(20, seed=4)
+    upsert_eod_bars({b.id: make_bars(late, start=start + timedelta(days=10))})
+    second = build_price_cache(tmp_path)
+
+    cache = PriceCache.open(tmp_path)
+    assert second.new_rows == 20
+    assert cache.closes(b.id).tolist() == pytest.approx(walk(10, seed=3) + late)
+    assert len(cache.closes(a.id)) == 30
+    assert date.fromordinal(int(cache.dates(b.id)[-1])) == start + timedelta(days=29)
+
+
+@pytest.mark.django_db
+def test_cache_vols_match_scalar_and_feed_var_workers(tmp_path):
+    a, b = AssetFactory(), AssetFactory()
+    upsert_eod_bars({a.id: make_bars(walk(80)), b.id: make_bars([10.0, 11.0])})
+    build_price_cache(tmp_path)
+
+    vols = PriceCache.open(tmp_path).volatilities([a.id, b.id], window=63)
+
+    assert vols == {
+        a.id: pytest.approx(annualized_volatility_from_closes(walk(80)[-64:]))
+    }
+
+    cpu_risk._open_price_cache(tmp_path)
+    try:
+        positions = cpu_risk._with_history_vol(
+            [
+                cpu_risk.Position(1.0, 10.0, 0.5, a.id),
+                cpu_risk.Position(1.0, 5.0, 0.3, b.id),
+            ],
+            window=63,
+        )
+    finally:
+        cpu_risk._price_cache = None
+    assert positions[0].volatility == pytest.approx(vols[a.id])
+    assert positions[1].volatility == 0.3
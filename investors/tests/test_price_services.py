@@ -0,0 +1,121 @@
+import importlib
+import math
+from datetime import date, timedelta
+
+import pytest
+
+from investors.eod_partitions import _bounds_between, apply_retention
+from investors.management.utils.parser_and_financial_computations import (
+    annualized_volatility_from_closes,
+    parse_yahoo_chart_bars,
+)
+from investors.management.utils.types_and_enums import Bar
+from investors.models import AssetVolState, EODPrice, EODPriceMonthly
+from investors.price_services import refresh_volatility, upsert_eod_bars
+from investors.tests.factories import AssetFactory
+
+
+def make_bars(closes, start=date(2025, 1, 1)):
+    return [Bar(start + timedelta(days=i), c, 1000 + i) for i, c in enumerate(closes)]
+
+
+def walk(n, seed=7):
+    # deterministic positive price path
+    return [100.0 * math.exp(0.01 * math.sin(seed * i)) for i in range(n)]
+
+
+@pytest.mark.django_db
+def test_upsert_eod_bars_is_idempotent_and_updates_close():
+    asset = AssetFactory()
+    bars = make_bars([10.0, 11.0, 12.0])
+
+    upsert_eod_bars({asset.id: bars}, batch_size=2)
+    upsert_eod_bars({asset.id: [bars[-1]._replace(close=12.5)]})
+
+    closes = list(
+        EODPrice.objects.filter(asset=asset)
+        .order_by("date")
+        .values_list("close", flat=True)
+    )
+    assert [float(c) for c in closes] == [10.0, 11.0, 12.5]
+
+
+@pytest.mark.django_db
+def test_incremental_vol_matches_full_window_recompute():
+    asset = AssetFactory()
+    closes = walk(40)
+    window = 10
+
+    upsert_eod_bars({asset.id: make_bars(closes[:25])})
+    refresh_volatility([asset.id], window=window)
+    # next run only brings newer bars; older ones must slide out of the window
+    upsert_eod_bars({asset.id: make_bars(closes)})
+    vol = refresh_volatility([asset.id], window=window)[asset.id]
+
+    expected = annualized_volatility_from_closes(closes[-(window + 1) :])
+    assert vol == pytest.approx(expected, rel=1e-9)
+    state = AssetVolState.objects.get(asset=asset)
+    assert state.n == window
+    assert state.last_date == date(2025, 1, 1) + timedelta(days=39)
+
+
+def test_parse_yahoo_chart_bars_skips_null_closes():
+    payload = {
+        "chart": {
+            "result": [
+                {
+                    "meta": {"gmtoffset": -14400},
+                    "timestamp": [1735741800, 1735828200, 1735914600],
+                    "indicators": {
+                        "quote": [{"close": [10.0, None, 12.0], "volume": [5, 6, 7]}]
+                    },
+                }
+            ]
+        }
+    }
+    assert parse_yahoo_chart_bars(payload) == [
+        Bar(date(2025, 1, 1), 10.0, 5),
+        Bar(date(2025, 1, 3), 12.0, 7),
+    ]
+
+
+@pytest.mark.django_db
+def test_retention_rolls_up_whole_months_before_deleting():
+    asset = AssetFactory()
+    start = date.today().replace(day=1) - timedelta(days=100)
+    upsert_eod_bars({asset.id: make_bars([float(10 + i) for i in range(100)], start)})
+
+    out = apply_retention(keep_days=30)
+
+    cutoff = (date.today() - timedelta(days=30)).replace(day=1)
+    assert not EODPrice.objects.filter(date__lt=cutoff).exists()
+    assert out["deleted_rows"] == sum(
+        out_bar < cutoff for out_bar in (start + timedelta(days=i) for i in range(100))
+    )
+    monthly = EODPriceMonthly.objects.filter(asset=asset).order_by("month")
+    assert sum(m.bars for m in monthly) == out["deleted_rows"]
+    first = monthly.first()
+    assert first.close_min == 10 and first.month == start.replace(day=1)
+
+
+class _RecordingCursor:
+    def __init__(self):
+        self.sql = []
+
+    def execute(self, sql, params=None):
+        self.sql.append(sql)
+
+
+@pytest.mark.parametrize("interval", ["month", "year"])
+def test_migration_partitions_match_the_runtime_helpers(settings, interval):
+    settings.EODPRICE_PARTITION_INTERVAL = interval
+    migration = importlib.import_module("investors.migrations.0006_partition_eodprice")
+    cur = _RecordingCursor()
+    first, last = date(2023, 11, 15), date(2025, 2, 3)
+    migration.create_partitions(cur, first, last)
+
+    assert cur.sql == [
+        f"CREATE TABLE {name} PARTITION OF investors_eodprice"
+        f" FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        for name, start, end in _bounds_between(first, last, interval)
+    ]
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.profiling import PROFILE_ID_HEADER, Sampler, save_profile
+from investors.tasks import refresh_quotes_shard
+from investors.tests.factories import AssetFactory
+
+
+@pytest.fixture
+def profiles(settings, tmp_path):
+    settings.PROFILE_DIR = tmp_path
+    settings.PROFILE_SAMPLE_INTERVAL = 0.001
+    return tmp_path
+
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampler_folds_the_target_threads_stacks(profiles):
+    sampler = Sampler(interval=0.001).start()
+    _spin(0.05)
+    sampler.stop()
+
+    assert sampler.samples > 0
+    top = sampler.folded().splitlines()[0]
+    stack, count = top.rsplit(" ", 1)
+    assert stack.split(";")[-1] == f"{__name__}:_spin"
+    assert int(count) > 0
+
+
+def test_only_the_newest_profiles_are_kept(profiles, settings):
+    settings.PROFILE_RETENTION = 2
+    sampler = Sampler().start().stop()
+    paths = [save_profile("task", f"t{i}", sampler) for i in range(4)]
+
+    assert sorted(profiles.iterdir()) == sorted(paths[-2:])
+
+
+@pytest.mark.django_db
+def test_flagged_request_is_profiled_for_staff_only(
+    profiles, django_user_model, monkeypatch
+):
+    AssetFactory.create_batch(3)
+    render = JSONRenderer.render
+
+    def slow_render(self, *args, **kwargs):
+        _spin(0.02)  # long enough to be sampled
+        return render(self, *args, **kwargs)
+
+    monkeypatch.setattr(JSONRenderer, "render", slow_render)
+    client = APIClient()
+    assert PROFILE_ID_HEADER not in client.get("/api/assets/", HTTP_X_PROFILE="1")
+
+    client.force_login(django_user_model.objects.create(username="ops", is_staff=True))
+    assert PROFILE_ID_HEADER not in client.get("/api/assets/")
+    res = client.get("/api/assets/", {"profile": "1"})
+
+    assert res.status_code == 200
+    path = profiles / res[PROFILE_ID_HEADER]
+    assert path.name.startswith("request-GET-asset-list-")
+    folded = path.read_text()
+    assert "rest_framework." in folded and ".slow_render;" in folded
+
+
+@pytest.mark.django_db
+def test_sampling_starts_only_for_staff_incl_drf_auth(
+    profiles, django_user_model, monkeypatch
+):
+    started = []
+    start = Sampler.start
+    monkeypatch.setattr(
+        Sampler, "start", lambda self: started.append(self) or start(self)
+    )
+    client = APIClient()
+
+    client.get("/api/assets/", HTTP_X_PROFILE="1")
+    client.force_authenticate(django_user_model.objects.create(username="u"))
+    client.get("/api/assets/", HTTP_X_PROFILE="1")
+    assert started == []
+
+    # basic/token-style auth: the user is only known once DRF has run
+    client.force_authenticate(
+        django_user_model.objects.create(username="ops", is_staff=True)
+    )
+    res = client.get("/api/assets/", HTTP_X_PROFILE="1")
+
+    assert len(started) == 1
+    assert (profiles / res[PROFILE_ID_HEADER]).exists()
+
+
+@pytest.mark.django_db
+def test_tasks_listed_in_settings_are_profiled(profiles, settings):
+    assets = AssetFactory.create_batch(2)
+    refresh_quotes_shard.apply((assets[0].id, assets[1].id + 1), {"source": "demo"})
+    assert list(profiles.iterdir()) == []
+
+    settings.PROFILE_TASKS = ["refresh_quotes_shard"]
+    refresh_quotes_shard.apply((assets[0].id, assets[1].id + 1), {"source": "demo"})
+
+    (path,) = profiles.iterdir()
+    assert path.name.startswith("task-investors.tasks.refresh_quotes_shard-")
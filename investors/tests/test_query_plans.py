@@ -0,0 +1,51 @@
+import pytest
+
+from investors.benchmarks import seed_book
+from investors.bulk_loader import SeedScale
+from investors.models import Asset
+from investors.query_plans import capture_plans, diff_plans, save_plans
+
+
+@pytest.fixture
+def ctx(db):
+    scale = SeedScale(
+        investors=5, assets=8, portfolios=12, assets_per_portfolio=3, eod_days=0
+    )
+    return seed_book("test", scale, seed=1, defer_indexes=False)
+
+
+def test_hot_queries_are_explained_and_writes_rolled_back(ctx):
+    prices = dict(Asset.objects.values_list("id", "price"))
+
+    plans = capture_plans(ctx, only=["portfolio_top", "quote_apply"])
+
+    assert [qp.name for qp in plans] == ["portfolio_top", "quote_apply"]
+    for qp in plans:
+        assert qp.statements and len(qp.plans) == len(qp.statements)
+        assert all(qp.plans)
+    assert "investors_portfoliostat" in plans[0].render()
+    assert dict(Asset.objects.values_list("id", "price")) == prices
+    with pytest.raises(ValueError, match="unknown"):
+        capture_plans(ctx, only=["nope"])
+
+
+def test_scans_and_sorts_of_large_tables_are_flagged(ctx):
+    (quiet,) = capture_plans(ctx, only=["position_totals"])
+    (loud,) = capture_plans(ctx, only=["position_totals"], large_rows=1)
+
+    assert quiet.findings == []
+    kinds = {(f.kind, f.table) for f in loud.findings}
+    assert ("sort", "investors_position") in kinds
+    assert all(f.rows >= 1 for f in loud.findings)
+
+
+def test_saved_plans_diff_clean_until_a_plan_changes(ctx, tmp_path):
+    plans = capture_plans(ctx, only=["asset_latest", "portfolio_detail"])
+    save_plans(tmp_path, plans)
+
+    assert not any(diff_plans(tmp_path, plans).values())
+    node = plans[0].plans[0][0]
+    node.op, node.index = "SEARCH", "investors_a_pe_7e1c2d_idx"
+    diffs = diff_plans(tmp_path, plans)
+    assert diffs["asset_latest"].startswith("---")
+    assert diffs["portfolio_detail"] == ""
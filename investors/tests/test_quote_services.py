@@ -0,0 +1,41 @@
+import pytest
+from django.db import transaction
+
+from investors.models import Asset
+from investors.quote_services import apply_quotes
+from investors.tests.factories import AssetFactory
+
+
+@pytest.mark.django_db
+def test_apply_quotes_updates_only_changed_rows_and_returns_their_ids(
+    django_assert_max_num_queries,
+):
+    same, moved, vol_only = AssetFactory.create_batch(3, price=100.0, volatility=0.2)
+    missing_id = vol_only.id + 1000
+
+    with django_assert_max_num_queries(9):
+        changed = apply_quotes(
+            {
+                same.id: (100.0, 0.2),
+                moved.id: (101.5, 0.2),
+                vol_only.id: (100.0, 0.25),
+                missing_id: (1.0, 1.0),
+            }
+        )
+
+    assert sorted(changed) == sorted([moved.id, vol_only.id])
+    rows = dict(Asset.objects.values_list("id", "price"))
+    assert rows[moved.id] == 101.5 and rows[same.id] == 100.0
+    assert Asset.objects.get(id=vol_only.id).volatility == 0.25
+    assert apply_quotes({moved.id: (101.5, 0.2)}) == []
+
+
+@pytest.mark.django_db
+def test_apply_quotes_twice_in_one_outer_transaction():
+    # e.g. several shards applied in one atomic block: the temp table of the
+    # first call must not survive into the second
+    a, b = AssetFactory.create_batch(2, price=10.0, volatility=0.2)
+    with transaction.atomic():
+        assert apply_quotes({a.id: (11.0, 0.2)}) == [a.id]
+        assert apply_quotes({b.id: (12.0, 0.2)}) == [b.id]
+    assert dict(Asset.objects.values_list("id", "price")) == {a.id: 11.0, b.id: 12.0}
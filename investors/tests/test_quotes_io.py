@@ -0,0 +1,80 @@
+import asyncio
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from investors.management import quotes_io
+from investors.management.utils.parser_and_financial_computations import (
+    parse_yahoo_chart_payload,
+)
+from investors.management.utils.timer import LoopLagMonitor
+
+
+def chart_body(closes):
+    return json.dumps(
+        {
+            "chart": {
+                "result": [
+                    {
+                        "meta": {"gmtoffset": 0},
+                        "timestamp": [
+                            1735689600 + 86400 * i for i in range(len(closes))
+                        ],
+                        "indicators": {"quote": [{"close": closes, "volume": None}]},
+                    }
+                ]
+            }
+        }
+    ).encode()
+
+
+def test_offload_mode_matches_inline_parse(monkeypatch):
+    bodies = {
+        f"T{i}": chart_body([100 * math.exp(0.01 * math.sin(i * k)) for k in range(30)])
+        for i in range(5)
+    }
+    bodies["SHORT"] = chart_body([None, 10.0])
+
+    async def fake_get_bytes(session, symbol, **_):
+        return bodies[symbol]
+
+    monkeypatch.setattr(quotes_io, "_yahoo_get_bytes", fake_get_bytes)
+
+    async def run():
+        with ThreadPoolExecutor(2) as pool:
+            lag = LoopLagMonitor()
+            offload = quotes_io.ParseOffload(pool, max_pending=2)
+            quotes = await quotes_io.fetch_quotes_async(
+                list(enumerate(bodies)), "yahoo", offload=offload, lag_monitor=lag
+            )
+        return quotes, lag
+
+    quotes, lag = asyncio.run(run())
+
+    for aid, symbol in enumerate(bodies):
+        expected = parse_yahoo_chart_payload(json.loads(bodies[symbol]))
+        assert quotes[aid] == pytest.approx(expected)
+    assert set(lag.summary()) == {"samples", "mean_ms", "p99_ms", "max_ms"}
+
+
+def test_threaded_fetch_isolates_failed_requests(monkeypatch):
+    import requests
+
+    from investors.management import threaded_fetch
+
+    def flaky_fetch(asset_id, name, bars=None, pooled=True):
+        if name == "BAD":
+            raise requests.HTTPError("404 Client Error")
+        if name == "EMPTY":
+            return None
+        return asset_id, 10.0, 0.2
+
+    monkeypatch.setattr(threaded_fetch, "_yahoo_fetch", flaky_fetch)
+
+    quotes = threaded_fetch.fetch_quotes_threaded(
+        [(1, "OK1"), (2, "BAD"), (3, "EMPTY"), (4, "OK2")], "yahoo"
+    )
+
+    assert quotes == {1: (10.0, 0.2), 4: (10.0, 0.2)}
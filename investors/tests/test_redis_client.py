@@ -0,0 +1,38 @@
+from core import redis_client
+
+
+def test_one_pooled_client_per_url(settings):
+    settings.REDIS_MAX_CONNECTIONS = 7
+    a = redis_client.get_redis("redis://pool-test:6379/3")
+
+    assert redis_client.get_redis("redis://pool-test:6379/3") is a
+    assert redis_client.get_redis("redis://pool-test:6379/4") is not a
+    assert a.connection_pool.max_connections == 7
+
+
+class _Pipeline:
+    def __init__(self, store, calls):
+        self.store, self.calls, self.ops = store, calls, []
+
+    def set(self, key, value, ex=None, nx=False):
+        self.ops.append(key)
+
+    def execute(self):
+        self.calls.append(len(self.ops))
+        out = [None if k in self.store else True for k in self.ops]
+        self.store.update(self.ops)
+        return out
+
+
+def test_acquire_many_claims_a_chunk_in_one_round_trip(monkeypatch):
+    store, calls = {"task:x:2"}, []
+    client = type(
+        "C", (), {"pipeline": lambda self, transaction: _Pipeline(store, calls)}
+    )
+    monkeypatch.setattr(redis_client, "get_redis", lambda url=None: client())
+
+    got = redis_client.acquire_many([f"task:x:{i}" for i in range(1, 4)], ttl_sec=60)
+
+    assert got == {"task:x:1": True, "task:x:2": False, "task:x:3": True}
+    assert calls == [3]
+    assert redis_client.acquire_many([]) == {}
@@ -0,0 +1,109 @@
+import pytest
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from core.metrics import QueryBudgetExceeded, view_query_budget
+from investors.models import Position
+from investors.tests.factories import (
+    AssetFactory,
+    InvestorFactory,
+    PortfolioFactory,
+)
+from investors.views import AssetAnalyticsView, PortfolioViewSet
+
+
+def _book(n_portfolios=4, n_assets=6):
+    assets = AssetFactory.create_batch(n_assets)
+    portfolios = []
+    for _ in range(n_portfolios):
+        p = PortfolioFactory(investor=InvestorFactory())
+        p.assets.set(assets)
+        Position.objects.bulk_create(
+            [Position(portfolio=p, asset=a, quantity=3) for a in assets]
+        )
+        portfolios.append(p)
+    return portfolios, assets
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "method,url,body",
+    [
+        ("get", "/api/portfolios/", None),
+        ("get", "/api/portfolios/{p}/", None),
+        ("get", "/api/portfolios/top/", None),
+        ("get", "/api/portfolios/{p}/valuation/", None),
+        ("get", "/api/portfolios/valuations/?ids={p}", None),
+        ("get", "/api/portfolios/{p}/stats/", None),
+        ("get", "/api/assets/", None),
+        ("get", "/api/assets/{a}/", None),
+        ("post", "/api/assets/{a}/shock/", {"pct": -0.1}),
+        ("get", "/api/assets/analytics/", None),
+        ("get", "/api/assets/latest/", None),
+        ("get", "/api/assets/cached/", None),
+        ("get", "/api/investors/", None),
+        ("get", "/api/profiles/", None),
+    ],
+)
+def test_views_stay_within_query_budget(settings, method, url, body):
+    settings.QUERY_BUDGET_MODE = "raise"
+    portfolios, assets = _book()
+    url = url.format(p=portfolios[0].id, a=assets[0].id)
+    res = getattr(APIClient(), method)(url, body, format="json")
+    assert res.status_code == 200
+
+
+@pytest.mark.django_db
+def test_over_budget_raises_in_raise_mode(settings, monkeypatch):
+    settings.QUERY_BUDGET_MODE = "raise"
+    _book()
+    monkeypatch.setattr(AssetAnalyticsView, "query_budget", 1)
+    with pytest.raises(QueryBudgetExceeded, match="asset-analytics ran 4 queries"):
+        APIClient().get("/api/assets/analytics/")
+
+
+@pytest.mark.django_db
+def test_over_budget_is_counted_in_log_mode(settings, monkeypatch):
+    settings.QUERY_BUDGET_MODE = "log"
+    _book()
+    monkeypatch.setattr(AssetAnalyticsView, "query_budget", 1)
+    labels = {"view": "asset-analytics", "method": "GET"}
+    before = _sample("http_query_budget_exceeded_total", **labels)
+    assert APIClient().get("/api/assets/analytics/").status_code == 200
+    assert _sample("http_query_budget_exceeded_total", **labels) == before + 1
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_exposes_per_view_histograms():
+    _book()
+    labels = {"view": "portfolio-list", "method": "GET"}
+    count_before = _sample("http_request_db_queries_count", **labels)
+    queries_before = _sample("http_request_db_queries_sum", **labels)
+    APIClient().get("/api/portfolios/")
+
+    assert _sample("http_request_db_queries_count", **labels) == count_before + 1
+    assert _sample("http_request_db_queries_sum", **labels) == queries_before + 2
+    body = APIClient().get("/metrics/").content.decode()
+    assert (
+        'http_request_duration_seconds_bucket{le="0.005",method="GET",view="portfolio-list"}'
+        in body
+    )
+    assert (
+        'http_response_render_seconds_count{method="GET",view="portfolio-list"}' in body
+    )
+    assert (
+        'http_requests_total{method="GET",status="200",view="portfolio-list"}' in body
+    )
+
+
+def test_budget_resolves_per_action():
+    list_view = PortfolioViewSet.as_view({"get": "list"})
+    detail_view = PortfolioViewSet.as_view({"get": "retrieve", "delete": "destroy"})
+    assert view_query_budget(list_view, "GET") == 2
+    assert view_query_budget(detail_view, "GET") == 2
+    assert view_query_budget(detail_view, "DELETE") is None
+    assert view_query_budget(AssetAnalyticsView.as_view(), "GET") == 4
@@ -0,0 +1,115 @@
+import json
+import math
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from investors.management.cpu_risk import (
+    Position as RiskPosition,
+    parametric_var,
+    simulate_portfolio_pnl,
+    value_at_risk,
+)
+from investors.metrics_services import compute_book_metrics
+from investors.models import Position
+from investors.scenario_services import Scenario, evaluate, load_book, run_scenarios
+from investors.tests.factories import AssetFactory, InvestorFactory, PortfolioFactory
+
+
+def make_book():
+    eq = AssetFactory(price=10, volatility=0.2, category="Equity")
+    bond = AssetFactory(price=100, volatility=0.05, category="Bond")
+    mixed = PortfolioFactory(investor=InvestorFactory())
+    bonds = PortfolioFactory(investor=InvestorFactory())
+    for p, asset, qty in [(mixed, eq, 10), (mixed, bond, 1), (bonds, bond, 2)]:
+        Position.objects.create(portfolio=p, asset=asset, quantity=Decimal(qty))
+    return (eq, bond), (mixed, bonds)
+
+
+def test_parametric_var_matches_monte_carlo():
+    positions = [RiskPosition(10, 10.0, 0.2), RiskPosition(1, 100.0, 0.05)]
+    mc = value_at_risk(simulate_portfolio_pnl(positions, paths=40_000))
+    port_vol = math.sqrt((0.5 * 0.2) ** 2 + (0.5 * 0.05) ** 2)
+    closed = parametric_var(np.array([200.0]), np.array([port_vol]))[0]
+    assert mc == pytest.approx(closed, rel=0.05)
+
+
+@pytest.mark.django_db
+def test_scenario_revalues_only_affected_portfolios():
+    (eq, bond), (mixed, bonds) = make_book()
+    book = load_book()
+    base = compute_book_metrics([mixed.id, bonds.id])
+    assert book.base_vol[list(book.portfolio_ids).index(mixed.id)] == pytest.approx(
+        base[mixed.id]["port_vol"]
+    )
+
+    scenario = Scenario.from_dict(
+        {
+            "name": "eq crash",
+            "shocks": [{"category": "Equity", "price_pct": -0.5, "vol_mult": 2}],
+        }
+    )
+    result = evaluate(book, scenario)
+
+    assert result.portfolio_ids.tolist() == [mixed.id]
+    assert result.pnl.tolist() == [-50.0]
+    # 50 of equity at 0.4 vol, 100 of bonds at 0.05
+    w_eq, w_bd = 50 / 150, 100 / 150
+    assert result.shocked_vol[0] == pytest.approx(
+        math.sqrt((w_eq * 0.4) ** 2 + (w_bd * 0.05) ** 2)
+    )
+    expected_var = parametric_var(np.array([150.0]), result.shocked_vol)[0]
+    assert result.shocked_var[0] == pytest.approx(expected_var)
+
+
+@pytest.mark.django_db
+def test_pool_streams_same_results_as_inline():
+    (eq, bond), _ = make_book()
+    book = load_book()
+    scenarios = [
+        Scenario.from_dict({"name": f"s{i}", "shocks": [{"price_pct": -0.01 * i}]})
+        for i in range(1, 6)
+    ] + [Scenario.from_dict({"name": "bond", "shocks": [{"asset_ids": [bond.id]}]})]
+
+    inline = [r.summary() for r in run_scenarios(book, scenarios)]
+    pooled = [r.summary() for r in run_scenarios(book, scenarios, workers=2)]
+
+    assert pooled == inline
+    assert [s["scenario"] for s in pooled][-1] == "bond"
+    assert pooled[-1]["affected_portfolios"] == 0  # no-op shock touches nobody
+
+
+@pytest.mark.django_db
+def test_scenario_endpoint_streams_ndjson():
+    _, (mixed, _) = make_book()
+    payload = {
+        "scenarios": [
+            {"name": "vol up", "shocks": [{"vol_mult": 1.5}]},
+            {"name": "eq", "shocks": [{"category": "Equity", "price_pct": -0.1}]},
+        ],
+        "top": 1,
+    }
+    client = APIClient()
+    resp = client.post(reverse("scenario-run"), payload, format="json")
+
+    assert resp["Content-Type"] == "application/x-ndjson"
+    lines = [json.loads(l) for l in b"".join(resp.streaming_content).splitlines()]
+    assert [l["scenario"] for l in lines] == ["vol up", "eq"]
+    assert lines[0]["affected_portfolios"] == 2 and len(lines[0]["worst"]) == 1
+    assert lines[1]["worst"][0]["portfolio"] == mixed.id
+    bad = {"scenarios": [{"name": "x", "shocks": [{"price_pct": -2}]}]}
+    assert client.post(reverse("scenario-run"), bad, format="json").status_code == 400
+    for alpha in (1.5, 0, "nan"):
+        resp = client.post(
+            reverse("scenario-run"),
+            {**payload, "alpha": alpha},
+            format="json",
+        )
+        assert resp.status_code == 400 and "alpha" in resp.json()["detail"]
+    for shock in ({"price_pct": "nan"}, {"price_pct": "-inf"}, {"vol_mult": "inf"}):
+        bad = {"scenarios": [{"name": "x", "shocks": [shock]}]}
+        resp = client.post(reverse("scenario-run"), bad, format="json")
+        assert resp.status_code == 400 and "finite" in resp.json()["detail"]
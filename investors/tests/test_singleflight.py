@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+
+from core.singleflight import SingleFlight, request_key
+from investors.tests.factories import AssetFactory, InvestorFactory, PortfolioFactory
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _run_threads(n, target):
+    results, threads = [], []
+    for _ in range(n):
+        t = threading.Thread(target=lambda: results.append(target()))
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    flight = SingleFlight("test-local", timeout=5)
+    release, calls = threading.Event(), []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {"answer": 42}
+
+    threading.Timer(0.2, release.set).start()
+    results = _run_threads(8, lambda: flight.do("k", compute))
+
+    assert len(calls) == 1
+    assert results == [{"answer": 42}] * 8
+
+
+def test_waits_for_the_flight_of_another_process():
+    flight = SingleFlight("test-remote", timeout=5, poll_interval=0.01)
+    lock_key = flight._cache_key("k", "lock")
+    cache.add(lock_key, "other", timeout=30)  # another process is computing
+
+    def other_process_finishes():
+        cache.set(flight._cache_key("k", "other"), "theirs", timeout=10)
+        cache.delete(lock_key)
+
+    threading.Timer(0.1, other_process_finishes).start()
+    assert flight.do("k", lambda: "mine") == "theirs"
+
+
+def test_falls_back_to_computing_when_the_leader_is_stuck():
+    flight = SingleFlight("test-timeout", timeout=0.2, poll_interval=0.01)
+    cache.add(flight._cache_key("k", "lock"), "dead", timeout=30)
+
+    start = time.monotonic()
+    assert flight.do("k", lambda: "mine") == "mine"
+    assert time.monotonic() - start >= 0.2
+
+
+def test_waiters_compute_themselves_when_the_leader_fails():
+    flight = SingleFlight("test-error", timeout=5)
+    release, calls = threading.Event(), []
+
+    def compute():
+        calls.append(threading.get_ident())
+        if len(calls) == 1:
+            release.wait(5)
+            raise RuntimeError("boom")
+        return "ok"
+
+    def call():
+        try:
+            return flight.do("k", compute)
+        except RuntimeError:
+            return "error"
+
+    threading.Timer(0.2, release.set).start()
+    results = sorted(_run_threads(3, call))
+
+    assert results == ["error", "ok", "ok"]
+    assert cache.get(flight._cache_key("k", "lock")) is None  # released
+
+
+def test_request_key_ignores_param_order_and_separates_pinned_clients():
+    rf = RequestFactory()
+    a = rf.get("/api/portfolios/top/", {"limit": 5, "risk": "high"})
+    b = rf.get("/api/portfolios/top/?risk=high&limit=5")
+    pinned = rf.get("/api/portfolios/top/?risk=high&limit=5")
+    pinned.COOKIES["db_primary_pin"] = "1"
+
+    assert request_key(a) == request_key(b)
+    assert request_key(a) != request_key(pinned)
+    assert request_key(a) != request_key(rf.get("/api/portfolios/top/?limit=6"))
+
+
+@pytest.mark.django_db
+def test_coalesced_views_still_answer_like_before():
+    inv = InvestorFactory()
+    for i in range(3):
+        p = PortfolioFactory(investor=inv, name=f"P{i}")
+        p.assets.add(AssetFactory(category="Equity"))
+    client = APIClient()
+
+    top = client.get("/api/portfolios/top/?limit=2")
+    analytics = client.get("/api/assets/analytics/")
+
+    assert top.status_code == 200 and len(top.json()) == 2
+    assert analytics.status_code == 200
+    assert analytics.json()["summary"]["n_total"] == 3
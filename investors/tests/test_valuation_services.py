@@ -0,0 +1,146 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from investors import valuation_services
+from investors.metrics_services import annotate_metrics
+from investors.models import Asset, Portfolio, Position
+from investors.quote_services import apply_quotes
+from investors.tests.factories import AssetFactory, InvestorFactory, PortfolioFactory
+from investors.valuation_services import (
+    book_weights,
+    bump_asset_versions,
+    bump_position_versions,
+    portfolio_valuations,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def make_book():
+    a, b, c = AssetFactory(price=10), AssetFactory(price=20), AssetFactory(price=5)
+    p1 = PortfolioFactory(investor=InvestorFactory())
+    p2 = PortfolioFactory(investor=InvestorFactory())
+    p3 = PortfolioFactory(investor=InvestorFactory())  # no positions
+    for p, asset, qty in [(p1, a, 3), (p1, b, 1), (p2, b, 2), (p2, c, 4)]:
+        p.assets.add(asset)
+        Position.objects.create(portfolio=p, asset=asset, quantity=Decimal(qty))
+    return (a, b, c), (p1, p2, p3)
+
+
+@pytest.mark.django_db
+def test_valuations_in_one_query(django_assert_num_queries):
+    (a, b, c), (p1, p2, p3) = make_book()
+
+    with django_assert_num_queries(1):
+        vals = portfolio_valuations([p1.id, p2.id, p3.id], use_cache=False)
+
+    assert vals[p1.id].market_value == 50.0
+    assert vals[p1.id].weights == {a.id: 0.6, b.id: 0.4}
+    assert vals[p2.id].weights == {
+        b.id: pytest.approx(2 / 3),
+        c.id: pytest.approx(1 / 3),
+    }
+    assert vals[p3.id].market_value == 0.0 and vals[p3.id].weights == {}
+
+
+@pytest.mark.django_db
+def test_cached_valuations_follow_asset_and_position_versions(
+    django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    (a, b, c), (p1, p2, _) = make_book()
+    portfolio_valuations([p1.id, p2.id])
+
+    with django_assert_num_queries(0):
+        assert portfolio_valuations([p1.id, p2.id])[p1.id].market_value == 50.0
+
+    # a price change on `a` only recomputes the portfolio that holds it
+    with django_capture_on_commit_callbacks(execute=True):
+        apply_quotes({a.id: (20.0, 0.2)})
+    # held asset ids (for their versions) + the windowed compute
+    with django_assert_num_queries(2):
+        vals = portfolio_valuations([p1.id, p2.id])
+    assert vals[p1.id].market_value == 80.0 and vals[p2.id].market_value == 60.0
+
+    Position.objects.filter(portfolio=p2, asset=c).update(quantity=0)
+    bump_position_versions([p2.id])
+    assert portfolio_valuations([p2.id])[p2.id].market_value == 40.0
+
+
+@pytest.mark.django_db
+def test_a_bump_racing_the_compute_is_not_stamped_as_current(monkeypatch):
+    (a, _, _), (p1, _, _) = make_book()
+    compute = valuation_services._compute_valuations
+
+    def compute_then_reprice(ids):
+        out = compute(ids)
+        Asset.objects.filter(id=a.id).update(price=20.0)
+        bump_asset_versions([a.id])  # lands before the entry is written
+        return out
+
+    monkeypatch.setattr(valuation_services, "_compute_valuations", compute_then_reprice)
+    assert portfolio_valuations([p1.id])[p1.id].market_value == 50.0
+    monkeypatch.setattr(valuation_services, "_compute_valuations", compute)
+    assert portfolio_valuations([p1.id])[p1.id].market_value == 80.0
+
+
+@pytest.mark.django_db
+def test_book_weights_match_query_path():
+    _, (p1, p2, _) = make_book()
+    book = book_weights()
+
+    mv = dict(zip(book.portfolio_ids.tolist(), book.market_values.tolist()))
+    assert mv == {p1.id: 50.0, p2.id: 60.0}
+    vals = portfolio_valuations([p1.id, p2.id], use_cache=False)
+    for r, col, w in zip(book.rows, book.cols, book.weights):
+        pid, aid = int(book.portfolio_ids[r]), int(book.asset_ids[col])
+        assert w == pytest.approx(vals[pid].weights[aid])
+    assert np.bincount(book.rows, weights=book.weights).tolist() == pytest.approx(
+        [1.0, 1.0]
+    )
+
+
+@pytest.mark.django_db
+def test_total_value_is_market_value_and_valuation_endpoint():
+    (a, _, _), (p1, _, _) = make_book()
+    row = annotate_metrics(Portfolio.objects.filter(id=p1.id)).values(
+        "asset_count", "total_value"
+    )[0]
+    assert row == {"asset_count": 2, "total_value": 50.0}
+
+    resp = APIClient().get(reverse("portfolio-valuation", args=[p1.id]))
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["market_value"] == 50.0
+    assert body["weights"][0] == {"asset": a.id, "value": 30.0, "weight": 0.6}
+    assert APIClient().get("/api/portfolios/abc/valuation/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_valuations_endpoint_leaves_out_unknown_ids(monkeypatch):
+    _, (p1, p2, _) = make_book()
+    missing = p2.id + 1000
+    spy = []
+    compute = valuation_services._compute_valuations
+
+    def recording(ids):
+        spy.append(sorted(ids))
+        return compute(ids)
+
+    monkeypatch.setattr(valuation_services, "_compute_valuations", recording)
+    resp = APIClient().get(
+        reverse("portfolio-valuations"), {"ids": f"{p1.id},{missing},{p2.id}"}
+    )
+
+    assert resp.status_code == 200
+    assert [r["portfolio"] for r in resp.json()] == [p1.id, p2.id]
+    assert spy == [sorted([p1.id, p2.id])]
@@ -0,0 +1,59 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from investors.management.utils.parser_and_financial_computations import (
+    annualized_volatility_batch,
+    annualized_volatility_from_closes,
+    rolling_annualized_volatility,
+)
+
+
+def random_series(rng, n):
+    px, out = 100.0, []
+    for _ in range(n):
+        px *= math.exp(rng.gauss(0.0, 0.02))
+        out.append(px if rng.random() > 0.1 else None)
+    return out
+
+
+def test_batch_matches_scalar_on_ragged_rows_with_gaps():
+    rng = random.Random(42)
+    rows = [random_series(rng, rng.randint(0, 80)) for _ in range(50)]
+    rows += [[10.0, None, 0.0, 11.0, 12.0], [1.0, 2.0], [None, None]]
+
+    got = annualized_volatility_batch(rows)
+
+    for row, vol in zip(rows, got):
+        expected = annualized_volatility_from_closes(row)
+        if expected is None:
+            assert np.isnan(vol)
+        else:
+            assert vol == pytest.approx(expected, rel=1e-12)
+
+
+def test_batch_accepts_nan_padded_array():
+    arr = np.array([[100.0, 101.0, 99.0, np.nan], [50.0, 51.0, 52.0, 50.5]])
+    got = annualized_volatility_batch(arr)
+    assert got[0] == pytest.approx(
+        annualized_volatility_from_closes([100.0, 101.0, 99.0])
+    )
+    assert got[1] == pytest.approx(
+        annualized_volatility_from_closes([50.0, 51.0, 52.0, 50.5])
+    )
+
+
+def test_rolling_matches_scalar_per_window():
+    rng = random.Random(1)
+    closes = [c for c in random_series(rng, 60) if c is not None]
+    window = 10
+
+    curve = rolling_annualized_volatility([closes], window)[0]
+
+    assert np.isnan(curve[0])
+    for j in range(1, len(closes) - 1):
+        lo = max(0, j + 1 - window)
+        expected = annualized_volatility_from_closes(closes[lo : j + 2])
+        assert curve[j] == pytest.approx(expected, rel=1e-9)
@@ -1,14 +1,17 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import (
     AssetAnalyticsView,
+    AssetLatestView,
     AssetViewSet,
     CachedAssetListView,
     InvestorProfileViewSet,
     InvestorViewSet,
     PortfolioBulkUpsertView,
     PortfolioViewSet,
+    ScenarioRunView,
 )
 
 router = DefaultRouter()
@@ -24,6 +27,25 @@ urlpatterns = [
         name="portfolio-bulk-upsert",
     ),
     path("assets/analytics/", AssetAnalyticsView.as_view(), name="asset-analytics"),
+    path("assets/latest/", AssetLatestView.as_view(), name="asset-latest"),
     path("assets/cached/", CachedAssetListView.as_view(), name="asset-cached-list"),
+    path("scenarios/run/", ScenarioRunView.as_view(), name="scenario-run"),
+    # ASGI variants of the read-heavy endpoints (investors.async_views)
+    path("async/assets/", async_views.asset_list, name="async-asset-list"),
+    path(
+        "async/assets/cached/",
+        async_views.cached_asset_list,
+        name="async-asset-cached-list",
+    ),
+    path(
+        "async/assets/analytics/",
+        async_views.asset_analytics,
+        name="async-asset-analytics",
+    ),
+    path(
+        "async/portfolios/<int:pk>/stats/",
+        async_views.portfolio_stats,
+        name="async-portfolio-stats",
+    ),
     path("", include(router.urls)),
 ]
@@ -0,0 +1,240 @@
+"""
+Market value and weights of portfolios from Position.quantity x Asset.price.
+
+Two paths over the same numbers:
+  - `portfolio_valuations`: one windowed query for any set of portfolios,
+    cached per portfolio and validated against per-asset data versions.
+  - `book_weights`: the whole book (or a slice) as COO arrays for batch jobs,
+    with market values and weights computed in numpy.
+
+Writers of Asset.price or Position call `bump_asset_versions` /
+`bump_position_versions`; a cached valuation is served only while every
+version it was computed against is unchanged.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (
+    Count,
+    F,
+    FloatField,
+    OuterRef,
+    Subquery,
+    Sum,
+    Window,
+)
+from django.db.models.functions import Cast, Coalesce
+
+from investors.models import Asset, Position
+
+VALUATION_CACHE_TTL = getattr(settings, "VALUATION_CACHE_TTL", 300)
+
+
+def _asset_version_key(asset_id: int) -> str:
+    return f"asset:ver:{asset_id}"
+
+
+def _position_version_key(portfolio_id: int) -> str:
+    return f"portfolio:posver:{portfolio_id}"
+
+
+def _valuation_key(portfolio_id: int) -> str:
+    return f"valuation:{portfolio_id}"
+
+
+def _bump(keys: List[str]) -> None:
+    if keys:
+        # a fresh token instead of incr: one set_many round trip, no read
+        token = time.time_ns()
+        cache.set_many({k: token for k in keys}, timeout=None)
+
+
+def bump_asset_versions(asset_ids: Iterable[int]) -> None:
+    _bump([_asset_version_key(a) for a in asset_ids])
+
+
+def bump_position_versions(portfolio_ids: Iterable[int]) -> None:
+    _bump([_position_version_key(p) for p in portfolio_ids])
+
+
+def position_value_expr():
+    return Cast("quantity", FloatField()) * F("asset__price")
+
+
+def market_value_subquery():
+    """Per-portfolio market value as a correlated subquery; safe next to m2m joins."""
+    mv = (
+        Position.objects.filter(portfolio=OuterRef("pk"))
+        .order_by()
+        .values("portfolio")
+        .annotate(mv=Sum(position_value_expr(), output_field=FloatField()))
+        .values("mv")
+    )
+    return Coalesce(Subquery(mv, output_field=FloatField()), 0.0)
+
+
+@dataclass
+class Valuation:
+    portfolio_id: int
+    market_value: float
+    weights: Dict[int, float]  # asset_id -> share of market value
+    values: Dict[int, float]  # asset_id -> quantity x price
+
+
+def _compute_valuations(portfolio_ids: List[int]) -> Dict[int, Valuation]:
+    rows = (
+        Position.objects.filter(portfolio_id__in=portfolio_ids)
+        .annotate(
+            value=position_value_expr(),
+            total=Window(
+                Sum(position_value_expr(), output_field=FloatField()),
+                partition_by=[F("portfolio_id")],
+            ),
+        )
+        .values_list("portfolio_id", "asset_id", "value", "total")
+    )
+    out = {pid: Valuation(pid, 0.0, {}, {}) for pid in portfolio_ids}
+    for pid, aid, value, total in rows:
+        v = out[pid]
+        v.market_value = total or 0.0
+        v.values[aid] = value or 0.0
+        v.weights[aid] = (value or 0.0) / total if total else 0.0
+    return out
+
+
+def _cache_entry(v: Valuation, versions: Dict[str, Optional[int]]) -> dict:
+    return {
+        "valuation": v,
+        "pos_version": versions.get(_position_version_key(v.portfolio_id)),
+        "asset_versions": {a: versions.get(_asset_version_key(a)) for a in v.values},
+    }
+
+
+def _is_current(entry: dict, pid: int, versions: Dict[str, Optional[int]]) -> bool:
+    if entry["pos_version"] != versions.get(_position_version_key(pid)):
+        return False
+    return all(
+        versions.get(_asset_version_key(a)) == ver
+        for a, ver in entry["asset_versions"].items()
+    )
+
+
+def portfolio_valuations(
+    portfolio_ids: Iterable[int], use_cache: bool = True
+) -> Dict[int, Valuation]:
+    """
+    Market value and weights for many portfolios. Cached entries are checked
+    with one get_many over the asset/position versions they depend on; the
+    misses are computed together in a single windowed query, after reading
+    the versions of the assets they hold.
+    """
+    ids = list(dict.fromkeys(portfolio_ids))
+    if not use_cache:
+        return _compute_valuations(ids)
+
+    entries = cache.get_many([_valuation_key(p) for p in ids])
+    version_keys = {_position_version_key(p) for p in ids}
+    for entry in entries.values():
+        version_keys.update(_asset_version_key(a) for a in entry["asset_versions"])
+    versions = cache.get_many(list(version_keys))
+
+    out: Dict[int, Valuation] = {}
+    misses = []
+    for pid in ids:
+        entry = entries.get(_valuation_key(pid))
+        if entry is not None and _is_current(entry, pid, versions):
+            out[pid] = entry["valuation"]
+        else:
+            misses.append(pid)
+    if misses:
+        # versions of the held assets the cache had not seen yet, read before
+        # computing: a bump racing the compute then leaves the entry stamped
+        # with the older token (never served), not the newer one
+        held = (
+            Position.objects.filter(portfolio_id__in=misses)
+            .order_by()
+            .values_list("asset_id", flat=True)
+            .distinct()
+        )
+        unseen = {_asset_version_key(a) for a in held} - versions.keys()
+        versions.update(cache.get_many(list(unseen)))
+        fresh = _compute_valuations(misses)
+        cache.set_many(
+            {_valuation_key(p): _cache_entry(v, versions) for p, v in fresh.items()},
+            timeout=VALUATION_CACHE_TTL,
+        )
+        out.update(fresh)
+    return out
+
+
+@dataclass
+class BookWeights:
+    """
+    Positions of many portfolios as a sparse (portfolio x asset) matrix in COO
+    form. `rows` / `cols` index into `portfolio_ids` / `asset_ids`.
+    """
+
+    portfolio_ids: np.ndarray
+    asset_ids: np.ndarray
+    rows: np.ndarray
+    cols: np.ndarray
+    quantities: np.ndarray
+    prices: np.ndarray  # per asset_ids entry
+
+    @property
+    def values(self) -> np.ndarray:
+        return self.quantities * self.prices[self.cols]
+
+    @property
+    def market_values(self) -> np.ndarray:
+        return np.bincount(
+            self.rows, weights=self.values, minlength=len(self.portfolio_ids)
+        )
+
+    @property
+    def weights(self) -> np.ndarray:
+        """Weight of each COO entry within its portfolio (0 for empty books)."""
+        mv = self.market_values[self.rows]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(mv != 0, self.values / mv, 0.0)
+
+
+def book_weights(portfolio_ids: Optional[Iterable[int]] = None) -> BookWeights:
+    """Load positions once (two narrow queries) and index them for numpy."""
+    qs = Position.objects.order_by()
+    if portfolio_ids is not None:
+        qs = qs.filter(portfolio_id__in=list(portfolio_ids))
+    pos = np.array(
+        list(
+            qs.annotate(q=Cast("quantity", FloatField())).values_list(
+                "portfolio_id", "asset_id", "q"
+            )
+        ),
+        dtype=np.float64,
+    ).reshape(-1, 3)
+    pids, rows = np.unique(pos[:, 0].astype(np.int64), return_inverse=True)
+    aids, cols = np.unique(pos[:, 1].astype(np.int64), return_inverse=True)
+    price_by_id = dict(
+        Asset.objects.filter(id__in=aids.tolist()).values_list("id", "price")
+    )
+    prices = np.array([price_by_id.get(a) or 0.0 for a in aids.tolist()])
+    return BookWeights(pids, aids, rows, cols, pos[:, 2], prices)
+
+
+def holder_concentration_per_asset(limit: Optional[int] = None) -> List[Tuple]:
+    """(asset_id, name, holders, total_qty) ordered by number of holding portfolios."""
+    qs = (
+        Asset.objects.annotate(
+            holders=Count("positions__portfolio", distinct=True),
+            total_qty=Sum(Cast("positions__quantity", FloatField())),
+        )
+        .filter(holders__gt=0)
+        .order_by("-holders", "id")
+        .values_list("id", "name", "holders", "total_qty")
+    )
+    return list(qs[:limit] if limit else qs)
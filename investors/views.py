@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import json
+import math
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from email.utils import format_datetime
 
@@ -15,23 +18,31 @@ from django.db.models import (
     Max,
     Prefetch,
     Q,
+    QuerySet,
     Value,
     When,
 )
 from django.db.models.functions import Coalesce, Sqrt
-from django.http import HttpResponseNotModified
-from rest_framework import permissions, status, viewsets
+from django.http import Http404, HttpResponseNotModified, StreamingHttpResponse
+from rest_framework import generics, permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core.profiling import ProfiledViewMixin
+from core.singleflight import coalesced_view
+from investors.exposure_services import exposure_of, reprice_exposure, shock_asset
 from investors.filters import PortfolioFilter
 from investors.metrics_services import annotate_metrics
-from investors.models import Asset, Portfolio
+from investors.models import Asset, AssetLatest, Portfolio
+from investors.scenario_services import Scenario, load_book, run_scenarios
 from investors.serializers import PortfolioUpsertSerializer
+from investors.valuation_services import bump_asset_versions, portfolio_valuations
 
 from .models import Investor, InvestorProfile
 from .serializers import (
+    AssetLatestSerializer,
     AssetSerializer,
     InvestorProfileSerializer,
     InvestorSerializer,
@@ -40,25 +51,107 @@ from .serializers import (
 )
 
 
-class InvestorViewSet(viewsets.ModelViewSet):
+def pk_or_404(pk) -> int:
+    """URL pk of the engine-backed actions (which skip get_object) as an int."""
+    try:
+        return int(pk)
+    except (TypeError, ValueError):
+        raise Http404
+
+
+class InvestorViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     queryset = Investor.objects.all()
     serializer_class = InvestorSerializer
+    query_budget = {"list": 2, "retrieve": 1}
+    read_replica = {"list", "retrieve"}
 
 
-class InvestorProfileViewSet(viewsets.ModelViewSet):
+class InvestorProfileViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     queryset = InvestorProfile.objects.all()
     serializer_class = InvestorProfileSerializer
+    query_budget = {"list": 2, "retrieve": 1}
+    read_replica = {"list", "retrieve"}
 
 
-class AssetViewSet(viewsets.ModelViewSet):
+class AssetViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     queryset = Asset.objects.all()
     serializer_class = AssetSerializer
+    # per action, enforced by core.metrics.RequestMetricsMiddleware
+    query_budget = {"list": 2, "retrieve": 1, "exposure": 2, "shock": 5}
+    read_replica = {"list", "retrieve", "exposure"}
+
+    # price edits invalidate cached portfolio valuations holding the asset
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        reprice_exposure([serializer.instance.id])
+        bump_asset_versions([serializer.instance.id])
+
+    def perform_destroy(self, instance):
+        asset_id = instance.id
+        super().perform_destroy(instance)
+        bump_asset_versions([asset_id])
+
+    @action(detail=True, methods=["GET"])
+    def exposure(self, request, pk=None):
+        # one primary-key read of the exposure index, however many holders
+        # (plus an asset lookup for assets not indexed yet)
+        data = exposure_of(pk_or_404(pk))
+        if data is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
+
+    @action(detail=True, methods=["POST"])
+    def shock(self, request, pk=None):
+        # what-if: {"pct": -0.1, "limit": 100}; revalues only holders of this asset
+        try:
+            pct = float(request.data.get("pct"))
+            limit = int(request.data.get("limit", 100))
+            if not (math.isfinite(pct) and pct > -1.0):
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response(
+                {"detail": "pct must be a finite number > -1 (e.g. -0.1 for -10%)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        pk = pk_or_404(pk)
+        if not Asset.objects.filter(pk=pk).exists():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        impacts = shock_asset(pk, pct)
+        return Response(
+            {
+                "asset": pk,
+                "pct": pct,
+                "affected_portfolios": len(impacts),
+                "total_pnl": sum(i.pnl for i in impacts),
+                "portfolios": [
+                    {
+                        "portfolio": i.portfolio_id,
+                        "market_value": i.market_value,
+                        "shocked_value": i.shocked_value,
+                        "pnl": i.pnl,
+                        "pct_change": i.pct_change,
+                    }
+                    for i in impacts[:limit]
+                ],
+            }
+        )
 
 
-class PortfolioViewSet(viewsets.ModelViewSet):
+class PortfolioViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     filterset_class = PortfolioFilter
     ordering_fields = ["name", "asset_count", "port_vol", "sharpe_proxy"]
     ordering = ["-sharpe_proxy"]
+    query_budget = {
+        "list": 2,
+        "retrieve": 2,
+        "top": 1,
+        "valuation": 3,
+        "valuations": 3,
+        "stats": 1,
+    }
+    # not valuation(s): entries are cached under the current version tokens,
+    # so computing them from a lagging replica would cache stale values
+    read_replica = {"list", "retrieve", "top", "stats"}
 
     def get_serializer_class(self):
         return (
@@ -72,15 +165,15 @@ class PortfolioViewSet(viewsets.ModelViewSet):
 
         if self.action == "retrieve":
             return base.select_related("investor").prefetch_related(
-                Prefetch(
-                    "assets",
-                    queryset=Asset.objects.only("id", "name", "price", "volatility"),
-                )
+                # AssetSerializer renders every field: deferring any of
+                # them costs one query per asset
+                Prefetch("assets", queryset=Asset.objects.all())
             )
         # list / others
         return base.select_related("investor")
 
     @action(detail=False, methods=["GET"])
+    @coalesced_view("portfolio-top")
     def top(self, request):
         limit = int(request.query_params.get("limit", 5))
         # respects ?risk=... & ?min_sharpe=... & ?ordering=...
@@ -88,6 +181,48 @@ class PortfolioViewSet(viewsets.ModelViewSet):
         ser = PortfolioSummarySerializer(qs, many=True)
         return Response(ser.data)
 
+    @action(detail=True, methods=["GET"])
+    def valuation(self, request, pk=None):
+        # existence check only; the valuation itself comes from the engine
+        pk = pk_or_404(pk)
+        if not Portfolio.objects.filter(pk=pk).exists():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        v = portfolio_valuations([pk])[pk]
+        return Response(
+            {
+                "portfolio": v.portfolio_id,
+                "market_value": v.market_value,
+                "weights": [
+                    {"asset": aid, "value": v.values[aid], "weight": w}
+                    for aid, w in sorted(v.weights.items(), key=lambda kv: -kv[1])
+                ],
+            }
+        )
+
+    @action(detail=False, methods=["GET"])
+    def valuations(self, request):
+        # ?ids=1,2,3 -> market value per portfolio, weights omitted
+        try:
+            ids = [int(i) for i in request.query_params.get("ids", "").split(",") if i]
+        except ValueError:
+            return Response(
+                {"detail": "ids must be integers"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        # unknown ids are left out rather than valued (and cached) as empty
+        ids = ids[:1000]
+        known = set(Portfolio.objects.filter(id__in=ids).values_list("id", flat=True))
+        vals = portfolio_valuations(i for i in ids if i in known)
+        return Response(
+            [
+                {
+                    "portfolio": pid,
+                    "market_value": v.market_value,
+                    "n_assets": len(v.weights),
+                }
+                for pid, v in vals.items()
+            ]
+        )
+
     @action(detail=True, methods=["GET"])
     def stats(self, request, pk=None):
         obj = self.get_object()
@@ -99,87 +234,187 @@ class PortfolioViewSet(viewsets.ModelViewSet):
         )
 
 
-class AssetAnalyticsView(APIView):
+@dataclass
+class AnalyticsQueries:
+    """The lazy parts of the asset analytics, shared by the sync and async views."""
+
+    interesting: QuerySet
+    summary: dict
+    per_band: QuerySet
+    daily_move: QuerySet
+    daily_move_stats: dict
+    valuation: dict
+
+
+def analytics_queries() -> AnalyticsQueries:
+    interesting = Asset.objects.filter(Q(category="Equity") | Q(volatility__gt=0.30))
+
+    # Risk band by annualized volatility thresholds (tune as needed)
+    risk_band = Case(
+        When(volatility__lt=0.15, then=Value("low")),
+        When(volatility__lt=0.25, then=Value("medium")),
+        default=Value("high"),
+        output_field=CharField(),
+    )
+    # impose custom ordering by band label
+    band_order = Case(
+        When(risk_band="low", then=Value(1)),
+        When(risk_band="medium", then=Value(2)),
+        When(risk_band="high", then=Value(3)),
+        default=Value(99),
+        output_field=IntegerField(),
+    )
+    per_band = (
+        interesting.annotate(risk_band=risk_band)
+        .values("risk_band")
+        .annotate(n=Count("id"))
+        .annotate(order_key=band_order)
+        .order_by("order_key")
+        .values("risk_band", "n")
+    )
+
+    # Interpretable risk: typical daily move in currency units
+    daily_sigma = ExpressionWrapper(
+        F("volatility") / Sqrt(Value(252.0)),
+        output_field=FloatField(),
+    )
+    daily_move = ExpressionWrapper(
+        F("price") * daily_sigma,
+        output_field=FloatField(),
+    )
+    return AnalyticsQueries(
+        interesting=interesting,
+        summary=dict(
+            n_total=Count("id", distinct=True),
+            n_distinct_names=Count("name", distinct=True),
+            avg_price=Coalesce(Avg("price"), Value(0.0)),
+            max_vol=Coalesce(Max("volatility"), Value(0.0)),
+        ),
+        per_band=per_band,
+        daily_move=interesting.annotate(daily_move=daily_move),
+        daily_move_stats=dict(
+            avg_daily_move=Coalesce(Avg("daily_move"), Value(0.0)),
+            max_daily_move=Coalesce(Max("daily_move"), Value(0.0)),
+        ),
+        valuation=dict(
+            n_priced=Count("latest__close"),
+            n_with_pe=Count("latest__pe"),
+            avg_pe=Avg("latest__pe", filter=Q(latest__pe__gt=0)),
+            max_pe=Max("latest__pe"),
+            last_close_date=Max("latest__close_date"),
+        ),
+    )
+
+
+def analytics_payload(summary, per_band, daily_move, valuation) -> dict:
+    return {
+        "summary": summary,
+        "per_band": per_band,
+        "valuation": valuation,
+        "interpretable_risk": {
+            "avg_daily_move": daily_move["avg_daily_move"],
+            "max_daily_move": daily_move["max_daily_move"],
+            "units": "same as price (per trading day)",
+        },
+    }
+
+
+class AssetAnalyticsView(ProfiledViewMixin, APIView):
     """
     Analytics on assets:
       - Filters to "interesting" assets (EQUITY or high vol)
       - Summary stats
       - Count per risk band (low/medium/high by volatility)
       - Interpretable risk: average daily typical move in currency units
+      - Valuation from the AssetLatest snapshot (no EODPrice/Earnings scans)
     """
 
+    query_budget = 4
+    read_replica = True
+
+    @coalesced_view("asset-analytics")
     def get(self, request):
-        base = Asset.objects.all()
+        q = analytics_queries()
+        return Response(
+            analytics_payload(
+                summary=q.interesting.aggregate(**q.summary),
+                per_band=list(q.per_band),
+                daily_move=q.daily_move.aggregate(**q.daily_move_stats),
+                valuation=q.interesting.aggregate(**q.valuation),
+            )
+        )
 
-        interesting = base.filter(Q(category="Equity") | Q(volatility__gt=0.30))
 
-        # Risk band by annualized volatility thresholds (tune as needed)
-        risk_band = Case(
-            When(volatility__lt=0.15, then=Value("low")),
-            When(volatility__lt=0.25, then=Value("medium")),
-            default=Value("high"),
-            output_field=CharField(),
-        )
+class AssetLatestView(ProfiledViewMixin, generics.ListAPIView):
+    """
+    Latest close / EPS / P/E per asset straight from the AssetLatest snapshot,
+    paginated like the other lists. Optional ?ids=1,2,3 and ?max_pe=.
+    """
 
-        summary = interesting.aggregate(
-            n_total=Count("id", distinct=True),
-            n_distinct_names=Count("name", distinct=True),
-            avg_price=Coalesce(Avg("price"), Value(0.0)),
-            max_vol=Coalesce(Max("volatility"), Value(0.0)),
-        )
+    serializer_class = AssetLatestSerializer
+    query_budget = 2  # count + page
+    read_replica = True
 
-        per_band_qs = (
-            interesting.annotate(risk_band=risk_band)
-            .values("risk_band")
-            .annotate(n=Count("id"))
-        )
+    def get_queryset(self):
+        qs = AssetLatest.objects.select_related("asset")
+        ids = self.request.query_params.get("ids")
+        max_pe = self.request.query_params.get("max_pe")
+        try:
+            if ids:
+                qs = qs.filter(asset_id__in=[int(i) for i in ids.split(",") if i])
+            if max_pe is not None:
+                qs = qs.filter(pe__gt=0, pe__lte=float(max_pe))
+        except ValueError:
+            raise ParseError("ids must be integers and max_pe a number")
+        return qs.order_by("asset_id")
+
+
+class ScenarioRunView(ProfiledViewMixin, APIView):
+    """
+    POST {"scenarios": [{"name": ..., "shocks": [...]}], "alpha": 0.95,
+    "top": 20, "portfolio_ids": [...]} -> NDJSON stream, one line per
+    scenario with its summary and worst `top` portfolios. Runs inline; the
+    run_scenarios command is the pooled path for large batches.
+    """
 
-        # impose custom ordering by band label
-        band_order = Case(
-            When(risk_band="low", then=Value(1)),
-            When(risk_band="medium", then=Value(2)),
-            When(risk_band="high", then=Value(3)),
-            default=Value(99),
-            output_field=IntegerField(),
-        )
-        per_band = list(
-            per_band_qs.annotate(order_key=band_order)
-            .order_by("order_key")
-            .values("risk_band", "n")
-        )
+    max_scenarios = 50
+    query_budget = 3  # book load; evaluation itself is numpy only
+    read_replica = True
 
-        # Interpretable risk: typical daily move in currency units
-        daily_sigma = ExpressionWrapper(
-            F("volatility") / Sqrt(Value(252.0)),
-            output_field=FloatField(),
-        )
-        daily_move = ExpressionWrapper(
-            F("price") * daily_sigma,
-            output_field=FloatField(),
-        )
-        daily_move_stats = interesting.annotate(daily_move=daily_move).aggregate(
-            avg_daily_move=Coalesce(Avg("daily_move"), Value(0.0)),
-            max_daily_move=Coalesce(Max("daily_move"), Value(0.0)),
-        )
+    def post(self, request):
+        body = request.data if isinstance(request.data, dict) else {}
+        try:
+            scenarios = [Scenario.from_dict(d) for d in body.get("scenarios") or []]
+            alpha = float(body.get("alpha", 0.95))
+            if not 0.0 < alpha < 1.0:
+                raise ValueError("alpha must be between 0 and 1 (exclusive)")
+            top = int(body.get("top", 20))
+            ids = body.get("portfolio_ids")
+            ids = [int(i) for i in ids] if ids is not None else None
+        except (TypeError, ValueError) as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not scenarios or len(scenarios) > self.max_scenarios:
+            return Response(
+                {"detail": f"send 1..{self.max_scenarios} scenarios"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        book = load_book(ids, alpha=alpha)
 
-        return Response(
-            {
-                "summary": summary,
-                "per_band": per_band,
-                "interpretable_risk": {
-                    "avg_daily_move": daily_move_stats["avg_daily_move"],
-                    "max_daily_move": daily_move_stats["max_daily_move"],
-                    "units": "same as price (per trading day)",
-                },
-            }
-        )
+        def lines():
+            for result in run_scenarios(book, scenarios):
+                yield json.dumps({**result.summary(), "worst": result.rows(top)}) + "\n"
+
+        return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
 
 
-class CachedAssetListView(APIView):
+class CachedAssetListView(ProfiledViewMixin, APIView):
     """
     Weak ETag + Last-Modified for a minimal list swap to updated_at TO-DO
     """
 
+    query_budget = 3
+    read_replica = True
+
     def get(self, request):
         qs = Asset.objects.only("id", "name").order_by("id")
         count = qs.count()
@@ -207,7 +442,7 @@ class CachedAssetListView(APIView):
         return resp
 
 
-class PortfolioBulkUpsertView(APIView):
+class PortfolioBulkUpsertView(ProfiledViewMixin, APIView):
     permission_classes = [permissions.IsAdminUser]  # adjust if needed
 
     def post(self, request):